@@ -0,0 +1,119 @@
+"""
+Live Channels - Dashboard state pushed over Socket.IO as sequenced diffs
+
+A channel holds the latest state of one resource as a dict (prices by symbol,
+open trades by id, ...). refresh() rebuilds it from its source and emits only
+the keys that changed, numbered by a per-channel sequence, to the channel's
+room. Channels nobody subscribes to are not rebuilt at all. A client applies
+updates in sequence order; after a gap (missed update, reconnect) it asks for
+the updates since its last sequence, or gets a full snapshot if those are no
+longer kept or the server restarted (different epoch).
+"""
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class Channel:
+    """Keyed state of one resource with a sequence number and recent diffs"""
+
+    def __init__(self, name: str, source: Callable[[], Dict[str, Any]],
+                 emit: Callable[[str, dict, str], None], history: int = 100):
+        self.name = name
+        self.source = source  # Builds the full current state
+        self.emit = emit      # emit(event, payload, room)
+        self.seq = 0
+        self.state: Dict[str, Any] = {}
+        self.subscribers = 0
+        self.stale = True  # Not rebuilt since the last subscriber left
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def refresh(self) -> Optional[dict]:
+        """Rebuild from the source and push what changed (skipped while nobody listens)"""
+        if not self.subscribers:
+            self.stale = True
+            return None
+        return self.publish(self.source())
+
+    def publish(self, state: Dict[str, Any]) -> Optional[dict]:
+        """Replace the state, emitting {channel, seq, changed, removed} if anything differs"""
+        with self._lock:
+            self.stale = False
+            changed = {k: v for k, v in state.items() if k not in self.state or self.state[k] != v}
+            removed = [k for k in self.state if k not in state]
+            if not changed and not removed:
+                return None
+            self.seq += 1
+            self.state = dict(state)
+            update = {'channel': self.name, 'seq': self.seq, 'changed': changed, 'removed': removed}
+            self._history.append(update)
+            self.emit('update', update, self.name)  # Under the lock, so rooms see updates in order
+            return update
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'channel': self.name, 'seq': self.seq, 'state': dict(self.state)}
+
+    def since(self, seq: int) -> Optional[List[dict]]:
+        """Updates after `seq`, or None if they are not all kept any more"""
+        with self._lock:
+            if seq > self.seq:
+                return None
+            missed = [u for u in self._history if u['seq'] > seq]
+            if len(missed) != self.seq - seq:
+                return None
+            return missed
+
+
+class LiveHub:
+    """Channels plus which clients subscribe to which"""
+
+    def __init__(self, epoch: str, emit: Callable[[str, dict, str], None]):
+        self.epoch = epoch  # Sequences restart with the server: clients from another epoch resync
+        self.emit = emit
+        self.channels: Dict[str, Channel] = {}
+        self.clients: Dict[str, Set[str]] = {}  # sid -> channel names
+        self._lock = threading.Lock()
+
+    def add(self, name: str, source: Callable[[], Dict[str, Any]]) -> Channel:
+        channel = self.channels[name] = Channel(name, source, self.emit)
+        return channel
+
+    def subscribe(self, sid: str, name: str) -> bool:
+        """Count a subscriber, bringing a channel nobody watched up to date
+
+        The caller joins the room afterwards, then sends catch_up(). False for an
+        unknown channel.
+        """
+        channel = self.channels.get(name)
+        if channel is None:
+            return False
+        with self._lock:
+            names = self.clients.setdefault(sid, set())
+            if name not in names:
+                names.add(name)
+                channel.subscribers += 1
+        if channel.stale:
+            channel.refresh()
+        return True
+
+    def unsubscribe(self, sid: str, name: str):
+        with self._lock:
+            names = self.clients.get(sid, set())
+            if name in names:
+                names.discard(name)
+                self.channels[name].subscribers -= 1
+
+    def disconnect(self, sid: str):
+        with self._lock:
+            for name in self.clients.pop(sid, set()):
+                self.channels[name].subscribers -= 1
+
+    def catch_up(self, name: str, seq: int = None, epoch: str = None) -> List[Tuple[str, dict]]:
+        """(event, payload) messages that bring a client at `seq` up to date"""
+        channel = self.channels[name]
+        missed = channel.since(seq) if seq is not None and epoch == self.epoch else None
+        if missed is None:
+            return [('snapshot', dict(channel.snapshot(), epoch=self.epoch))]
+        return [('update', update) for update in missed]
@@ -2,25 +2,40 @@
 Flask API Server for Trading Bot
 Provides REST API endpoints for the frontend
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
+from werkzeug.http import http_date
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import threading
+import functools
+import hashlib
+import itertools
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 import time
 from datetime import datetime
+import base64
+import csv
+import io
+import json
 import sys
 import os
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from exchange.binance_client import BinanceClient
+from exchange.execution import ExecutionPipeline, close_intent
+from exchange.paper_exchange import create_client
 from bot.trading_bot import TradingBot
+from bot.portfolio import PortfolioRunner
+from bot.sharding import ShardedPortfolioRunner
+from bot.algo_execution import AlgoExecutionEngine
+from bot.oco_protection import OCOProtectionManager
 from strategies.rsi_strategy import RSIStrategy
 from strategies.ema_crossover_strategy import EMACrossoverStrategy
 from strategies.combined_strategy import CombinedStrategy
-from utils.trade_manager import TradeManager, ProfitLossAnalyzer
+from utils.trade_manager import Trade, TradeManager, ProfitLossAnalyzer
+from api.live import LiveHub
 import config
 
 app = Flask(__name__)
@@ -34,29 +49,43 @@ price_thread = None
 running = False
 trade_manager = None
 pl_analyzer = None
+portfolio = None
+execution = None
+algo_engine = None
+oco_manager = None  # Cancels / reconciles OCOs for manual closes when no bot is running
 
 # Price cache for fast responses
 price_cache = {}
 price_cache_time = 0
 PRICE_CACHE_TTL = 5  # Cache prices for 5 seconds
+ticker_prices = {}  # Last tick for the displayed symbols and those of open trades
+price_seq = 0  # Bumped whenever ticker_prices changes
 
 def init_client():
-    global client, trade_manager, pl_analyzer
+    global client, trade_manager, pl_analyzer, execution, algo_engine, oco_manager
     try:
-        client = BinanceClient()
+        client = create_client()
+        execution = ExecutionPipeline(client)
         trade_manager = TradeManager()
+        algo_engine = AlgoExecutionEngine(client, trade_manager, execution=execution)
+        algo_engine.start()
+        oco_manager = OCOProtectionManager(client, trade_manager)
         pl_analyzer = ProfitLossAnalyzer(trade_manager)
         return True
     except Exception as e:
         print(f"Error initializing client: {e}")
         return False
 
+# Imported again as __mp_main__ by sharded workers (spawn start method): skip the server's side effects
+SPAWNED_WORKER = __name__ == '__mp_main__'
+
 # Initialize on startup
-init_client()
+if not SPAWNED_WORKER:
+    init_client()
 
 # Background price updater
 def update_prices_background():
-    global price_cache, price_cache_time
+    global price_cache, price_cache_time, ticker_prices, price_seq
     symbols = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'DOGEUSDT']
     while True:
         try:
@@ -72,6 +101,13 @@ def update_prices_background():
                         'base': symbol.replace('USDT', ''),
                         'quote': 'USDT'
                     }
+                watched = set(symbols)
+                if trade_manager:
+                    watched.update(t.symbol for t in trade_manager.get_open_trades())
+                ticks = {s: ticker_map[s] for s in watched if s in ticker_map}
+                if ticks != ticker_prices:
+                    ticker_prices = ticks
+                    price_seq += 1
                 price_cache = new_cache
                 price_cache_time = time.time()
         except Exception as e:
@@ -80,7 +116,81 @@ def update_prices_background():
 
 # Start background price updater thread
 price_update_thread = threading.Thread(target=update_prices_background, daemon=True)
-price_update_thread.start()
+if not SPAWNED_WORKER:
+    price_update_thread.start()
+
+# ==================== CONDITIONAL GET ====================
+#
+# Each resource has a version (trade store, price tick, bot state); a response's
+# ETag is derived from the versions it depends on, so a poll with a matching
+# If-None-Match is answered 304 without running the view, and otherwise the
+# serialized body is reused until a version moves.
+
+RESPONSE_CACHE_ENTRIES = 512
+BOOT_ID = f"{os.getpid()}-{time.time()}"  # ETags from a previous run never match
+response_cache = OrderedDict()  # full path -> (etag, last modified, body, mimetype)
+response_cache_lock = threading.Lock()
+
+def _trades_version():
+    if not trade_manager:
+        return None
+    trade_manager._sync()  # Picks up trades other processes wrote
+    return trade_manager.version
+
+def _bot_version():
+    if not (bot and running):
+        return None
+    return (id(bot), bot.in_position, bot.entry_price, len(bot.trades))
+
+RESOURCE_VERSIONS = {
+    'trades': _trades_version,
+    'prices': lambda: price_seq,
+    'bot': _bot_version,
+}
+
+def versioned(*resources, ttl=None):
+    """ETag / Last-Modified validation and body caching for a GET view
+    
+    ttl: also expire every `ttl` seconds, for views that depend on the clock
+    (rolling windows) or on state without a version (balances, klines).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = [RESOURCE_VERSIONS[r]() for r in resources]
+            if ttl:
+                versions.append(int(time.time() // ttl))
+            key = request.full_path
+            etag = hashlib.sha1(repr((BOOT_ID, key, versions)).encode()).hexdigest()[:20]
+            with response_cache_lock:
+                cached = response_cache.get(key)
+                if cached:
+                    response_cache.move_to_end(key)
+            fresh = cached and cached[0] == etag
+            last_modified = cached[1] if fresh else None
+            if request.if_none_match.contains_weak(etag) or (
+                    fresh and not request.if_none_match and request.if_modified_since
+                    and request.if_modified_since.timestamp() >= last_modified):
+                response = Response(status=304)
+            elif fresh:
+                response = Response(cached[2], mimetype=cached[3])
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                # Strictly increasing, so If-Modified-Since can't miss a change within one second
+                last_modified = max(int(time.time()), cached[1] + 1 if cached else 0)
+                with response_cache_lock:
+                    response_cache[key] = (etag, last_modified, response.get_data(), response.mimetype)
+                    while len(response_cache) > RESPONSE_CACHE_ENTRIES:
+                        response_cache.popitem(last=False)
+            response.set_etag(etag)
+            if last_modified:
+                response.headers['Last-Modified'] = http_date(last_modified)
+            response.headers['Cache-Control'] = 'no-cache'  # Browsers revalidate every poll
+            return response
+        return wrapper
+    return decorator
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -88,6 +198,7 @@ def health_check():
     return jsonify({'status': 'ok', 'timestamp': datetime.now().isoformat()})
 
 @app.route('/api/prices', methods=['GET'])
+@versioned('prices')
 def get_prices():
     """Get current prices for popular cryptos - uses cache for instant response"""
     global price_cache
@@ -143,75 +254,84 @@ def get_klines(symbol):
     
     return jsonify([])
 
+def _analysis(symbol):
+    """Latest indicators and signal for a symbol (None without kline data)"""
+    import ta
+    
+    df = client.get_historical_klines(symbol.upper(), '1h', 100)
+    
+    if df.empty:
+        return None
+    
+    # Calculate indicators
+    df['rsi'] = ta.momentum.RSIIndicator(close=df['close']).rsi()
+    df['ema_9'] = ta.trend.EMAIndicator(close=df['close'], window=9).ema_indicator()
+    df['ema_21'] = ta.trend.EMAIndicator(close=df['close'], window=21).ema_indicator()
+    
+    macd = ta.trend.MACD(close=df['close'])
+    df['macd'] = macd.macd()
+    df['macd_signal'] = macd.macd_signal()
+    
+    bollinger = ta.volatility.BollingerBands(close=df['close'])
+    df['bb_upper'] = bollinger.bollinger_hband()
+    df['bb_lower'] = bollinger.bollinger_lband()
+    df['bb_middle'] = bollinger.bollinger_mavg()
+    
+    latest = df.iloc[-1]
+    prev = df.iloc[-2]
+    
+    # Determine signal
+    signal = 'NEUTRAL'
+    signal_strength = 0
+    
+    if latest['rsi'] < 30:
+        signal = 'BUY'
+        signal_strength += 2
+    elif latest['rsi'] > 70:
+        signal = 'SELL'
+        signal_strength += 2
+    
+    if prev['ema_9'] <= prev['ema_21'] and latest['ema_9'] > latest['ema_21']:
+        signal = 'BUY'
+        signal_strength += 1
+    elif prev['ema_9'] >= prev['ema_21'] and latest['ema_9'] < latest['ema_21']:
+        signal = 'SELL'
+        signal_strength += 1
+    
+    return {
+        'symbol': symbol.upper(),
+        'price': float(latest['close']),
+        'rsi': float(latest['rsi']) if not pd.isna(latest['rsi']) else None,
+        'ema_9': float(latest['ema_9']) if not pd.isna(latest['ema_9']) else None,
+        'ema_21': float(latest['ema_21']) if not pd.isna(latest['ema_21']) else None,
+        'macd': float(latest['macd']) if not pd.isna(latest['macd']) else None,
+        'macd_signal': float(latest['macd_signal']) if not pd.isna(latest['macd_signal']) else None,
+        'bb_upper': float(latest['bb_upper']) if not pd.isna(latest['bb_upper']) else None,
+        'bb_lower': float(latest['bb_lower']) if not pd.isna(latest['bb_lower']) else None,
+        'bb_middle': float(latest['bb_middle']) if not pd.isna(latest['bb_middle']) else None,
+        'signal': signal,
+        'signal_strength': signal_strength,
+        'trend': 'UP' if latest['ema_9'] > latest['ema_21'] else 'DOWN'
+    }
+
 @app.route('/api/analysis/<symbol>', methods=['GET'])
+@versioned(ttl=30)
 def get_analysis(symbol):
     """Get technical analysis for a symbol"""
     if not client:
         return jsonify({'error': 'Client not initialized'}), 500
     
     try:
-        import ta
-        
-        df = client.get_historical_klines(symbol.upper(), '1h', 100)
-        
-        if df.empty:
+        analysis = _analysis(symbol)
+        if analysis is None:
             return jsonify({'error': 'No data available'}), 404
-        
-        # Calculate indicators
-        df['rsi'] = ta.momentum.RSIIndicator(close=df['close']).rsi()
-        df['ema_9'] = ta.trend.EMAIndicator(close=df['close'], window=9).ema_indicator()
-        df['ema_21'] = ta.trend.EMAIndicator(close=df['close'], window=21).ema_indicator()
-        
-        macd = ta.trend.MACD(close=df['close'])
-        df['macd'] = macd.macd()
-        df['macd_signal'] = macd.macd_signal()
-        
-        bollinger = ta.volatility.BollingerBands(close=df['close'])
-        df['bb_upper'] = bollinger.bollinger_hband()
-        df['bb_lower'] = bollinger.bollinger_lband()
-        df['bb_middle'] = bollinger.bollinger_mavg()
-        
-        latest = df.iloc[-1]
-        prev = df.iloc[-2]
-        
-        # Determine signal
-        signal = 'NEUTRAL'
-        signal_strength = 0
-        
-        if latest['rsi'] < 30:
-            signal = 'BUY'
-            signal_strength += 2
-        elif latest['rsi'] > 70:
-            signal = 'SELL'
-            signal_strength += 2
-        
-        if prev['ema_9'] <= prev['ema_21'] and latest['ema_9'] > latest['ema_21']:
-            signal = 'BUY'
-            signal_strength += 1
-        elif prev['ema_9'] >= prev['ema_21'] and latest['ema_9'] < latest['ema_21']:
-            signal = 'SELL'
-            signal_strength += 1
-        
-        return jsonify({
-            'symbol': symbol.upper(),
-            'price': float(latest['close']),
-            'rsi': float(latest['rsi']) if not pd.isna(latest['rsi']) else None,
-            'ema_9': float(latest['ema_9']) if not pd.isna(latest['ema_9']) else None,
-            'ema_21': float(latest['ema_21']) if not pd.isna(latest['ema_21']) else None,
-            'macd': float(latest['macd']) if not pd.isna(latest['macd']) else None,
-            'macd_signal': float(latest['macd_signal']) if not pd.isna(latest['macd_signal']) else None,
-            'bb_upper': float(latest['bb_upper']) if not pd.isna(latest['bb_upper']) else None,
-            'bb_lower': float(latest['bb_lower']) if not pd.isna(latest['bb_lower']) else None,
-            'bb_middle': float(latest['bb_middle']) if not pd.isna(latest['bb_middle']) else None,
-            'signal': signal,
-            'signal_strength': signal_strength,
-            'trend': 'UP' if latest['ema_9'] > latest['ema_21'] else 'DOWN'
-        })
+        return jsonify(analysis)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/balance', methods=['GET'])
+@versioned('trades', ttl=10)
 def get_balance():
     """Get account balances"""
     if client:
@@ -291,13 +411,14 @@ def close_position():
         return jsonify({'error': 'No open position'}), 400
     
     try:
-        # Get current price before selling
-        current_price = bot.get_current_price()
         entry_price = bot.entry_price
         
         # Force sell
-        bot.execute_sell()
+        if not bot.execute_sell(urgent=True):
+            return jsonify({'error': 'Failed to close position'}), 500
         
+        # Exit price is the actual fill recorded by the bot
+        current_price = bot.trades[-1]['price']
         profit_loss = (current_price - entry_price) * bot.quantity if entry_price > 0 else 0
         profit_pct = ((current_price - entry_price) / entry_price * 100) if entry_price > 0 else 0
         
@@ -313,13 +434,9 @@ def close_position():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/bot/status', methods=['GET'])
-def bot_status():
-    """Get bot status"""
-    global bot, running
-    
+def _bot_status():
     if bot and running:
-        return jsonify({
+        return {
             'running': True,
             'symbol': bot.symbol,
             'strategy': bot.strategy.name,
@@ -327,11 +444,170 @@ def bot_status():
             'entry_price': bot.entry_price,
             'trades': len(bot.trades),
             'trade_history': bot.trades[-10:]  # Last 10 trades
-        })
+        }
+    return {'running': False}
+
+@app.route('/api/bot/status', methods=['GET'])
+@versioned('bot')
+def bot_status():
+    """Get bot status"""
+    return jsonify(_bot_status())
+
+@app.route('/api/bot/latency', methods=['GET'])
+def bot_latency():
+    """Get per-stage latency histograms of the running bot"""
+    global bot
+    
+    if not bot:
+        return jsonify({'enabled': False, 'strategies': {}})
     
-    return jsonify({'running': False})
+    if request.args.get('reset') == 'true':
+        bot.latency.reset()
+    
+    return jsonify(bot.get_latency_summary())
+
+# ==================== PORTFOLIO ====================
+
+@app.route('/api/portfolio', methods=['GET'])
+def portfolio_status():
+    """Get status of every portfolio slot"""
+    global portfolio
+    if not portfolio:
+        return jsonify({'running': False, 'slots': []})
+    return jsonify(portfolio.status())
+
+@app.route('/api/portfolio/start', methods=['POST'])
+def start_portfolio():
+    """Start the portfolio runner from a config file"""
+    global portfolio
+    
+    data = request.json or {}
+    config_path = data.get('config', config.PORTFOLIO_CONFIG)
+    
+    if portfolio and portfolio.running:
+        return jsonify({'error': 'Portfolio already running'}), 400
+    
+    try:
+        runner_kwargs = {
+            'client': client,
+            'trade_manager': trade_manager,
+            'on_tick': lambda update: socketio.emit('portfolio_update', update)
+        }
+        if data.get('sharded'):
+            portfolio = ShardedPortfolioRunner.from_config(
+                config_path, workers=data.get('workers'), **runner_kwargs)
+        else:
+            portfolio = PortfolioRunner.from_config(config_path, **runner_kwargs)
+        portfolio.start()
+        return jsonify({'status': 'started', **portfolio.status()})
+    except FileNotFoundError:
+        return jsonify({'error': f'Portfolio config not found: {config_path}'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/portfolio/stop', methods=['POST'])
+def stop_portfolio():
+    """Stop the portfolio runner"""
+    global portfolio
+    
+    if not portfolio:
+        return jsonify({'status': 'not running'})
+    
+    data = request.json or {}
+    portfolio.stop(close_positions=data.get('close_positions', True))
+    summary = portfolio.status()
+    portfolio = None
+    return jsonify({'status': 'stopped', 'summary': summary})
+
+@app.route('/api/portfolio/slots/<slot_id>/start', methods=['POST'])
+def start_portfolio_slot(slot_id):
+    """Resume trading on a single slot"""
+    if not portfolio:
+        return jsonify({'error': 'Portfolio not running'}), 400
+    if not portfolio.start_slot(slot_id):
+        return jsonify({'error': 'Slot not found'}), 404
+    return jsonify(portfolio.slot_status(slot_id))
+
+@app.route('/api/portfolio/slots/<slot_id>/stop', methods=['POST'])
+def stop_portfolio_slot(slot_id):
+    """Pause trading on a single slot"""
+    if not portfolio:
+        return jsonify({'error': 'Portfolio not running'}), 400
+    
+    data = request.json or {}
+    if not portfolio.stop_slot(slot_id, close_position=data.get('close_position', False)):
+        return jsonify({'error': 'Slot not found'}), 404
+    return jsonify(portfolio.slot_status(slot_id))
+
+@app.route('/api/portfolio/latency', methods=['GET'])
+def portfolio_latency():
+    """Get per-slot latency histograms"""
+    if not portfolio:
+        return jsonify({})
+    return jsonify(portfolio.latency())
+
+@app.route('/api/protection', methods=['GET'])
+def protection_status():
+    """Get trades watched by the tick-level engine and live exchange OCOs"""
+    owner = portfolio or bot
+    engine = owner.exit_engine if owner else None
+    oco_manager = owner.oco_manager if owner else None
+    
+    return jsonify({
+        'enabled': bool(engine),
+        **(engine.status() if engine else {'trades': []}),
+        'oco': oco_manager.status() if oco_manager else None
+    })
+
+def _algo_engines():
+    """Manual algo engine plus the running bot/portfolio engine (if any)"""
+    owner = portfolio or bot
+    engines = [algo_engine, owner.algo_engine if owner else None]
+    return [e for e in engines if e]
+
+@app.route('/api/algos', methods=['GET'])
+def algos_status():
+    """Get running and finished TWAP / VWAP / POV orders"""
+    algos = [a for engine in _algo_engines() for a in engine.status()['algos']]
+    return jsonify({
+        'running': sum(1 for a in algos if a['status'] in ('running', 'cancelling')),
+        'algos': sorted(algos, key=lambda a: a['started_at'], reverse=True)
+    })
+
+@app.route('/api/algos', methods=['POST'])
+def start_algo():
+    """Work a parent order with a TWAP / VWAP / POV algo"""
+    if not algo_engine:
+        return jsonify({'error': 'Client not initialized'}), 500
+    
+    data = request.json or {}
+    try:
+        algo = algo_engine.submit(
+            symbol=data.get('symbol', config.TRADE_SYMBOL).upper(),
+            side=data.get('side', 'BUY'),
+            quantity=float(data.get('quantity', config.TRADE_QUANTITY)),
+            style=data.get('style', 'TWAP'),
+            duration_seconds=data.get('duration_seconds'),
+            slices=data.get('slices'),
+            participation_rate=data.get('participation_rate'),
+            strategy=data.get('strategy', 'Manual'),
+            close_trade_id=data.get('close_trade_id')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(algo.to_dict())
+
+@app.route('/api/algos/<algo_id>/cancel', methods=['POST'])
+def cancel_algo(algo_id):
+    """Stop sending child orders for an algo"""
+    for engine in _algo_engines():
+        if engine.cancel(algo_id):
+            return jsonify(engine.get(algo_id).to_dict())
+    return jsonify({'error': 'Algo not found or already finished'}), 404
 
 @app.route('/api/config', methods=['GET'])
+@versioned()
 def get_config():
     """Get current configuration"""
     return jsonify({
@@ -349,47 +625,110 @@ def get_config():
 
 # ==================== TRADE HISTORY & ANALYTICS ====================
 
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK = 500  # Rows per streamed chunk
+TRADE_FIELDS = list(Trade.__dataclass_fields__)
+
+def _encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode() if key else None
+
+def _decode_cursor(cursor):
+    """(time, id) from a cursor made by _encode_cursor (ValueError if it isn't one)"""
+    if not cursor:
+        return None
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not (isinstance(key, list) and len(key) == 2 and all(isinstance(k, str) for k in key)):
+        raise ValueError('malformed cursor')
+    return tuple(key)
+
+def _trade_filters(status=None):
+    """Filters shared by the listing and export endpoints (ValueError on bad input)"""
+    since = request.args.get('since')
+    until = request.args.get('until')
+    return {
+        'status': status or request.args.get('status') or None,  # 'open', 'closed', or None for all
+        'symbol': request.args.get('symbol') or None,
+        'strategy': request.args.get('strategy') or None,
+        'since': datetime.fromisoformat(since) if since else None,
+        'until': datetime.fromisoformat(until) if until else None,
+    }
+
+def _trade_page(status=None):
+    """Keyset page: newest first by (time, id), `cursor` continues after the previous page"""
+    try:
+        filters = _trade_filters(status)
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_PAGE_SIZE)
+        after = _decode_cursor(request.args.get('cursor'))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+    trades, next_key = trade_manager.page_trades(limit, after=after, **filters)
+    unfiltered = not any(filters[k] for k in ('symbol', 'strategy', 'since', 'until'))
+    return jsonify({
+        'total': trade_manager.count_trades(filters['status']) if unfiltered else None,
+        'count': len(trades),
+        'trades': [t.to_dict() for t in trades],
+        'next_cursor': _encode_cursor(next_key)
+    })
+
 @app.route('/api/trades', methods=['GET'])
+@versioned('trades')
 def get_all_trades():
-    """Get all trades (open and closed)"""
+    """Get trades (open and closed), newest activity first, one page at a time"""
     global trade_manager
     if not trade_manager:
         return jsonify({'error': 'Trade manager not initialized'}), 500
-    
-    status_filter = request.args.get('status', None)  # 'open', 'closed', or None for all
-    limit = int(request.args.get('limit', 50))
-    
-    if status_filter == 'open':
-        trades = trade_manager.get_open_trades()
-    elif status_filter == 'closed':
-        trades = trade_manager.get_closed_trades()
-    else:
-        trades = trade_manager.get_all_trades()
-    
-    # Sort by entry time descending (most recent first)
-    trades_sorted = sorted(trades, key=lambda t: t.entry_time, reverse=True)[:limit]
-    
-    return jsonify({
-        'total': len(trades),
-        'trades': [t.to_dict() for t in trades_sorted]
-    })
+    return _trade_page()
 
-@app.route('/api/trades/open', methods=['GET'])
-def get_open_trades():
-    """Get all currently open/running trades"""
-    global trade_manager, client
+@app.route('/api/trades/export', methods=['GET'])
+def export_trades():
+    """Stream matching trades (oldest first) as NDJSON or CSV"""
+    global trade_manager
     if not trade_manager:
         return jsonify({'error': 'Trade manager not initialized'}), 500
-    
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    try:
+        filters = _trade_filters()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    trades = trade_manager.iter_trades(descending=False, **filters)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=TRADE_FIELDS)
+        if fmt == 'csv':
+            writer.writeheader()
+        while True:
+            chunk = [t.to_dict() for t in itertools.islice(trades, EXPORT_CHUNK)]
+            if fmt == 'csv':
+                writer.writerows(chunk)
+            else:
+                buffer.write(''.join(json.dumps(row) + '\n' for row in chunk))
+            if buffer.tell():
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if len(chunk) < EXPORT_CHUNK:
+                return
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(generate(), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=trades.{fmt}'
+    })
+
+def _open_trades_with_prices():
+    """Open trades with current price and unrealized P&L"""
     open_trades = trade_manager.get_open_trades()
     trades_with_current = []
     
     for trade in open_trades:
         trade_dict = trade.to_dict()
-        # Get current price and calculate unrealized P&L
+        # Current price from the last tick (so the response only changes with it), and unrealized P&L
         if client:
             try:
-                current_price = client.get_current_price(trade.symbol)
+                current_price = ticker_prices.get(trade.symbol) or client.get_current_price(trade.symbol)
                 trade_dict['current_price'] = current_price
                 
                 if trade.side == "BUY":
@@ -406,6 +745,17 @@ def get_open_trades():
         
         trades_with_current.append(trade_dict)
     
+    return trades_with_current
+
+@app.route('/api/trades/open', methods=['GET'])
+@versioned('trades', 'prices')
+def get_open_trades():
+    """Get all currently open/running trades"""
+    global trade_manager, client
+    if not trade_manager:
+        return jsonify({'error': 'Trade manager not initialized'}), 500
+    
+    trades_with_current = _open_trades_with_prices()
     return jsonify({
         'count': len(trades_with_current),
         'trades': trades_with_current
@@ -421,63 +771,91 @@ def close_trade_manual(trade_id):
     trade = trade_manager.get_trade_by_id(trade_id)
     if not trade:
         return jsonify({'error': 'Trade not found'}), 404
-    if trade.status != 'open':
-        return jsonify({'error': 'Trade already closed'}), 400
 
-    try:
-        current_price = client.get_current_price(trade.symbol)
-    except Exception as e:
-        return jsonify({'error': f'Failed to fetch price: {e}'}), 500
+    # Take the trade away from the tick-level exit engine so it can't fire a stop / TP later
+    owner = portfolio or bot
+    engine = owner.exit_engine if owner else None
+    if engine and not engine.claim_trade(trade_id):
+        return jsonify({'error': 'Protective exit already in progress'}), 409
 
-    order_resp = None
-    try:
-        if trade.side.upper() == 'BUY':
-            order_resp = client.place_market_sell(trade.symbol, trade.quantity)
-        else:
-            order_resp = client.place_market_buy(trade.symbol, trade.quantity)
-    except Exception as e:
-        print(f"Manual close order failed, proceeding with record close: {e}")
+    # Claimed while exiting, so a racing close in this process gets nothing; another
+    # process reuses the same client order ID instead of selling again
+    with trade_manager.closing(trade_id) as trade:
+        if not trade:
+            current = trade_manager.get_trade_by_id(trade_id)
+            if current and current.status == 'open':
+                return jsonify({'error': 'Trade is already being closed'}), 409
+            return jsonify({'error': 'Trade already closed'}), 400
+
+        # Cancel the exchange-side OCO first so the position balance is unlocked
+        oco = owner.oco_manager if owner and owner.oco_manager else oco_manager
+        protected_by = oco if trade.oco_order_list_id else None
+        if protected_by and not oco.release(trade_id):
+            if trade.status != 'open':
+                return jsonify({'error': 'Trade already closed by its OCO exit'}), 400
+            return jsonify({'error': 'Could not cancel the OCO exit, try again'}), 409
+
+        # Same client order ID as the bot / exit engine use; an order already placed under
+        # it (even filled) is reused rather than sent again
+        result = execution.execute(close_intent(trade))
+        if not result.ok:
+            # Nothing was sold: put the protection back and leave the trade open
+            print(f"Manual close order failed ({trade.symbol} {trade_id}), re-protecting the trade")
+            _reprotect(trade_id, protected_by, engine)
+            return jsonify({'error': 'Exit order failed, trade left open'}), 502
+        exit_price = result.fill_price
+        if not exit_price:
+            try:
+                exit_price = client.get_current_price(trade.symbol)
+            except Exception as e:
+                return jsonify({'error': f'Failed to fetch price: {e}'}), 500
 
-    order_id = str(order_resp.get('orderId')) if order_resp else None
-    closed_trade = trade_manager.close_trade(
-        trade_id=trade_id,
-        exit_price=current_price,
-        order_id=order_id
-    )
+        # A partial fill closes the part sold; the rest stays open and protected
+        closed_trade = trade_manager.close_part(
+            trade_id,
+            min(result.filled_qty or trade.quantity, trade.quantity),
+            exit_price,
+            order_id=result.order_id
+        )
+        _reprotect(trade_id, protected_by, engine)
 
     if not closed_trade:
         return jsonify({'error': 'Failed to close trade'}), 500
 
     return jsonify({'trade': closed_trade.to_dict()})
 
+def _reprotect(trade_id, oco, engine):
+    """Protect a trade again (OCO if it had one, else the exit engine) if it is still open"""
+    trade = trade_manager.get_trade_by_id(trade_id)
+    if not trade or trade.status != 'open':
+        return
+    if oco and oco.protect(trade):
+        return
+    if engine:
+        engine.add_trade(trade)
+
 @app.route('/api/trades/closed', methods=['GET'])
+@versioned('trades')
 def get_closed_trades():
-    """Get all closed trades with P&L"""
+    """Get closed trades with P&L, latest exit first, one page at a time"""
     global trade_manager
     if not trade_manager:
         return jsonify({'error': 'Trade manager not initialized'}), 500
-    
-    limit = int(request.args.get('limit', 50))
-    closed_trades = trade_manager.get_closed_trades()
-    
-    # Sort by exit time descending
-    trades_sorted = sorted(closed_trades, key=lambda t: t.exit_time or '', reverse=True)[:limit]
-    
-    return jsonify({
-        'total': len(closed_trades),
-        'trades': [t.to_dict() for t in trades_sorted]
-    })
+    return _trade_page('closed')
 
 @app.route('/api/analytics/summary', methods=['GET'])
+@versioned('trades', ttl=60)
 def get_analytics_summary():
     """Get comprehensive P&L analytics summary"""
     global pl_analyzer
     if not pl_analyzer:
         return jsonify({'error': 'Analyzer not initialized'}), 500
     
-    return jsonify(pl_analyzer.get_summary())
+    include_trades = request.args.get('include_trades', 'false').lower() == 'true'
+    return jsonify(pl_analyzer.get_summary(include_trades))
 
 @app.route('/api/analytics/hourly', methods=['GET'])
+@versioned('trades', ttl=60)
 def get_hourly_analytics():
     """Get hourly P&L stats"""
     global pl_analyzer
@@ -488,6 +866,7 @@ def get_hourly_analytics():
     return jsonify(pl_analyzer.get_hourly_stats(hours))
 
 @app.route('/api/analytics/daily', methods=['GET'])
+@versioned('trades', ttl=60)
 def get_daily_analytics():
     """Get daily P&L stats"""
     global pl_analyzer
@@ -498,6 +877,7 @@ def get_daily_analytics():
     return jsonify(pl_analyzer.get_daily_stats(days))
 
 @app.route('/api/analytics/weekly', methods=['GET'])
+@versioned('trades', ttl=60)
 def get_weekly_analytics():
     """Get weekly P&L stats"""
     global pl_analyzer
@@ -508,6 +888,7 @@ def get_weekly_analytics():
     return jsonify(pl_analyzer.get_weekly_stats(weeks))
 
 @app.route('/api/analytics/monthly', methods=['GET'])
+@versioned('trades', ttl=60)
 def get_monthly_analytics():
     """Get monthly P&L stats"""
     global pl_analyzer
@@ -518,40 +899,207 @@ def get_monthly_analytics():
     return jsonify(pl_analyzer.get_monthly_stats(months))
 
 @app.route('/api/analytics/breakdown', methods=['GET'])
+@versioned('trades', ttl=60)
 def get_daily_breakdown():
-    """Get day-by-day breakdown"""
+    """Get day-by-day breakdown (or ?granularity=hour|day|week|month&periods=N&tz=Zone)"""
     global pl_analyzer
     if not pl_analyzer:
         return jsonify({'error': 'Analyzer not initialized'}), 500
     
     days = int(request.args.get('days', 7))
+    tz = request.args.get('tz')
+    granularity = request.args.get('granularity')
+    try:
+        if not granularity:
+            return jsonify({'breakdown': pl_analyzer.get_daily_breakdown(days, tz)})
+        periods = int(request.args.get('periods', days))
+        return jsonify({
+            'granularity': granularity,
+            'timezone': tz or config.ANALYTICS_TIMEZONE or 'local',
+            'breakdown': pl_analyzer.get_breakdown(granularity, periods, tz)
+        })
+    except (ValueError, KeyError) as e:  # Unknown granularity / time zone
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+def _time_arg(name: str):
+    value = request.args.get(name)
+    return datetime.fromisoformat(value) if value else None
+
+def _cached_prices() -> dict:
+    return dict(ticker_prices)
+
+@app.route('/api/analytics/metrics', methods=['GET'])
+@versioned('trades', 'prices')
+def get_risk_metrics():
+    """Get drawdown, Sharpe/Sortino, profit factor, expectancy and exposure (?symbol=&strategy=&since=&until=)"""
+    global pl_analyzer
+    if not pl_analyzer:
+        return jsonify({'error': 'Analyzer not initialized'}), 500
+    
+    try:
+        return jsonify(pl_analyzer.get_metrics(
+            symbol=request.args.get('symbol'),
+            strategy=request.args.get('strategy'),
+            since=_time_arg('since'),
+            until=_time_arg('until'),
+            prices=_cached_prices()
+        ))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+@app.route('/api/analytics/metrics/split', methods=['GET'])
+@versioned('trades')
+def get_risk_metrics_split():
+    """Get risk metrics per strategy or per symbol (?by=strategy|symbol&since=&until=)"""
+    global pl_analyzer
+    if not pl_analyzer:
+        return jsonify({'error': 'Analyzer not initialized'}), 500
+    
+    by = request.args.get('by', 'strategy')
+    try:
+        return jsonify({'by': by, 'splits': pl_analyzer.get_metric_splits(by, _time_arg('since'), _time_arg('until'))})
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+@app.route('/api/analytics/equity', methods=['GET'])
+@versioned('trades')
+def get_equity_curve():
+    """Get the realized equity curve with drawdown (?points=N&symbol=&strategy=)"""
+    global pl_analyzer
+    if not pl_analyzer:
+        return jsonify({'error': 'Analyzer not initialized'}), 500
+    
+    try:
+        points = min(max(int(request.args.get('points', 500)), 2), 5000)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
     return jsonify({
-        'breakdown': pl_analyzer.get_daily_breakdown(days)
+        'starting_equity': pl_analyzer.starting_equity,
+        'curve': pl_analyzer.get_equity_curve(points, request.args.get('symbol'), request.args.get('strategy'))
     })
 
+# ==================== LIVE UPDATES ====================
+#
+# Dashboard state is pushed on Socket.IO channels instead of polled: the
+# publisher thread rebuilds a channel when what it depends on moves (trade
+# store version, price tick, timer) and emits only the changed keys.
+
+LIVE_CLOSED_TRADES = 20  # Latest closed trades kept on the 'closed_trades' channel
+LIVE_INTERVALS = {'balances': 10, 'analytics': 60, 'analysis': 30}  # Timed refresh (seconds)
+PERIOD_STAMPS = ('start_time', 'end_time')  # Move on every summary: left out of the pushed state
+
+live = LiveHub(BOOT_ID, lambda event, payload, room: socketio.emit(event, payload, to=room))
+live_wakeup = threading.Event()
+
+def _live_analytics():
+    if not pl_analyzer:
+        return {}
+    state = {}
+    for key, value in pl_analyzer.get_summary().items():
+        if isinstance(value, dict):
+            value = {k: v for k, v in value.items() if k not in PERIOD_STAMPS}
+        state[key] = value
+    state['breakdown'] = pl_analyzer.get_daily_breakdown(7)
+    return state
+
+def _live_analysis():
+    state = {}
+    for symbol in list(price_cache):
+        try:
+            analysis = _analysis(symbol)
+            if analysis:
+                state[symbol] = analysis
+        except Exception as e:
+            print(f"Live analysis error for {symbol}: {e}")
+    return state
+
+live.add('prices', lambda: dict(price_cache))
+live.add('balances', lambda: client.get_all_balances() if client else {})
+live.add('bot', _bot_status)
+live.add('open_trades', lambda: {t['id']: t for t in _open_trades_with_prices()} if trade_manager else {})
+live.add('closed_trades', lambda: {
+    t.id: t.to_dict() for t in trade_manager.page_trades(LIVE_CLOSED_TRADES, status='closed')[0]
+} if trade_manager else {})
+live.add('analytics', _live_analytics)
+live.add('analysis', _live_analysis)
+
+def publish_live():
+    """Refresh each channel when its inputs change (or its timer runs out)"""
+    listening = None
+    seen_trades = seen_prices = None
+    refreshed = {name: 0 for name in LIVE_INTERVALS}
+    while True:
+        live_wakeup.wait(1)
+        live_wakeup.clear()
+        try:
+            if trade_manager is not listening and trade_manager:
+                trade_manager.add_listener(lambda trade, event: live_wakeup.set())
+                listening = trade_manager
+            trades = _trades_version()
+            prices = price_seq
+            due = {name for name, interval in LIVE_INTERVALS.items()
+                   if time.time() - refreshed[name] >= interval}
+            if trades != seen_trades:
+                due.update(('closed_trades', 'analytics', 'balances'))
+            if prices != seen_prices:
+                due.add('prices')
+            if trades != seen_trades or prices != seen_prices:
+                due.add('open_trades')
+            due.add('bot')  # Cheap to build; only changes are sent
+            seen_trades, seen_prices = trades, prices
+            for name in due:
+                live.channels[name].refresh()
+                if name in refreshed:
+                    refreshed[name] = time.time()
+        except Exception as e:
+            print(f"Live update error: {e}")
+
+live_thread = threading.Thread(target=publish_live, daemon=True)
+if not SPAWNED_WORKER:
+    live_thread.start()
+
 # WebSocket events
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
-    emit('connected', {'status': 'ok'})
+    emit('connected', {'status': 'ok', 'epoch': live.epoch, 'channels': list(live.channels)})
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    live.disconnect(request.sid)
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Join channels: {channels: [...], seqs: {channel: last seq}, epoch}; missed updates or a snapshot follow"""
+    data = data or {}
+    seqs = data.get('seqs') or {}
+    for name in data.get('channels', []):
+        if not live.subscribe(request.sid, name):
+            emit('live_error', {'channel': name, 'error': 'Unknown channel'})
+            continue
+        join_room(name)  # Before catching up: anything published meanwhile arrives (duplicates are skipped)
+        for event, payload in live.catch_up(name, seqs.get(name), data.get('epoch')):
+            emit(event, payload)
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    for name in (data or {}).get('channels', []):
+        live.unsubscribe(request.sid, name)
+        leave_room(name)
+
+@socketio.on('resync')
+def handle_resync(data):
+    """A client saw a sequence gap: resend what it missed (or a snapshot)"""
+    data = data or {}
+    name = data.get('channel')
+    if name in live.channels:
+        for event, payload in live.catch_up(name, data.get('seq'), data.get('epoch')):
+            emit(event, payload)
 
 @socketio.on('subscribe_prices')
 def handle_subscribe_prices(data):
-    """Subscribe to price updates"""
-    symbols = data.get('symbols', ['BTCUSDT', 'ETHUSDT'])
-    
-    def send_prices():
-        while True:
-            prices = {}
-            for symbol in symbols:
-                if client:
-                    price = client.get_current_price(symbol)
-                    prices[symbol] = price
-            emit('price_update', prices)
-            time.sleep(5)
-    
-    thread = threading.Thread(target=send_prices, daemon=True)
-    thread.start()
+    """Subscribe to price updates (same as subscribing to the 'prices' channel)"""
+    handle_subscribe({'channels': ['prices']})
 
 # Import pandas for analysis endpoint
 import pandas as pd
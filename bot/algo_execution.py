@@ -0,0 +1,379 @@
+"""
+Algo Execution - Splits large parent orders into child market orders
+
+Styles:
+    TWAP  equal child orders spaced evenly over the duration
+    VWAP  child sizes weighted by the volume profile of the most recent candles
+    POV   each child trades a fixed share of the market volume seen since the
+          last one; whatever is left is sent at the deadline
+
+Child orders are scheduled on a shared timer wheel and placed through the
+execution pipeline, so many algos run concurrently on a handful of threads.
+When an algo finishes, one consolidated Trade is written at the average
+fill price.
+"""
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+import config
+from exchange.binance_client import BinanceClient
+from exchange.execution import ExecutionPipeline, ExecutionResult, OrderIntent
+from utils.logger import setup_logger
+from utils.timer_wheel import Timer, TimerWheel
+from utils.trade_manager import TradeManager
+
+logger = setup_logger('AlgoExecution')
+
+ALGO_STYLES = ('TWAP', 'VWAP', 'POV')
+
+# Candle intervals usable for VWAP volume profiles / POV volume estimates
+PROFILE_INTERVALS = [('1m', 60), ('3m', 180), ('5m', 300), ('15m', 900), ('30m', 1800), ('1h', 3600)]
+
+MAX_FINISHED_ALGOS = 200  # Finished algos kept for status
+
+
+@dataclass
+class AlgoOrder:
+    """A parent order being worked by the engine"""
+    id: str
+    symbol: str
+    side: str
+    quantity: float
+    style: str
+    duration_seconds: float
+    slices: int
+    participation_rate: float
+    strategy: Optional[str] = None
+    close_trade_id: Optional[str] = None  # Exit algo: close this trade instead of opening one
+    status: str = 'running'  # running, cancelling, filled, partial, cancelled, failed
+    sent_qty: float = 0.0
+    filled_qty: float = 0.0
+    notional: float = 0.0
+    children_sent: int = 0
+    children_done: int = 0
+    order_ids: List[str] = field(default_factory=list)
+    trade_id: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def avg_price(self) -> Optional[float]:
+        return self.notional / self.filled_qty if self.filled_qty > 0 else None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('filled', 'partial', 'cancelled', 'failed')
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'side': self.side,
+            'quantity': self.quantity,
+            'style': self.style,
+            'duration_seconds': self.duration_seconds,
+            'status': self.status,
+            'filled_qty': self.filled_qty,
+            'avg_price': self.avg_price,
+            'progress_pct': self.filled_qty / self.quantity * 100 if self.quantity else 0,
+            'children_sent': self.children_sent,
+            'children_done': self.children_done,
+            'trade_id': self.trade_id,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class AlgoExecutionEngine:
+    """Runs TWAP / VWAP / POV parent orders concurrently"""
+
+    def __init__(
+        self,
+        client: BinanceClient,
+        trade_manager: TradeManager,
+        execution: ExecutionPipeline = None,
+        market_data=None,
+        wheel: TimerWheel = None
+    ):
+        self.client = client
+        self.trade_manager = trade_manager
+        self.execution = execution or ExecutionPipeline(client)
+        self.market_data = market_data or client
+        self.wheel = wheel or TimerWheel()
+        self.algos: Dict[str, AlgoOrder] = {}
+        self.listeners: List[Callable[[AlgoOrder], None]] = []
+        self._timers: Dict[str, List[Timer]] = {}
+        self._done_sending = set()
+        self._lock = threading.RLock()
+
+    def add_listener(self, callback: Callable[[AlgoOrder], None]):
+        """Register callback(algo) for finished algos"""
+        self.listeners.append(callback)
+
+    def start(self):
+        """Start the timer wheel"""
+        self.wheel.start()
+
+    def stop(self):
+        """Cancel running algos and stop the timer wheel"""
+        for algo_id in [a.id for a in self.algos.values() if not a.done]:
+            self.cancel(algo_id)
+        self.wheel.stop()
+
+    def submit(
+        self,
+        symbol: str,
+        side: str,
+        quantity: float,
+        style: str = 'TWAP',
+        duration_seconds: float = None,
+        slices: int = None,
+        participation_rate: float = None,
+        strategy: str = None,
+        close_trade_id: str = None
+    ) -> AlgoOrder:
+        """Start working a parent order"""
+        style = style.upper()
+        if style not in ALGO_STYLES:
+            raise ValueError(f"Unknown algo style {style} (expected one of {', '.join(ALGO_STYLES)})")
+        if close_trade_id:
+            trade = self.trade_manager.get_trade_by_id(close_trade_id)
+            if not trade or trade.status != 'open':
+                raise ValueError(f"Trade {close_trade_id} is not open")
+            if trade.symbol != symbol or trade.side.upper() == side.upper():
+                raise ValueError(f"A {side.upper()} {symbol} algo can't exit {trade.side} {trade.symbol} "
+                                 f"trade {close_trade_id}")
+            if quantity > trade.quantity + 1e-12:
+                raise ValueError(f"Quantity {quantity} exceeds trade {close_trade_id} ({trade.quantity})")
+
+        algo = AlgoOrder(
+            id=f"ALGO-{uuid.uuid4().hex[:12]}",
+            symbol=symbol,
+            side=side.upper(),
+            quantity=quantity,
+            style=style,
+            duration_seconds=duration_seconds or config.ALGO_DURATION_SECONDS,
+            slices=max(1, slices or config.ALGO_SLICES),
+            participation_rate=participation_rate or config.ALGO_PARTICIPATION_RATE,
+            strategy=strategy,
+            close_trade_id=close_trade_id
+        )
+        with self._lock:
+            self.algos[algo.id] = algo
+            self._timers[algo.id] = []
+
+        if style == 'POV':
+            self._schedule(algo, 0, self._send_pov_child, algo, 0)
+        else:
+            plan = self._plan(algo)
+            for i, (delay, qty) in enumerate(plan):
+                self._schedule(algo, delay, self._send_child, algo, qty, i == len(plan) - 1)
+
+        logger.info(f"🧮 {style} {algo.side} {quantity} {symbol} over "
+                    f"{algo.duration_seconds:.0f}s started ({algo.id})")
+        return algo
+
+    def cancel(self, algo_id: str) -> bool:
+        """Stop sending child orders (fills so far are kept)"""
+        with self._lock:
+            algo = self.algos.get(algo_id)
+            if not algo or algo.done or algo.status == 'cancelling':
+                return False
+            algo.status = 'cancelling'
+            for timer in self._timers.get(algo_id, []):
+                timer.cancel()
+            self._done_sending.add(algo_id)
+        self._maybe_finish(algo)
+        return True
+
+    def get(self, algo_id: str) -> Optional[AlgoOrder]:
+        return self.algos.get(algo_id)
+
+    def status(self) -> Dict:
+        """Get running and recently finished algos"""
+        with self._lock:
+            algos = [a.to_dict() for a in self.algos.values()]
+        return {
+            'running': sum(1 for a in algos if a['status'] in ('running', 'cancelling')),
+            'algos': algos
+        }
+
+    # --- scheduling -----------------------------------------------------
+
+    def _schedule(self, algo: AlgoOrder, delay: float, callback: Callable, *args):
+        if delay <= 0:
+            callback(*args)
+            return
+        timer = self.wheel.schedule(delay, callback, *args)
+        with self._lock:
+            self._timers[algo.id].append(timer)
+
+    def _round(self, symbol: str, quantity: float) -> float:
+        return float(self.client.round_quantity(symbol, quantity))
+
+    def _profile_interval(self, spacing: float) -> str:
+        """Largest candle interval that fits inside one slice"""
+        chosen = PROFILE_INTERVALS[0][0]
+        for interval, seconds in PROFILE_INTERVALS:
+            if seconds <= spacing:
+                chosen = interval
+        return chosen
+
+    def _weights(self, algo: AlgoOrder, spacing: float) -> List[float]:
+        if algo.style == 'VWAP':
+            df = self.market_data.get_historical_klines(
+                algo.symbol, interval=self._profile_interval(spacing), limit=algo.slices)
+            if not df.empty and df['volume'].sum() > 0:
+                volumes = list(df['volume'])[-algo.slices:]
+                volumes += [sum(volumes) / len(volumes)] * (algo.slices - len(volumes))
+                return volumes
+            logger.warning(f"No volume profile for {algo.symbol}, falling back to TWAP")
+        return [1.0] * algo.slices
+
+    def _plan(self, algo: AlgoOrder) -> List[Tuple[float, float]]:
+        """(delay_seconds, quantity) per child; lot-size dust rolls into the next child"""
+        spacing = algo.duration_seconds / algo.slices
+        weights = self._weights(algo, spacing)
+        total = sum(weights)
+        plan = []
+        carry = 0.0
+        remaining = algo.quantity
+        for i, weight in enumerate(weights):
+            target = remaining if i == len(weights) - 1 else algo.quantity * weight / total + carry
+            qty = min(self._round(algo.symbol, target), remaining)
+            carry = target - qty
+            if qty > 0:
+                plan.append((i * spacing, qty))
+                remaining = round(remaining - qty, 12)
+        return plan or [(0, algo.quantity)]
+
+    # --- child orders ---------------------------------------------------
+
+    def _send_child(self, algo: AlgoOrder, quantity: float, last: bool = False):
+        with self._lock:
+            if algo.status != 'running':
+                return
+            algo.children_sent += 1
+            algo.sent_qty += quantity
+            index = algo.children_sent
+            if last:
+                self._done_sending.add(algo.id)
+
+        intent = OrderIntent(
+            symbol=algo.symbol,
+            side=algo.side,
+            quantity=quantity,
+            key=f"{algo.id}:{index}"
+        )
+        future = self.execution.submit(intent)
+        future.add_done_callback(lambda f: self._on_child_done(algo, f))
+
+    def _market_volume(self, symbol: str, seconds: float) -> float:
+        """Estimate market volume traded over the last `seconds` from 1m candles"""
+        minutes = max(1, round(seconds / 60))
+        df = self.market_data.get_historical_klines(symbol, interval='1m', limit=minutes + 1)
+        if df.empty:
+            return 0.0
+        per_second = df['volume'].iloc[:-1].mean() / 60 if len(df) > 1 else df['volume'].iloc[-1] / 60
+        return per_second * seconds
+
+    def _send_pov_child(self, algo: AlgoOrder, round_: int):
+        if algo.status != 'running':
+            return
+        spacing = algo.duration_seconds / algo.slices
+        remaining = round(algo.quantity - algo.sent_qty, 12)
+        last = round_ >= algo.slices - 1  # Rounds run `spacing` apart on the wheel: this one is at the deadline
+
+        if last:
+            qty = remaining  # Complete at the deadline regardless of volume
+        else:
+            target = algo.participation_rate * self._market_volume(algo.symbol, spacing)
+            qty = min(self._round(algo.symbol, target), remaining)
+            last = qty >= remaining
+
+        if qty > 0:
+            self._send_child(algo, qty, last)
+        if not last:
+            self._schedule(algo, spacing, self._send_pov_child, algo, round_ + 1)
+
+    def _on_child_done(self, algo: AlgoOrder, future):
+        try:
+            result: ExecutionResult = future.result()
+        except Exception as e:
+            logger.error(f"Child order for {algo.id} failed: {e}")
+            result = None
+        with self._lock:
+            algo.children_done += 1
+            if result and result.ok and result.fill_price:
+                qty = result.filled_qty or result.intent.quantity
+                algo.filled_qty += qty
+                algo.notional += qty * result.fill_price
+                algo.order_ids.append(result.order_id)
+        self._maybe_finish(algo)
+
+    # --- completion -----------------------------------------------------
+
+    def _maybe_finish(self, algo: AlgoOrder):
+        with self._lock:
+            if algo.done or algo.id not in self._done_sending or algo.children_done < algo.children_sent:
+                return
+            if algo.status == 'cancelling':
+                algo.status = 'cancelled'
+            elif algo.filled_qty <= 0:
+                algo.status = 'failed'
+            elif algo.filled_qty < algo.quantity * 0.999:
+                algo.status = 'partial'
+            else:
+                algo.status = 'filled'
+            algo.finished_at = time.time()
+            self._timers.pop(algo.id, None)
+            self._done_sending.discard(algo.id)
+            finished = [a.id for a in self.algos.values() if a.done]
+            for algo_id in finished[:-MAX_FINISHED_ALGOS]:
+                del self.algos[algo_id]
+
+        if algo.filled_qty > 0:
+            self._record_trade(algo)
+        logger.info(f"🧮 {algo.style} {algo.id} {algo.status}: {algo.filled_qty} {algo.symbol}"
+                    + (f" @ ${algo.avg_price:,.2f}" if algo.avg_price else ""))
+        for listener in self.listeners:
+            try:
+                listener(algo)
+            except Exception as e:
+                logger.error(f"Error in algo listener: {e}")
+
+    def _record_trade(self, algo: AlgoOrder):
+        """Write the consolidated Trade (or close the one this algo exits)"""
+        order_id = f"{algo.id}:{len(algo.order_ids)}"
+        if algo.close_trade_id:
+            self._record_exit(algo, order_id)
+            return
+
+        sign = 1 if algo.side == 'BUY' else -1
+        trade = self.trade_manager.open_trade(
+            symbol=algo.symbol,
+            side=algo.side,
+            quantity=algo.filled_qty,
+            entry_price=algo.avg_price,
+            order_id=order_id,
+            strategy=algo.strategy,
+            take_profit=algo.avg_price * (1 + sign * config.TAKE_PROFIT_PERCENT / 100),
+            stop_loss=algo.avg_price * (1 - sign * config.STOP_LOSS_PERCENT / 100)
+        )
+        algo.trade_id = trade.id
+
+    def _record_exit(self, algo: AlgoOrder, order_id: str):
+        """Close the exited trade, or split off the part sold when the algo stopped short"""
+        tm = self.trade_manager
+        with tm.closing(algo.close_trade_id) as trade:
+            if not trade:
+                logger.warning(f"⚠️ {algo.id} exited {algo.filled_qty} {algo.symbol} but trade "
+                               f"{algo.close_trade_id} is no longer open")
+                return
+            # Partial / cancelled exits split off the part sold; the rest stays open
+            sold = trade.quantity if algo.status == 'filled' and algo.quantity >= trade.quantity * 0.999 \
+                else min(algo.filled_qty, trade.quantity)
+            closed = tm.close_part(trade.id, sold, algo.avg_price, order_id=order_id)
+            algo.trade_id = closed.id if closed else None
@@ -0,0 +1,84 @@
+"""
+Market Data Feed - Shared price and candle cache for many bots in one process
+"""
+import threading
+import time
+from typing import Dict, Tuple
+import pandas as pd
+import config
+from exchange.binance_client import BinanceClient
+from utils.logger import setup_logger
+
+logger = setup_logger('MarketData')
+
+
+class MarketDataFeed:
+    """Polls each market once per TTL no matter how many bots read it"""
+
+    # Candles refetched when a cached window goes stale (live bar + a closed one)
+    REFRESH_LIMIT = 3
+
+    def __init__(self, client: BinanceClient, ttl_seconds: float = None):
+        self.client = client
+        self.ttl = config.MARKET_DATA_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._prices: Dict[str, float] = {}
+        self._prices_time = 0.0
+        self._prices_lock = threading.Lock()
+        self._klines: Dict[Tuple[str, str], Tuple[float, pd.DataFrame]] = {}
+        self._kline_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _kline_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_lock:
+            return self._kline_locks.setdefault(key, threading.Lock())
+
+    def refresh_prices(self):
+        """Fetch all ticker prices in a single request"""
+        prices = self.client.get_all_prices()
+        if prices:
+            self._prices = prices
+            self._prices_time = time.monotonic()
+
+    def get_current_price(self, symbol: str) -> float:
+        """Get price from the shared ticker snapshot"""
+        with self._prices_lock:
+            if time.monotonic() - self._prices_time > self.ttl:
+                self.refresh_prices()
+        price = self._prices.get(symbol)
+        if price is None:
+            return self.client.get_current_price(symbol)
+        return price
+
+    def get_historical_klines(
+        self,
+        symbol: str,
+        interval: str = '1h',
+        limit: int = 100
+    ) -> pd.DataFrame:
+        """Get candles, shared between bots and refreshed incrementally"""
+        key = (symbol, interval)
+        with self._kline_lock(key):
+            now = time.monotonic()
+            entry = self._klines.get(key)
+            if entry and len(entry[1]) >= limit:
+                fetched_at, cached = entry
+                if now - fetched_at <= self.ttl:
+                    return cached.iloc[-limit:]
+
+                fresh = self.client.get_historical_klines(symbol, interval, self.REFRESH_LIMIT)
+                if not fresh.empty and fresh.index[0] <= cached.index[-1]:
+                    merged = pd.concat([cached[cached.index < fresh.index[0]], fresh])
+                    merged = merged.iloc[-len(cached):]
+                    self._klines[key] = (now, merged)
+                    return merged.iloc[-limit:]
+
+            df = self.client.get_historical_klines(symbol, interval, limit)
+            if not df.empty:
+                self._klines[key] = (now, df)
+            return df
+
+    def clear(self):
+        """Drop all cached market data"""
+        self._prices = {}
+        self._prices_time = 0.0
+        self._klines = {}
@@ -0,0 +1,210 @@
+"""
+OCO Protection - Exchange-side take-profit + stop-limit orders for open trades
+
+An OCO sell is placed right after an entry fills, so exits run at exchange
+speed even when our process is slow or down. Fills arrive over the user
+data stream and are written back to TradeManager.
+"""
+import threading
+from typing import Callable, Dict, List, Optional
+import config
+from exchange.binance_client import BinanceClient
+from exchange.user_stream import UserDataStream, user_stream_for
+from utils.logger import setup_logger
+from utils.trade_manager import Trade, TradeManager
+
+logger = setup_logger('OCOProtection')
+
+
+class OCOProtectionManager:
+    """Places, tracks, cancels and reconciles OCO exits"""
+
+    def __init__(
+        self,
+        client: BinanceClient,
+        trade_manager: TradeManager,
+        user_stream: UserDataStream = None
+    ):
+        self.client = client
+        self.trade_manager = trade_manager
+        self.user_stream = user_stream or user_stream_for(client)
+        self.listeners: List[Callable[[Trade, str], None]] = []
+        self._by_list: Dict[str, str] = {}  # orderListId -> trade_id
+        self._lock = threading.Lock()
+        self.user_stream.on('executionReport', self._on_execution_report)
+
+    def add_listener(self, callback: Callable[[Trade, str], None]):
+        """Register callback(closed_trade, reason) for OCO fills"""
+        self.listeners.append(callback)
+
+    def start(self):
+        """Reconcile trades protected while we were down, then stream fills"""
+        self.reconcile()
+        self.user_stream.start()
+        logger.info(f"🛡️ OCO protection started ({len(self._by_list)} active OCOs)")
+
+    def stop(self):
+        """Stop streaming (OCOs stay live on the exchange)"""
+        self.user_stream.stop()
+
+    def protect(self, trade: Trade) -> bool:
+        """Place an OCO exit for a freshly filled long entry"""
+        if trade.side.upper() != 'BUY' or not trade.take_profit or not trade.stop_loss:
+            return False
+
+        stop_limit = trade.stop_loss * (1 - config.OCO_STOP_LIMIT_OFFSET_PERCENT / 100)
+        response = self.client.place_oco_sell(
+            trade.symbol,
+            trade.quantity,
+            take_profit=trade.take_profit,
+            stop_price=trade.stop_loss,
+            stop_limit_price=stop_limit
+        )
+        if not response:
+            return False
+
+        list_id = str(response.get('orderListId'))
+        order_ids = [o['orderId'] for o in response.get('orders', [])]
+        with self._lock:
+            self._by_list[list_id] = trade.id
+        self.trade_manager.update_trade(trade.id, oco_order_list_id=list_id, oco_order_ids=order_ids)
+        trade.oco_order_list_id = list_id
+        trade.oco_order_ids = order_ids
+        return True
+
+    def release(self, trade_id: str) -> bool:
+        """Cancel a trade's OCO before exiting it another way.
+
+        Returns False if the OCO already filled (the trade is closed; don't sell).
+        """
+        trade = self.trade_manager.get_trade_by_id(trade_id)
+        if not trade or trade.status != 'open':
+            return False
+        if not trade.oco_order_list_id:
+            return True
+
+        with self._lock:
+            self._by_list.pop(trade.oco_order_list_id, None)
+
+        # Cancelling either leg cancels the whole order list
+        if trade.oco_order_ids and self.client.cancel_order(trade.symbol, trade.oco_order_ids[0]):
+            self.trade_manager.update_trade(trade_id, oco_order_list_id=None, oco_order_ids=None)
+            return True
+
+        # Cancel failed: the OCO may have just filled
+        if self._reconcile_trade(trade):
+            return False
+        if self._cancelled(trade):
+            self.trade_manager.update_trade(trade_id, oco_order_list_id=None, oco_order_ids=None)
+            return True
+
+        # Not confirmed either way (e.g. network error): keep tracking the OCO, don't sell
+        logger.warning(f"⚠️ Could not confirm OCO {trade.oco_order_list_id} of {trade_id} is cancelled")
+        with self._lock:
+            self._by_list[trade.oco_order_list_id] = trade.id
+        return False
+
+    def _cancelled(self, trade: Trade) -> bool:
+        """True if the exchange reports every OCO leg as no longer working (nothing filled)"""
+        if not trade.oco_order_ids:
+            return False
+        for order_id in trade.oco_order_ids:
+            order = self.client.get_order_status(trade.symbol, order_id)
+            if not order or order.get('status') not in ('CANCELED', 'EXPIRED', 'REJECTED'):
+                return False
+        return True
+
+    def _fill_from_order(self, order: dict) -> Optional[float]:
+        executed = float(order.get('executedQty', 0) or 0)
+        quote = float(order.get('cummulativeQuoteQty', 0) or 0)
+        return quote / executed if executed > 0 else None
+
+    def _reconcile_trade(self, trade: Trade) -> bool:
+        """Close trade if one of its OCO legs filled; returns True if closed"""
+        for order_id in trade.oco_order_ids or []:
+            order = self.client.get_order_status(trade.symbol, order_id)
+            if not order:
+                continue
+            reason = 'TAKE_PROFIT' if order.get('type') == 'LIMIT_MAKER' else 'STOP_LOSS'
+            price = self._fill_from_order(order) or float(order.get('price', 0))
+            if order.get('status') == 'FILLED':
+                self._close(trade.id, price, str(order_id), reason)
+                return True
+            if order.get('status') == 'PARTIALLY_FILLED':
+                self._split_fill(trade.id, float(order.get('origQty', 0) or 0),
+                                 float(order.get('executedQty', 0) or 0), price, str(order_id), reason)
+        return False
+
+    def reconcile(self):
+        """Sync OCO-protected open trades with their order status on the exchange"""
+        for trade in self.trade_manager.get_open_trades():
+            if not trade.oco_order_list_id:
+                continue
+            if not self._reconcile_trade(trade):
+                with self._lock:
+                    self._by_list[trade.oco_order_list_id] = trade.id
+
+    def _on_execution_report(self, event: dict):
+        list_id = str(event.get('g', -1))
+        status = event.get('X')
+        if list_id == '-1' or status not in ('PARTIALLY_FILLED', 'FILLED'):
+            return
+        with self._lock:
+            # A partly filled leg keeps working, so its list stays tracked
+            trade_id = self._by_list.pop(list_id, None) if status == 'FILLED' \
+                else self._by_list.get(list_id)
+        if not trade_id:
+            return
+
+        filled_qty = float(event.get('z', 0) or 0)
+        price = float(event.get('Z', 0)) / filled_qty if filled_qty else float(event.get('L', 0))
+        reason = 'TAKE_PROFIT' if event.get('o') == 'LIMIT_MAKER' else 'STOP_LOSS'
+        if status == 'FILLED':
+            self._close(trade_id, price, str(event.get('i')), reason)
+        else:
+            self._split_fill(trade_id, float(event.get('q', 0) or 0), filled_qty,
+                             float(event.get('L', 0) or 0) or price, str(event.get('i')), reason)
+
+    def _split_fill(self, trade_id: str, order_qty: float, executed: float, price: float,
+                    order_id: str, reason: str):
+        """Close the part of a trade its OCO leg has filled so far; the rest stays open.
+
+        The leg was placed for the whole trade, so whatever the trade lost since then
+        was split off by earlier reports.
+        """
+        trade = self.trade_manager.get_trade_by_id(trade_id)
+        if not trade or trade.status != 'open':
+            return
+        sold = round(executed - max(0.0, order_qty - trade.quantity), 12)
+        if sold <= 0:
+            return
+        closed = self.trade_manager.close_part(trade_id, sold, price, order_id=order_id)
+        if closed and closed.id == trade_id:
+            with self._lock:
+                self._by_list.pop(trade.oco_order_list_id, None)
+            self._announce(closed, reason)
+        elif closed:
+            logger.info(f"🧩 OCO {reason} partly filled for {trade_id}: {sold} @ ${price:,.2f}")
+
+    def _close(self, trade_id: str, exit_price: float, order_id: str, reason: str):
+        closed = self.trade_manager.close_trade(
+            trade_id=trade_id,
+            exit_price=exit_price,
+            order_id=order_id
+        )
+        if closed:
+            self._announce(closed, reason)
+
+    def _announce(self, closed: Trade, reason: str):
+        emoji = "🎯" if reason == 'TAKE_PROFIT' else "⚠️"
+        logger.info(f"{emoji} OCO {reason} filled for {closed.id} @ ${closed.exit_price:,.2f}")
+        for listener in self.listeners:
+            try:
+                listener(closed, reason)
+            except Exception as e:
+                logger.error(f"Error in OCO listener: {e}")
+
+    def status(self) -> Dict:
+        """Get active OCO order lists"""
+        with self._lock:
+            return {'active': [{'order_list_id': k, 'trade_id': v} for k, v in self._by_list.items()]}
@@ -0,0 +1,274 @@
+"""
+Portfolio Runner - Runs many (symbol, strategy, quantity) slots in one process
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+import config
+from bot.market_data import MarketDataFeed
+from bot.protective_exits import ProtectiveExitEngine
+from bot.oco_protection import OCOProtectionManager
+from bot.algo_execution import AlgoExecutionEngine
+from bot.trading_bot import STRATEGIES, TradingBot
+from exchange.binance_client import BinanceClient
+from exchange.execution import ExecutionPipeline
+from exchange.maker_execution import MakerExecutor
+from exchange.paper_exchange import create_client
+from strategies.combined_strategy import CombinedStrategy
+from utils.logger import setup_logger
+from utils.trade_manager import TradeManager
+
+logger = setup_logger('Portfolio')
+
+
+@dataclass
+class SlotConfig:
+    """One trading slot of the portfolio"""
+    id: str
+    symbol: str
+    strategy: str = 'combined'
+    quantity: float = None
+    interval: str = '1h'
+    enabled: bool = True
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SlotConfig':
+        slot = cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+        slot.symbol = slot.symbol.upper()
+        slot.quantity = float(slot.quantity or config.TRADE_QUANTITY)
+        return slot
+
+
+def load_portfolio_config(path: str = None) -> dict:
+    """Load portfolio config file: {"interval_seconds": 60, "slots": [...]}"""
+    path = path or config.PORTFOLIO_CONFIG
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    slots = [SlotConfig.from_dict(s) for s in data.get('slots', [])]
+    ids = [s.id for s in slots]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"Duplicate slot ids in {path}")
+    # A slot finds its open trade by (symbol, strategy): two such slots would adopt each other's trades
+    owners = {}
+    for slot in slots:
+        key = (slot.symbol, STRATEGIES.get(slot.strategy.lower(), CombinedStrategy).__name__)
+        if key in owners:
+            raise ValueError(f"Slots {owners[key]} and {slot.id} in {path} both trade "
+                             f"{key[0]} with {key[1]}")
+        owners[key] = slot.id
+
+    return {
+        'interval_seconds': int(data.get('interval_seconds', 60)),
+        'slots': slots
+    }
+
+
+def close_positions_parallel(bots: List[TradingBot]):
+    """Close every bot's open position at once (orders run on the shared pipeline)"""
+    open_bots = [bot for bot in bots if bot.in_position]
+    if not open_bots:
+        return
+    logger.info(f"🔴 Closing {len(open_bots)} open positions...")
+    with ThreadPoolExecutor(max_workers=min(len(open_bots), config.EXECUTION_WORKERS)) as pool:
+        list(pool.map(lambda bot: bot.close_all_positions(), open_bots))
+
+
+class PortfolioRunner:
+    """Hosts many bot slots on one exchange client, feed and trade manager"""
+
+    def __init__(
+        self,
+        slots: List[SlotConfig],
+        interval_seconds: int = 60,
+        client: BinanceClient = None,
+        trade_manager: TradeManager = None,
+        on_tick: Callable[[Dict], None] = None
+    ):
+        self.client = client or create_client()
+        self.trade_manager = trade_manager or TradeManager()
+        self.market_data = MarketDataFeed(self.client)
+        self.execution = ExecutionPipeline(self.client)
+        self.exit_engine = ProtectiveExitEngine(self.client, self.trade_manager,
+                                                execution=self.execution) \
+            if config.TICK_EXITS_ENABLED else None
+        self.oco_manager = OCOProtectionManager(self.client, self.trade_manager) \
+            if config.EXCHANGE_OCO_ENABLED else None
+        self.algo_engine = AlgoExecutionEngine(self.client, self.trade_manager,
+                                               execution=self.execution,
+                                               market_data=self.market_data) \
+            if config.ALGO_EXECUTION != 'MARKET' else None
+        self.maker = MakerExecutor(self.client, execution=self.execution) \
+            if config.EXECUTION_MODE == 'MAKER' else None
+        self.interval_seconds = interval_seconds
+        self.on_tick = on_tick
+
+        self.slot_configs: Dict[str, SlotConfig] = {s.id: s for s in slots}
+        self.bots: Dict[str, TradingBot] = {}
+        self.active: Dict[str, bool] = {}
+        self.last_results: Dict[str, Optional[str]] = {}
+        self.running = False
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()  # Cuts the loop's sleep short on stop()
+        self._lock = threading.RLock()
+
+        for slot in slots:
+            self._create_bot(slot)
+            self.active[slot.id] = slot.enabled
+
+        logger.info(f"📂 Portfolio initialized with {len(slots)} slots")
+
+    @classmethod
+    def from_config(cls, path: str = None, **kwargs) -> 'PortfolioRunner':
+        """Create runner from a portfolio config file"""
+        cfg = load_portfolio_config(path)
+        return cls(cfg['slots'], interval_seconds=cfg['interval_seconds'], **kwargs)
+
+    def _create_bot(self, slot: SlotConfig) -> TradingBot:
+        bot = TradingBot(
+            symbol=slot.symbol,
+            quantity=slot.quantity,
+            strategy=slot.strategy,
+            interval=slot.interval,
+            client=self.client,
+            trade_manager=self.trade_manager,
+            market_data=self.market_data,
+            slot_id=slot.id,
+            exit_engine=self.exit_engine,
+            oco_manager=self.oco_manager,
+            execution=self.execution,
+            algo_engine=self.algo_engine,
+            maker=self.maker
+        )
+        self.bots[slot.id] = bot
+        return bot
+
+    def run_once(self) -> Dict[str, Optional[str]]:
+        """Run one tick over all active slots"""
+        self.market_data.refresh_prices()
+        results = {}
+        with self._lock:
+            active_ids = [slot_id for slot_id, on in self.active.items() if on]
+        for slot_id in active_ids:
+            bot = self.bots[slot_id]
+            results[slot_id] = bot.run_once()
+        self.last_results.update(results)
+        return results
+
+    def _loop(self):
+        while self.running:
+            started = time.monotonic()
+            try:
+                results = self.run_once()
+                if self.on_tick:
+                    self.on_tick({'results': results, 'slots': self.status()['slots']})
+            except Exception as e:
+                logger.error(f"Error in portfolio loop: {e}")
+            elapsed = time.monotonic() - started
+            self._wake.wait(max(0.0, self.interval_seconds - elapsed))
+
+    def start(self):
+        """Start running all enabled slots in a background thread"""
+        if self.running:
+            return
+        self.running = True
+        self._wake.clear()
+        if self.oco_manager:
+            self.oco_manager.start()
+        if self.exit_engine:
+            self.exit_engine.start()
+        if self.algo_engine:
+            self.algo_engine.start()
+        if self.maker:
+            self.maker.start()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        logger.info(f"🚀 Portfolio started - {sum(self.active.values())} active slots, "
+                    f"every {self.interval_seconds}s")
+
+    def run(self):
+        """Run in the foreground until stopped"""
+        self.running = True
+        self._wake.clear()
+        if self.oco_manager:
+            self.oco_manager.start()
+        if self.exit_engine:
+            self.exit_engine.start()
+        if self.algo_engine:
+            self.algo_engine.start()
+        if self.maker:
+            self.maker.start()
+        self._loop()
+
+    def stop(self, close_positions: bool = True):
+        """Stop the runner (optionally closing every open slot position)"""
+        self.running = False
+        logger.info("🛑 Stopping portfolio...")
+        # Let the tick in flight finish so it can't open a position after the closes below
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        if close_positions:
+            close_positions_parallel(list(self.bots.values()))
+        for bot in self.bots.values():
+            bot.save_snapshot()
+        if self.exit_engine:
+            self.exit_engine.stop()
+        if self.algo_engine:
+            self.algo_engine.stop()
+        if self.maker:
+            self.maker.stop()
+        if self.oco_manager:
+            self.oco_manager.stop()
+        self.execution.shutdown()
+        logger.info("🛑 Portfolio stopped")
+
+    def start_slot(self, slot_id: str) -> bool:
+        """Resume trading on one slot"""
+        if slot_id not in self.bots:
+            return False
+        with self._lock:
+            self.active[slot_id] = True
+        logger.info(f"▶️ Slot {slot_id} started")
+        return True
+
+    def stop_slot(self, slot_id: str, close_position: bool = False) -> bool:
+        """Pause trading on one slot"""
+        if slot_id not in self.bots:
+            return False
+        with self._lock:
+            self.active[slot_id] = False
+        if close_position:
+            self.bots[slot_id].close_all_positions()
+        logger.info(f"⏸️ Slot {slot_id} stopped")
+        return True
+
+    def slot_status(self, slot_id: str) -> Optional[Dict]:
+        """Get status for one slot"""
+        bot = self.bots.get(slot_id)
+        if not bot:
+            return None
+        return {
+            **asdict(self.slot_configs[slot_id]),
+            'active': self.active.get(slot_id, False),
+            'in_position': bot.in_position,
+            'entry_price': bot.entry_price,
+            'current_trade_id': bot.current_trade_id,
+            'last_action': self.last_results.get(slot_id),
+            'trades': len(bot.trades)
+        }
+
+    def status(self) -> Dict:
+        """Get status for the whole portfolio"""
+        return {
+            'running': self.running,
+            'interval_seconds': self.interval_seconds,
+            'slots': [self.slot_status(slot_id) for slot_id in self.bots]
+        }
+
+    def latency(self) -> Dict:
+        """Get latency summaries per slot"""
+        return {slot_id: bot.get_latency_summary() for slot_id, bot in self.bots.items()}
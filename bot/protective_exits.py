@@ -0,0 +1,306 @@
+"""
+Protective Exit Engine - Tick-level stop-loss / take-profit for open trades
+
+Exit levels are kept per symbol in sorted lists, so each price update only
+looks at the ends of the lists (triggered levels) instead of every position.
+"""
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import config
+from exchange.binance_client import BinanceClient
+from exchange.execution import ExecutionPipeline, close_intent
+from exchange.market_stream import MarketStream, market_stream_for
+from utils.logger import setup_logger
+from utils.trade_manager import Trade, TradeManager
+
+logger = setup_logger('ProtectiveExits')
+
+# Minimum seconds between persisting a trailed stop for the same trade
+TRAIL_PERSIST_SECONDS = 5
+
+
+class _Position:
+    """Exit levels being watched for one open trade"""
+    __slots__ = ('trade_id', 'symbol', 'is_long', 'quantity', 'stop', 'take_profit',
+                 'extreme', 'last_persist', 'exit_intent')
+
+    def __init__(self, trade: Trade):
+        self.trade_id = trade.id
+        self.symbol = trade.symbol
+        self.is_long = trade.side.upper() == 'BUY'
+        self.quantity = trade.quantity
+        sign = 1 if self.is_long else -1
+        self.stop = trade.stop_loss or trade.entry_price * (1 - sign * config.STOP_LOSS_PERCENT / 100)
+        self.take_profit = trade.take_profit or \
+            trade.entry_price * (1 + sign * config.TAKE_PROFIT_PERCENT / 100)
+        self.extreme = trade.entry_price  # Peak (long) / trough (short) for trailing
+        self.last_persist = 0.0
+        self.exit_intent = close_intent(trade)
+
+
+class _SymbolLevels:
+    """Sorted (price, trade_id) lists for one symbol"""
+
+    def __init__(self):
+        self.long_stops: List[Tuple[float, str]] = []     # hit when bid <= level (tail)
+        self.long_targets: List[Tuple[float, str]] = []   # hit when bid >= level (head)
+        self.short_stops: List[Tuple[float, str]] = []    # hit when ask >= level (head)
+        self.short_targets: List[Tuple[float, str]] = []  # hit when ask <= level (tail)
+        self.long_peaks: List[Tuple[float, str]] = []     # peaks below bid need trailing (head)
+        self.short_troughs: List[Tuple[float, str]] = []  # troughs above ask need trailing (tail)
+
+    def empty(self) -> bool:
+        return not (self.long_stops or self.long_targets or self.short_stops or self.short_targets)
+
+
+def _remove(levels: List[Tuple[float, str]], entry: Tuple[float, str]):
+    i = bisect.bisect_left(levels, entry)
+    if i < len(levels) and levels[i] == entry:
+        del levels[i]
+
+
+class ProtectiveExitEngine:
+    """Watches real-time prices and exits trades the moment a level is crossed"""
+
+    def __init__(
+        self,
+        client: BinanceClient,
+        trade_manager: TradeManager,
+        stream: MarketStream = None,
+        trailing_stop_pct: float = None,
+        execution: ExecutionPipeline = None
+    ):
+        self.client = client
+        self.execution = execution or ExecutionPipeline(client)
+        self.trade_manager = trade_manager
+        self.stream = stream or market_stream_for(client)
+        self.trailing_stop_pct = config.TRAILING_STOP_PERCENT if trailing_stop_pct is None \
+            else trailing_stop_pct
+        self.positions: Dict[str, _Position] = {}
+        self.levels: Dict[str, _SymbolLevels] = {}
+        self.listeners: List[Callable[[Trade, str], None]] = []
+        self._exiting = set()
+        self._pending_exits: Dict[str, _Position] = {}
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='exit')
+        self.stream.add_callback(self.on_price)
+        trade_manager.add_listener(self._on_trade)
+
+    def add_listener(self, callback: Callable[[Trade, str], None]):
+        """Register callback(closed_trade, reason) for exits fired by the engine"""
+        self.listeners.append(callback)
+
+    def start(self, sync: bool = True):
+        """Start streaming prices (sync=True watches every open trade in TradeManager)"""
+        if sync:
+            self.sync()
+        self.stream.start()
+        logger.info(f"🛡️ Protective exit engine started ({len(self.positions)} trades)")
+
+    def stop(self):
+        """Stop streaming (open trades stay in TradeManager)"""
+        self.stream.stop()
+        self._executor.shutdown(wait=False)
+
+    def sync(self):
+        """Register every open trade from TradeManager"""
+        for trade in self.trade_manager.get_open_trades():
+            self.add_trade(trade)
+
+    def add_trade(self, trade: Trade):
+        """Start watching a trade's exit levels"""
+        if trade.oco_order_list_id:
+            return  # Protected by an exchange-side OCO
+        with self._lock:
+            if trade.id in self.positions or trade.id in self._exiting:
+                return
+            pos = _Position(trade)
+            self.positions[trade.id] = pos
+            levels = self.levels.setdefault(trade.symbol, _SymbolLevels())
+            self._insert(levels, pos)
+        self.stream.subscribe(trade.symbol)
+
+    def _insert(self, levels: _SymbolLevels, pos: _Position):
+        if pos.is_long:
+            bisect.insort(levels.long_stops, (pos.stop, pos.trade_id))
+            bisect.insort(levels.long_targets, (pos.take_profit, pos.trade_id))
+            if self.trailing_stop_pct:
+                bisect.insort(levels.long_peaks, (pos.extreme, pos.trade_id))
+        else:
+            bisect.insort(levels.short_stops, (pos.stop, pos.trade_id))
+            bisect.insort(levels.short_targets, (pos.take_profit, pos.trade_id))
+            if self.trailing_stop_pct:
+                bisect.insort(levels.short_troughs, (pos.extreme, pos.trade_id))
+
+    def _discard(self, trade_id: str) -> Optional[_Position]:
+        pos = self.positions.pop(trade_id, None)
+        if not pos:
+            return None
+        levels = self.levels.get(pos.symbol)
+        if levels:
+            if pos.is_long:
+                _remove(levels.long_stops, (pos.stop, trade_id))
+                _remove(levels.long_targets, (pos.take_profit, trade_id))
+                _remove(levels.long_peaks, (pos.extreme, trade_id))
+            else:
+                _remove(levels.short_stops, (pos.stop, trade_id))
+                _remove(levels.short_targets, (pos.take_profit, trade_id))
+                _remove(levels.short_troughs, (pos.extreme, trade_id))
+            if levels.empty():
+                del self.levels[pos.symbol]
+                self.stream.unsubscribe(pos.symbol)
+        return pos
+
+    def _on_trade(self, trade: Optional[Trade], event: str):
+        """Drop trades closed outside the engine (manual close, another process), re-arm resized ones"""
+        with self._lock:
+            if event == 'closed':
+                self._discard(trade.id)
+            elif event == 'updated' and trade.id in self.positions and \
+                    self.positions[trade.id].quantity != trade.quantity:
+                self._discard(trade.id)  # Partly exited: re-arm for what is left
+                self.add_trade(trade)
+            elif event == 'reloaded':
+                for trade_id in list(self.positions):
+                    current = self.trade_manager.index.by_id.get(trade_id)
+                    if not current or current.status != 'open':
+                        self._discard(trade_id)
+
+    def claim_trade(self, trade_id: str) -> bool:
+        """Stop watching a trade before exiting it elsewhere.
+
+        Returns False if the engine is already exiting it (caller must not sell).
+        """
+        with self._lock:
+            if trade_id in self._exiting:
+                return False
+            self._discard(trade_id)
+            return True
+
+    def _trail(self, levels: _SymbolLevels, bid: float, ask: float, now: float):
+        pct = self.trailing_stop_pct / 100
+        moved = []
+        # Long peaks below the bid: raise the stop
+        while levels.long_peaks and levels.long_peaks[0][0] < bid:
+            _, trade_id = levels.long_peaks.pop(0)
+            pos = self.positions[trade_id]
+            pos.extreme = bid
+            new_stop = bid * (1 - pct)
+            if new_stop > pos.stop:
+                _remove(levels.long_stops, (pos.stop, trade_id))
+                pos.stop = new_stop
+                bisect.insort(levels.long_stops, (pos.stop, trade_id))
+                moved.append(pos)
+            bisect.insort(levels.long_peaks, (bid, trade_id))
+        # Short troughs above the ask: lower the stop
+        while levels.short_troughs and levels.short_troughs[-1][0] > ask:
+            _, trade_id = levels.short_troughs.pop()
+            pos = self.positions[trade_id]
+            pos.extreme = ask
+            new_stop = ask * (1 + pct)
+            if new_stop < pos.stop:
+                _remove(levels.short_stops, (pos.stop, trade_id))
+                pos.stop = new_stop
+                bisect.insort(levels.short_stops, (pos.stop, trade_id))
+                moved.append(pos)
+            bisect.insort(levels.short_troughs, (ask, trade_id))
+
+        return [p for p in moved if now - p.last_persist >= TRAIL_PERSIST_SECONDS]
+
+    def on_price(self, symbol: str, bid: float, ask: float):
+        """Check exit levels for one price update"""
+        triggered = []
+        to_persist = []
+        with self._lock:
+            levels = self.levels.get(symbol)
+            if not levels:
+                return
+            if self.trailing_stop_pct:
+                to_persist = self._trail(levels, bid, ask, time.time())
+
+            while levels.long_stops and levels.long_stops[-1][0] >= bid:
+                triggered.append((levels.long_stops[-1][1], 'STOP_LOSS', bid))
+                self._mark_exiting(levels.long_stops[-1][1])
+            while levels.long_targets and levels.long_targets[0][0] <= bid:
+                triggered.append((levels.long_targets[0][1], 'TAKE_PROFIT', bid))
+                self._mark_exiting(levels.long_targets[0][1])
+            while levels.short_stops and levels.short_stops[0][0] <= ask:
+                triggered.append((levels.short_stops[0][1], 'STOP_LOSS', ask))
+                self._mark_exiting(levels.short_stops[0][1])
+            while levels.short_targets and levels.short_targets[-1][0] >= ask:
+                triggered.append((levels.short_targets[-1][1], 'TAKE_PROFIT', ask))
+                self._mark_exiting(levels.short_targets[-1][1])
+
+        for pos in to_persist:
+            if pos.trade_id in self.positions:
+                pos.last_persist = time.time()
+                self._executor.submit(self.trade_manager.update_trade_levels,
+                                      pos.trade_id, None, pos.stop)
+        for trade_id, reason, price in triggered:
+            self._executor.submit(self._execute_exit, trade_id, reason, price)
+
+    def _mark_exiting(self, trade_id: str):
+        self._pending_exits[trade_id] = self._discard(trade_id)
+        self._exiting.add(trade_id)
+
+    def _execute_exit(self, trade_id: str, reason: str, trigger_price: float):
+        """Place the exit order and close the trade record"""
+        pos = self._pending_exits.pop(trade_id, None)
+        if not pos:
+            return
+        try:
+            emoji = "⚠️" if reason == 'STOP_LOSS' else "🎯"
+            logger.info(f"{emoji} {reason} hit for {trade_id} ({pos.symbol} @ {trigger_price:,.2f})")
+            # Claimed for the exit: a trade closed (or being closed) elsewhere gets no exit order
+            with self.trade_manager.closing(trade_id) as trade:
+                if not trade:
+                    logger.info(f"🛡️ {trade_id} already closed elsewhere, no exit sent")
+                    return
+                result = self.execution.execute(pos.exit_intent)
+                closed = self.trade_manager.close_trade(
+                    trade_id=trade_id,
+                    exit_price=result.fill_price or trigger_price,
+                    order_id=result.order_id
+                ) if result.ok else None
+
+            if not result.ok:
+                logger.error(f"❌ Exit order failed for {trade_id}, re-arming levels")
+                with self._lock:
+                    self._exiting.discard(trade_id)
+                trade = self.trade_manager.get_trade_by_id(trade_id)
+                if trade and trade.status == 'open':
+                    self.add_trade(trade)
+                return
+
+            if closed:
+                for listener in self.listeners:
+                    try:
+                        listener(closed, reason)
+                    except Exception as e:
+                        logger.error(f"Error in exit listener: {e}")
+        except Exception as e:
+            logger.error(f"Error executing protective exit for {trade_id}: {e}")
+        finally:
+            with self._lock:
+                self._exiting.discard(trade_id)
+
+    def status(self) -> Dict:
+        """Get watched trades and their current levels"""
+        with self._lock:
+            return {
+                'trailing_stop_pct': self.trailing_stop_pct,
+                'symbols': sorted(self.levels),
+                'trades': [
+                    {
+                        'trade_id': p.trade_id,
+                        'symbol': p.symbol,
+                        'side': 'LONG' if p.is_long else 'SHORT',
+                        'stop_loss': p.stop,
+                        'take_profit': p.take_profit
+                    }
+                    for p in self.positions.values()
+                ]
+            }
@@ -0,0 +1,548 @@
+"""
+Sharded Portfolio Runner - Spreads bot slots across worker processes
+
+Layout:
+    feeder process   -> fetches candles, writes them to shared-memory rings
+    worker processes -> read rings, run strategies for their shard of slots,
+                        send order intents to the execution process
+    execution (this) -> owns the exchange client and TradeManager, places
+                        orders and acknowledges fills back to the workers
+"""
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import config
+from bot.portfolio import SlotConfig, close_positions_parallel, load_portfolio_config
+from bot.protective_exits import ProtectiveExitEngine
+from bot.oco_protection import OCOProtectionManager
+from bot.algo_execution import AlgoExecutionEngine
+from bot.trading_bot import TradingBot, create_strategy, kline_requirements
+from exchange.binance_client import BinanceClient
+from exchange.execution import ExecutionPipeline
+from exchange.maker_execution import MakerExecutor
+from exchange.paper_exchange import create_client
+from strategies.base_strategy import Signal
+from utils.logger import setup_logger
+from utils.trade_manager import TradeManager
+
+logger = setup_logger('Sharding')
+
+RING_CAPACITY = 256  # Candles kept per (symbol, interval)
+RING_FIELDS = 6      # timestamp_ms, open, high, low, close, volume
+HEADER_SIZE = 2      # seq (odd while writing), total rows written
+
+
+class CandleRing:
+    """Single-writer, many-reader candle ring buffer in shared memory (seqlock)"""
+
+    def __init__(self, name: str = None, create: bool = False, capacity: int = RING_CAPACITY):
+        size = HEADER_SIZE * 8 + capacity * RING_FIELDS * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.name = self.shm.name
+        self.capacity = capacity
+        self.header = np.ndarray((HEADER_SIZE,), dtype=np.int64, buffer=self.shm.buf)
+        self.rows = np.ndarray((capacity, RING_FIELDS), dtype=np.float64,
+                               buffer=self.shm.buf, offset=HEADER_SIZE * 8)
+        if create:
+            self.header[:] = 0
+
+    @property
+    def seq(self) -> int:
+        return int(self.header[0])
+
+    def _last_timestamp(self) -> Optional[float]:
+        count = int(self.header[1])
+        if count == 0:
+            return None
+        return self.rows[(count - 1) % self.capacity, 0]
+
+    def write(self, df: pd.DataFrame):
+        """Append new candles; a candle with the last timestamp overwrites it (live bar)"""
+        if df.empty:
+            return
+        timestamps = df.index.asi8 // 1_000_000
+        values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+
+        self.header[0] += 1  # odd: write in progress
+        count = int(self.header[1])
+        last_ts = self._last_timestamp()
+        for ts, row in zip(timestamps, values):
+            if last_ts is not None and ts < last_ts:
+                continue
+            if last_ts is not None and ts == last_ts:
+                slot = (count - 1) % self.capacity
+            else:
+                slot = count % self.capacity
+                count += 1
+            self.rows[slot, 0] = ts
+            self.rows[slot, 1:] = row
+            last_ts = ts
+        self.header[1] = count
+        self.header[0] += 1  # even: consistent
+
+    def read(self, limit: int) -> pd.DataFrame:
+        """Copy the newest `limit` candles (retries while a write is in progress)"""
+        while True:
+            seq = self.seq
+            if seq % 2:
+                time.sleep(0)
+                continue
+            count = int(self.header[1])
+            n = min(limit, count, self.capacity)
+            idx = [(count - n + i) % self.capacity for i in range(n)]
+            data = self.rows[idx].copy()
+            if self.seq == seq:
+                break
+
+        df = pd.DataFrame(data[:, 1:], columns=['open', 'high', 'low', 'close', 'volume'])
+        df.index = pd.DatetimeIndex(pd.to_datetime(data[:, 0].astype(np.int64), unit='ms'),
+                                    name='timestamp')
+        return df
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _feeder_main(feeds: Dict[Tuple[str, str], Tuple[str, int]], poll_seconds: float, stop_event,
+                 client: BinanceClient = None):
+    """Feeder: one client polls every (symbol, interval) and fills the rings
+
+    Runs as a process with its own client for the configured mode, or as a
+    thread sharing the runner's client when that client can't be rebuilt
+    elsewhere (a replay paper exchange).
+    """
+    client = client or create_client()
+    rings = {key: CandleRing(name) for key, (name, _) in feeds.items()}
+    warmed = set()
+    try:
+        while not stop_event.is_set():
+            for key, (_, limit) in feeds.items():
+                symbol, interval = key
+                fetch_limit = TradingBot.KLINE_REFRESH_LIMIT if key in warmed else limit
+                df = client.get_historical_klines(symbol, interval, fetch_limit)
+                if not df.empty:
+                    rings[key].write(df)
+                    warmed.add(key)
+            stop_event.wait(poll_seconds)
+    finally:
+        for ring in rings.values():
+            ring.close()
+
+
+class _WorkerSlot:
+    """Strategy state for one slot inside a worker process"""
+
+    def __init__(self, spec: dict):
+        self.id = spec['id']
+        self.symbol = spec['symbol']
+        self.quantity = spec['quantity']
+        self.strategy = create_strategy(spec['strategy'])
+        self.requirements = spec['requirements']
+        self.active = spec['active']
+        self.in_position = spec['in_position']
+        self.entry_price = spec['entry_price']
+        self.pending = False
+        self.last_seqs = None
+        if self.in_position:
+            self.strategy.update_position('LONG', self.entry_price)
+
+
+def _worker_main(
+    worker_id: int,
+    specs: List[dict],
+    ring_names: Dict[Tuple[str, str], str],
+    intents,
+    inbox,
+    stop_event
+):
+    """Worker process: evaluates strategies for its shard and emits order intents"""
+    rings = {key: CandleRing(name) for key, name in ring_names.items()}
+    slots = {spec['id']: _WorkerSlot(spec) for spec in specs}
+    try:
+        while not stop_event.is_set():
+            # Apply fills / control messages from the execution process
+            while True:
+                try:
+                    msg = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                slot = slots.get(msg.get('slot_id'))
+                if not slot:
+                    continue
+                if msg['type'] == 'fill':
+                    slot.pending = False
+                    slot.in_position = msg['in_position']
+                    slot.entry_price = msg['entry_price']
+                    if slot.in_position:
+                        slot.strategy.update_position('LONG', slot.entry_price)
+                    else:
+                        slot.strategy.clear_position()
+                elif msg['type'] == 'active':
+                    slot.active = msg['active']
+
+            for slot in slots.values():
+                if not slot.active or slot.pending:
+                    continue
+                keys = {k: (slot.symbol, interval) for k, (interval, _) in slot.requirements.items()}
+                seqs = tuple(rings[key].seq for key in keys.values())
+                if seqs == slot.last_seqs:
+                    continue  # No new candle data for this slot
+                slot.last_seqs = seqs
+
+                frames = {k: rings[key].read(slot.requirements[k][1]) for k, key in keys.items()}
+                if any(df.empty for df in frames.values()):
+                    continue
+                price = float(next(iter(frames.values()))['close'].iloc[-1])
+
+                side, reason = None, None
+                if slot.in_position and slot.entry_price:
+                    change_pct = (price - slot.entry_price) / slot.entry_price * 100
+                    if change_pct <= -config.STOP_LOSS_PERCENT:
+                        side, reason = 'SELL', 'STOP_LOSS'
+                    elif change_pct >= config.TAKE_PROFIT_PERCENT:
+                        side, reason = 'SELL', 'TAKE_PROFIT'
+
+                if not side:
+                    try:
+                        signal = slot.strategy.generate_signal(frames['df'] if 'df' in frames else frames)
+                    except Exception as e:
+                        logger.error(f"[worker {worker_id}] {slot.id} signal error: {e}")
+                        continue
+                    if signal == Signal.BUY and not slot.in_position:
+                        side, reason = 'BUY', 'BUY'
+                    elif signal == Signal.SELL and slot.in_position:
+                        side, reason = 'SELL', 'SELL'
+
+                if side:
+                    slot.pending = True
+                    intents.put({
+                        'worker_id': worker_id,
+                        'slot_id': slot.id,
+                        'side': side,
+                        'reason': reason,
+                        'price': price,
+                        'created_at': time.time()
+                    })
+            stop_event.wait(0.2)
+    finally:
+        for ring in rings.values():
+            ring.close()
+
+
+class ShardedPortfolioRunner:
+    """Portfolio runner that evaluates slots in a pool of worker processes"""
+
+    def __init__(
+        self,
+        slots: List[SlotConfig],
+        interval_seconds: int = 60,
+        workers: int = None,
+        client: BinanceClient = None,
+        trade_manager: TradeManager = None,
+        on_tick=None
+    ):
+        self.client = client or create_client()
+        self.trade_manager = trade_manager or TradeManager()
+        self.interval_seconds = interval_seconds
+        self.workers = max(1, min(workers or config.SHARD_WORKERS, len(slots) or 1))
+        self.on_tick = on_tick
+        self.slot_configs = {s.id: s for s in slots}
+        self.active = {s.id: s.enabled for s in slots}
+        self.last_results: Dict[str, Optional[str]] = {}
+        self.running = False
+
+        # Execution-side bots: own order placement and trade bookkeeping per slot
+        self.execution = ExecutionPipeline(self.client)
+        self.exit_engine = ProtectiveExitEngine(self.client, self.trade_manager,
+                                                execution=self.execution) \
+            if config.TICK_EXITS_ENABLED else None
+        self.oco_manager = OCOProtectionManager(self.client, self.trade_manager) \
+            if config.EXCHANGE_OCO_ENABLED else None
+        self.algo_engine = AlgoExecutionEngine(self.client, self.trade_manager,
+                                               execution=self.execution) \
+            if config.ALGO_EXECUTION != 'MARKET' else None
+        self.maker = MakerExecutor(self.client, execution=self.execution) \
+            if config.EXECUTION_MODE == 'MAKER' else None
+        self.bots: Dict[str, TradingBot] = {
+            s.id: TradingBot(
+                symbol=s.symbol,
+                quantity=s.quantity,
+                strategy=s.strategy,
+                interval=s.interval,
+                client=self.client,
+                trade_manager=self.trade_manager,
+                slot_id=s.id,
+                exit_engine=self.exit_engine,
+                oco_manager=self.oco_manager,
+                execution=self.execution,
+                algo_engine=self.algo_engine,
+                maker=self.maker
+            )
+            for s in slots
+        }
+        if self.algo_engine:
+            self.algo_engine.add_listener(self._on_algo_done)
+        # Exits fired outside the slot's own intents (tick engine, OCO, manual close)
+        for engine in (self.exit_engine, self.oco_manager):
+            if engine:
+                engine.add_listener(self._on_exit)
+        self.trade_manager.add_listener(self._on_trade_event)
+
+        # Workers start from a fresh interpreter: forking would copy the client's
+        # sockets, the engines' threads and held locks into every worker
+        self._ctx = mp.get_context('spawn')
+        self._stop_event = self._ctx.Event()
+        self._intents = self._ctx.Queue()
+        self._inboxes = []
+        self._processes = []
+        self._rings: Dict[Tuple[str, str], CandleRing] = {}
+        self._slot_worker: Dict[str, int] = {}
+        self._acked: Dict[str, Tuple[bool, float]] = {}  # Position last sent to each worker
+        self._exec_thread: Optional[threading.Thread] = None
+        self._feeder_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, path: str = None, **kwargs) -> 'ShardedPortfolioRunner':
+        """Create runner from a portfolio config file"""
+        cfg = load_portfolio_config(path)
+        return cls(cfg['slots'], interval_seconds=cfg['interval_seconds'], **kwargs)
+
+    def _slot_specs(self) -> Tuple[List[dict], Dict[Tuple[str, str], int]]:
+        specs, feeds = [], {}
+        for slot_id, bot in self.bots.items():
+            requirements = kline_requirements(bot.strategy, bot.interval)
+            for interval, limit in requirements.values():
+                key = (bot.symbol, interval)
+                feeds[key] = max(feeds.get(key, 0), limit)
+            specs.append({
+                'id': slot_id,
+                'symbol': bot.symbol,
+                'quantity': bot.quantity,
+                'strategy': bot.strategy_name,
+                'requirements': requirements,
+                'active': self.active[slot_id],
+                'in_position': bot.in_position,
+                'entry_price': bot.entry_price
+            })
+        return specs, feeds
+
+    def start(self):
+        """Create rings, then spawn the feeder and worker processes"""
+        if self.running:
+            return
+        specs, feeds = self._slot_specs()
+        for key, limit in feeds.items():
+            self._rings[key] = CandleRing(create=True, capacity=max(RING_CAPACITY, limit))
+        ring_names = {key: ring.name for key, ring in self._rings.items()}
+
+        feeder_args = ({k: (ring_names[k], limit) for k, limit in feeds.items()},
+                       self.interval_seconds, self._stop_event)
+        if getattr(self.client, 'source', True) is None:  # Replay book: candles only live here
+            self._feeder_thread = threading.Thread(target=_feeder_main,
+                                                   args=feeder_args + (self.client,), daemon=True)
+        else:
+            self._processes.append(self._ctx.Process(target=_feeder_main, args=feeder_args, daemon=True))
+
+        shards = [specs[i::self.workers] for i in range(self.workers)]
+        for worker_id, shard in enumerate(shards):
+            inbox = self._ctx.Queue()
+            self._inboxes.append(inbox)
+            for spec in shard:
+                self._slot_worker[spec['id']] = worker_id
+            needed = {k: n for k, n in ring_names.items()
+                      if any(k[0] == s['symbol'] for s in shard)}
+            self._processes.append(self._ctx.Process(
+                target=_worker_main,
+                args=(worker_id, shard, needed, self._intents, inbox, self._stop_event),
+                daemon=True
+            ))
+
+        self._dispatch = ThreadPoolExecutor(max_workers=config.EXECUTION_WORKERS,
+                                            thread_name_prefix='intent')
+        self.running = True
+        for process in self._processes:
+            process.start()
+        if self._feeder_thread:
+            self._feeder_thread.start()
+        if self.oco_manager:
+            self.oco_manager.start()
+        if self.exit_engine:
+            self.exit_engine.start()
+        if self.algo_engine:
+            self.algo_engine.start()
+        if self.maker:
+            self.maker.start()
+        self._exec_thread = threading.Thread(target=self._execution_loop, daemon=True)
+        self._exec_thread.start()
+        logger.info(f"🚀 Sharded portfolio started - {len(specs)} slots on "
+                    f"{self.workers} workers, {len(feeds)} feeds")
+
+    def _execution_loop(self):
+        """Single consumer of order intents: the only place orders are placed.
+
+        Workers keep at most one intent in flight per slot (until acked), so
+        intents of different slots are executed concurrently.
+        """
+        while self.running:
+            try:
+                intent = self._intents.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._dispatch.submit(self._execute_intent, intent)
+
+    def _execute_intent(self, intent: dict):
+        slot_id = intent['slot_id']
+        bot = self.bots[slot_id]
+        try:
+            if intent['side'] == 'BUY' and not bot.in_position:
+                bot.execute_buy(intent['price'])
+            elif intent['side'] == 'SELL' and bot.in_position:
+                bot.execute_sell(intent['price'], urgent=intent['reason'] != 'SELL')
+            self.last_results[slot_id] = intent['reason']
+            latency_ms = (time.time() - intent['created_at']) * 1000
+            bot.latency.record(bot.strategy.name, 'intent_to_order', latency_ms)
+        except Exception as e:
+            logger.error(f"Error executing intent for {slot_id}: {e}")
+        finally:
+            self._ack(slot_id)
+        if self.on_tick:
+            self.on_tick({'results': {slot_id: intent['reason']}, 'slots': self.status()['slots']})
+
+    def _ack(self, slot_id: str):
+        """Tell the slot's worker about its position after an order"""
+        bot = self.bots[slot_id]
+        self._acked[slot_id] = (bot.in_position, bot.entry_price)
+        self._inboxes[self._slot_worker[slot_id]].put({
+            'type': 'fill',
+            'slot_id': slot_id,
+            'in_position': bot.in_position,
+            'entry_price': bot.entry_price
+        })
+
+    def _on_exit(self, closed_trade, reason: str):
+        """A tick-level / OCO exit closed a slot's trade: ack slots whose state moved"""
+        for slot_id, bot in self.bots.items():
+            if slot_id in self._slot_worker and \
+                    self._acked.get(slot_id) != (bot.in_position, bot.entry_price):
+                self._ack(slot_id)
+
+    def _on_trade_event(self, trade, event: str):
+        """A slot's trade was closed (possibly elsewhere): sync the bot, then its worker"""
+        if event != 'closed' or not self.running:
+            return
+        for slot_id, bot in self.bots.items():
+            if bot.current_trade_id == trade.id and slot_id in self._slot_worker:
+                # Off the TradeManager lock, after the close is stored
+                self._dispatch.submit(self._sync_slot, slot_id)
+
+    def _sync_slot(self, slot_id: str):
+        self.bots[slot_id].sync_trade()
+        self._ack(slot_id)
+
+    def _on_algo_done(self, algo):
+        """Sliced entries fill after the intent was acknowledged: ack again"""
+        for slot_id, bot in self.bots.items():
+            if algo.trade_id and bot.current_trade_id == algo.trade_id and slot_id in self._slot_worker:
+                self._ack(slot_id)
+
+    def run(self):
+        """Run in the foreground until stopped"""
+        self.start()
+        while self.running:
+            time.sleep(1)
+
+    def _set_active(self, slot_id: str, active: bool) -> bool:
+        if slot_id not in self.bots:
+            return False
+        self.active[slot_id] = active
+        if slot_id in self._slot_worker:
+            self._inboxes[self._slot_worker[slot_id]].put(
+                {'type': 'active', 'slot_id': slot_id, 'active': active})
+        return True
+
+    def start_slot(self, slot_id: str) -> bool:
+        """Resume trading on one slot"""
+        return self._set_active(slot_id, True)
+
+    def stop_slot(self, slot_id: str, close_position: bool = False) -> bool:
+        """Pause trading on one slot"""
+        if not self._set_active(slot_id, False):
+            return False
+        if close_position:
+            self.bots[slot_id].close_all_positions()
+        return True
+
+    def stop(self, close_positions: bool = True):
+        """Stop workers and feeder, release shared memory"""
+        logger.info("🛑 Stopping sharded portfolio...")
+        self.running = False
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self._feeder_thread:
+            self._feeder_thread.join(timeout=5)
+            self._feeder_thread = None
+        if self._exec_thread:
+            self._exec_thread.join(timeout=2)
+            self._dispatch.shutdown(wait=True)
+        if close_positions:
+            close_positions_parallel(list(self.bots.values()))
+        if self.exit_engine:
+            self.exit_engine.stop()
+        if self.algo_engine:
+            self.algo_engine.stop()
+        if self.maker:
+            self.maker.stop()
+        if self.oco_manager:
+            self.oco_manager.stop()
+        self.execution.shutdown()
+        for ring in self._rings.values():
+            ring.close()
+            ring.unlink()
+        self._rings = {}
+        self._processes = []
+        logger.info("🛑 Sharded portfolio stopped")
+
+    def slot_status(self, slot_id: str) -> Optional[Dict]:
+        """Get status for one slot"""
+        bot = self.bots.get(slot_id)
+        if not bot:
+            return None
+        return {
+            **asdict(self.slot_configs[slot_id]),
+            'active': self.active.get(slot_id, False),
+            'worker': self._slot_worker.get(slot_id),
+            'in_position': bot.in_position,
+            'entry_price': bot.entry_price,
+            'current_trade_id': bot.current_trade_id,
+            'last_action': self.last_results.get(slot_id),
+            'trades': len(bot.trades)
+        }
+
+    def status(self) -> Dict:
+        """Get status for the whole portfolio"""
+        return {
+            'running': self.running,
+            'sharded': True,
+            'workers': self.workers,
+            'pid': os.getpid(),
+            'interval_seconds': self.interval_seconds,
+            'slots': [self.slot_status(slot_id) for slot_id in self.bots]
+        }
+
+    def latency(self) -> Dict:
+        """Get execution-side latency summaries per slot"""
+        return {slot_id: bot.get_latency_summary() for slot_id, bot in self.bots.items()}
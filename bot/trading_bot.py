@@ -1,11 +1,14 @@
 """
 Main Trading Bot - Orchestrates the entire trading process
 """
-import time
-from datetime import datetime
+import threading
 from typing import Optional
+import pandas as pd
 import config
 from exchange.binance_client import BinanceClient
+from exchange.execution import ExecutionPipeline, OrderIntent, close_intent
+from exchange.maker_execution import MakerExecutor
+from exchange.paper_exchange import create_client
 from strategies.base_strategy import BaseStrategy, Signal
 from strategies.rsi_strategy import RSIStrategy
 from strategies.ema_crossover_strategy import EMACrossoverStrategy
@@ -15,47 +18,169 @@ from strategies.momentum_pulse_strategy import MomentumPulseStrategy
 from strategies.mtf_impulse_strategy import MTFImpulseStrategy
 from utils.logger import setup_logger
 from utils.trade_manager import TradeManager
+from utils.state_snapshot import StateSnapshot
+from utils.latency import LatencyTracker
+from utils.clock import REAL_CLOCK, Clock
+from bot.protective_exits import ProtectiveExitEngine
+from bot.oco_protection import OCOProtectionManager
+from bot.algo_execution import AlgoExecutionEngine
 
 logger = setup_logger('TradingBot')
 
+STRATEGIES = {
+    'rsi': RSIStrategy,
+    'ema': EMACrossoverStrategy,
+    'combined': CombinedStrategy,
+    '1min': OneMinuteStrategy,
+    'pulse': MomentumPulseStrategy,
+    'momentum': MomentumPulseStrategy,
+    'mtf': MTFImpulseStrategy,
+    'mtfpulse': MTFImpulseStrategy,
+    'mtf-pulse': MTFImpulseStrategy
+}
+
+def create_strategy(strategy_name: str) -> BaseStrategy:
+    """Create strategy instance by name (defaults to Combined)"""
+    return STRATEGIES.get(strategy_name.lower(), CombinedStrategy)()
+
+def kline_requirements(strategy: BaseStrategy, interval: str) -> dict:
+    """Get the candle windows a strategy needs: {key: (interval, limit)}"""
+    if getattr(strategy, 'requires_multi_tf', False):
+        htf_interval = getattr(strategy, 'htf_interval', '1h')
+        ltf_interval = getattr(strategy, 'ltf_interval', '5m')
+        htf_limit = 150 if htf_interval.endswith('h') else 200
+        ltf_limit = 120 if ltf_interval.endswith('m') else 100
+        return {'htf': (htf_interval, htf_limit), 'ltf': (ltf_interval, ltf_limit)}
+    
+    # Use 1m candles for 1min strategy, otherwise configured interval
+    interval = '1m' if isinstance(strategy, OneMinuteStrategy) else interval
+    limit = 100 if interval == '1h' else 50  # Less data for 1m
+    return {'df': (interval, limit)}
+
 class TradingBot:
     """Main trading bot class"""
     
+    # Candles refetched per tick once a window is cached (covers the live bar + a closed one)
+    KLINE_REFRESH_LIMIT = 3
+    
     def __init__(
         self,
         symbol: str = None,
         quantity: float = None,
         strategy: str = 'combined',
-        interval: str = '1h'
+        interval: str = '1h',
+        client: BinanceClient = None,
+        trade_manager: TradeManager = None,
+        market_data=None,
+        slot_id: str = None,
+        exit_engine: ProtectiveExitEngine = None,
+        oco_manager: OCOProtectionManager = None,
+        execution: ExecutionPipeline = None,
+        algo_engine: AlgoExecutionEngine = None,
+        maker: MakerExecutor = None,
+        clock: Clock = None
     ):
         self.symbol = symbol or config.TRADE_SYMBOL
         self.quantity = quantity or config.TRADE_QUANTITY
-        self.client = BinanceClient()
+        # Time source for loop pacing and trade timestamps (VirtualClock in simulations)
+        self.clock = clock or REAL_CLOCK
+        self.client = client or create_client(self.clock)
+        # Prices/candles come from a shared feed when running inside a portfolio
+        self.market_data = market_data or self.client
+        self.slot_id = slot_id
+        # Orders go through a (possibly shared) idempotent execution pipeline
+        self.execution = execution or ExecutionPipeline(self.client)
+        self._owns_execution = execution is None
+        # Maker-first (post at best bid/ask) for non-urgent orders when EXECUTION_MODE=MAKER
+        self.maker = maker
+        self._owns_maker = False
+        if self.maker is None and config.EXECUTION_MODE == 'MAKER':
+            self.maker = MakerExecutor(self.client, execution=self.execution)
+            self._owns_maker = True
+            self.maker.start()
         self.running = False
         self.strategy_name = strategy.lower()
         self.interval = interval  # Timeframe for candles
         
         # Select strategy
         self.strategy = self._get_strategy(self.strategy_name)
+        
+        # Hot-path timing (indicator methods are wrapped so they report as their own stage)
+        self.latency = LatencyTracker()
+        for method in ('calculate_indicators', '_prep_htf', '_prep_ltf'):
+            self.latency.instrument(self.strategy, method, self.strategy.name, 'indicators')
 
         # Pulse / MTF strategies work best on lower timeframe; default to 5m if not provided
         if self.strategy_name in ['pulse', 'momentum', 'mtf', 'mtfpulse', 'mtf-pulse'] and interval == '1h':
             self.interval = '5m'
         
         # Trade tracking with persistent storage
-        self.trade_manager = TradeManager()
+        self.trade_manager = trade_manager or TradeManager(clock=self.clock)
         self.trades = []
         self.entry_price = 0.0
         self.in_position = False
         self.current_trade_id = None
+        self._order_seq = 0
+        
+        # Candle windows per interval (refreshed incrementally, checkpointed on bar close)
+        self.candles = {}
+        self._last_bar_time = {}
+        self.snapshot = StateSnapshot(self.symbol, self.strategy_name, self.interval, clock=self.clock) \
+            if config.SNAPSHOT_ENABLED else None
+        self._restore_snapshot()
         
-        # Check for existing open trade
-        open_trade = self.trade_manager.get_running_trade(self.symbol)
+        # Check for existing open trade (portfolio slots only own trades of their strategy)
+        open_trade = self.trade_manager.get_running_trade(
+            self.symbol,
+            strategy=self.strategy.name if slot_id else None
+        )
         if open_trade:
             self.in_position = True
             self.entry_price = open_trade.entry_price
             self.current_trade_id = open_trade.id
+            self.strategy.update_position('LONG', open_trade.entry_price)
             logger.info(f"📌 Resuming open trade: {open_trade.id} @ ${open_trade.entry_price:,.2f}")
+        else:
+            self.strategy.clear_position()
+        
+        # Tick-level SL/TP: shared engine inside a portfolio, otherwise one for this bot's trades
+        self.exit_engine = exit_engine
+        self._owns_exit_engine = False
+        if self.exit_engine is None and config.TICK_EXITS_ENABLED:
+            self.exit_engine = ProtectiveExitEngine(self.client, self.trade_manager,
+                                                    execution=self.execution)
+            self._owns_exit_engine = True
+        if self.exit_engine:
+            self.exit_engine.add_listener(self._on_protective_exit)
+            if self._owns_exit_engine:
+                self.exit_engine.start(sync=False)
+                if open_trade:
+                    self.exit_engine.add_trade(open_trade)
+        
+        # Exchange-side OCO exits (trades with a live OCO are skipped by the tick engine)
+        self.oco_manager = oco_manager
+        self._owns_oco_manager = False
+        if self.oco_manager is None and config.EXCHANGE_OCO_ENABLED:
+            self.oco_manager = OCOProtectionManager(self.client, self.trade_manager)
+            self._owns_oco_manager = True
+        if self.oco_manager:
+            self.oco_manager.add_listener(self._on_protective_exit)
+            if self._owns_oco_manager:
+                self.oco_manager.start()
+        
+        # Sliced entries (TWAP / VWAP / POV) when ALGO_EXECUTION is not MARKET
+        self.algo_engine = algo_engine
+        self._owns_algo_engine = False
+        self.pending_algo_id = None
+        self._algo_finished = threading.Event()  # Set once the pending entry is done
+        if self.algo_engine is None and config.ALGO_EXECUTION != 'MARKET':
+            self.algo_engine = AlgoExecutionEngine(self.client, self.trade_manager,
+                                                   execution=self.execution,
+                                                   market_data=self.market_data)
+            self._owns_algo_engine = True
+            self.algo_engine.start()
+        if self.algo_engine:
+            self.algo_engine.add_listener(self._on_algo_done)
         
         logger.info(f"🤖 Trading Bot initialized")
         logger.info(f"   Symbol: {self.symbol}")
@@ -65,18 +190,67 @@ class TradingBot:
     
     def _get_strategy(self, strategy_name: str) -> BaseStrategy:
         """Get strategy instance by name"""
-        strategies = {
-            'rsi': RSIStrategy(),
-            'ema': EMACrossoverStrategy(),
-            'combined': CombinedStrategy(),
-            '1min': OneMinuteStrategy(),
-            'pulse': MomentumPulseStrategy(),
-            'momentum': MomentumPulseStrategy(),
-            'mtf': MTFImpulseStrategy(),
-            'mtfpulse': MTFImpulseStrategy(),
-            'mtf-pulse': MTFImpulseStrategy()
-        }
-        return strategies.get(strategy_name.lower(), CombinedStrategy())
+        return create_strategy(strategy_name)
+    
+    def _restore_snapshot(self):
+        """Restore candle windows and strategy state from the last snapshot"""
+        if not self.snapshot:
+            return
+        data = self.snapshot.load()
+        if not data:
+            return
+        self.candles = data['candles']
+        self._last_bar_time = {i: df.index[-1] for i, df in self.candles.items()}
+        self.strategy.load_state(data.get('strategy_state', {}))
+        logger.info(f"♻️ Warm restart from snapshot ({data['age_seconds']:.0f}s old, "
+                    f"{sum(len(df) for df in self.candles.values())} candles)")
+    
+    def save_snapshot(self):
+        """Checkpoint candle windows and strategy state"""
+        if not self.snapshot or not self.candles:
+            return
+        self.snapshot.save(
+            self.candles,
+            self.strategy.get_state(),
+            {'in_position': self.in_position, 'current_trade_id': self.current_trade_id}
+        )
+    
+    def _checkpoint_on_bar_close(self):
+        """Save a snapshot whenever a new bar opens on any tracked interval"""
+        new_bar = False
+        for interval, df in self.candles.items():
+            if df.empty:
+                continue
+            last = df.index[-1]
+            if self._last_bar_time.get(interval) != last:
+                self._last_bar_time[interval] = last
+                new_bar = True
+        if new_bar:
+            self.save_snapshot()
+    
+    def _get_klines(self, interval: str, limit: int) -> pd.DataFrame:
+        """Get candle window, only fetching the newest bars when a window is cached"""
+        cached = self.candles.get(interval)
+        if cached is not None and len(cached) >= limit:
+            fresh = self.market_data.get_historical_klines(
+                self.symbol,
+                interval=interval,
+                limit=self.KLINE_REFRESH_LIMIT
+            )
+            # Merge only when the fresh bars overlap the cached window (no gap)
+            if not fresh.empty and fresh.index[0] <= cached.index[-1]:
+                merged = pd.concat([cached[cached.index < fresh.index[0]], fresh])
+                self.candles[interval] = merged.iloc[-limit:]
+                return self.candles[interval]
+        
+        df = self.market_data.get_historical_klines(
+            self.symbol,
+            interval=interval,
+            limit=limit
+        )
+        if not df.empty:
+            self.candles[interval] = df
+        return df
     
     def check_balance(self) -> dict:
         """Check and display account balance"""
@@ -89,12 +263,14 @@ class TradingBot:
     
     def get_current_price(self) -> float:
         """Get current price of trading symbol"""
-        return self.client.get_current_price(self.symbol)
+        return self.market_data.get_current_price(self.symbol)
     
-    def execute_buy(self) -> bool:
-        """Execute a buy order"""
+    def execute_buy(self, price_hint: float = None) -> bool:
+        """Execute a buy order (price_hint: latest known price, saves a lookup)"""
+        if self.pending_algo_id:
+            return False
         try:
-            current_price = self.get_current_price()
+            current_price = price_hint or self.get_current_price()
             
             # Check if we have enough balance
             base_asset = self.symbol.replace('USDT', '').replace('BTC', '')
@@ -108,10 +284,30 @@ class TradingBot:
                              f"have {quote_balance:.2f}")
                 return False
             
-            # Place market buy order
-            order = self.client.place_market_buy(self.symbol, self.quantity)
+            # Sliced entries are worked by the algo engine; the trade is recorded when it finishes
+            if self.algo_engine and config.ALGO_EXECUTION != 'MARKET':
+                self._algo_finished.clear()
+                algo = self.algo_engine.submit(
+                    self.symbol, 'BUY', self.quantity,
+                    style=config.ALGO_EXECUTION,
+                    strategy=self.strategy.name
+                )
+                self.pending_algo_id = algo.id
+                return True
+            
+            # Place buy order (entry is recorded at the actual fill price)
+            result = (self.maker or self.execution).execute(OrderIntent(
+                symbol=self.symbol,
+                side='BUY',
+                quantity=self.quantity,
+                key=self._order_key('open')
+            ))
+            order = result.order
             
             if order:
+                self.latency.record_order(self.strategy.name)
+                current_price = result.fill_price or current_price
+                quantity = result.filled_qty or self.quantity
                 self.in_position = True
                 self.entry_price = current_price
                 self.strategy.update_position('LONG', current_price)
@@ -124,7 +320,7 @@ class TradingBot:
                 new_trade = self.trade_manager.open_trade(
                     symbol=self.symbol,
                     side='BUY',
-                    quantity=self.quantity,
+                    quantity=quantity,
                     entry_price=current_price,
                     order_id=str(order.get('orderId')),
                     strategy=self.strategy.name,
@@ -132,19 +328,20 @@ class TradingBot:
                     stop_loss=stop_loss
                 )
                 self.current_trade_id = new_trade.id
+                self._protect_trade(new_trade)
                 
                 trade = {
                     'type': 'BUY',
                     'symbol': self.symbol,
-                    'quantity': self.quantity,
+                    'quantity': quantity,
                     'price': current_price,
-                    'timestamp': datetime.now(),
+                    'timestamp': self.clock.now(),
                     'order_id': order.get('orderId'),
                     'trade_id': new_trade.id
                 }
                 self.trades.append(trade)
                 
-                logger.info(f"📈 Bought {self.quantity} {self.symbol} @ ${current_price:,.2f}")
+                logger.info(f"📈 Bought {quantity} {self.symbol} @ ${current_price:,.2f}")
                 return True
             
             return False
@@ -153,55 +350,199 @@ class TradingBot:
             logger.error(f"Error executing buy: {e}")
             return False
     
-    def execute_sell(self) -> bool:
-        """Execute a sell order"""
+    def execute_sell(self, price_hint: float = None, urgent: bool = False) -> bool:
+        """Execute a sell order (urgent exits skip maker mode and go straight to market).
+
+        price_hint is only used if the fill price is unknown.
+        """
+        if self.sync_trade():
+            return False
+
+        # Take the trade away from the tick-level engine (unless it is already exiting it)
+        if self.exit_engine and self.current_trade_id and \
+                not self.exit_engine.claim_trade(self.current_trade_id):
+            logger.info(f"🛡️ Protective exit already in progress for {self.current_trade_id}")
+            return False
+        
+        # Cancel the exchange-side OCO first (it locks the balance we are about to sell)
+        if self.oco_manager and self.current_trade_id and \
+                not self.oco_manager.release(self.current_trade_id):
+            logger.info(f"🛡️ OCO already filled for {self.current_trade_id}")
+            return False
+        
         try:
-            current_price = self.get_current_price()
-            
-            # Place market sell order
-            order = self.client.place_market_sell(self.symbol, self.quantity)
+            # Place market sell order (closing a trade always reuses the same client order ID)
+            trade_record = self.trade_manager.get_trade_by_id(self.current_trade_id) \
+                if self.current_trade_id else None
+            if trade_record and trade_record.status != 'open':
+                self.sync_trade()
+                return False
+            if trade_record:
+                intent = close_intent(trade_record)
+            else:
+                intent = OrderIntent(
+                    symbol=self.symbol,
+                    side='SELL',
+                    quantity=self.quantity,
+                    key=self._order_key('close')
+                )
+            executor = self.execution if urgent or not self.maker else self.maker
+            result = executor.execute(intent)
+            order = result.order
             
             if order:
-                profit_loss = (current_price - self.entry_price) * self.quantity
+                self.latency.record_order(self.strategy.name)
+                current_price = result.fill_price or price_hint or self.get_current_price()
+                quantity = min(result.filled_qty or intent.quantity, intent.quantity)
+                partial = quantity < intent.quantity * 0.999
+                profit_loss = (current_price - self.entry_price) * quantity
                 profit_pct = ((current_price - self.entry_price) / self.entry_price) * 100
                 
-                self.in_position = False
-                self.strategy.clear_position()
-                
-                # Close trade in persistent storage
+                # Close trade in persistent storage (a partial exit splits off the part sold)
+                closed_id = self.current_trade_id
                 if self.current_trade_id:
-                    self.trade_manager.close_trade(
-                        trade_id=self.current_trade_id,
-                        exit_price=current_price,
+                    closed = self.trade_manager.close_part(
+                        self.current_trade_id, quantity, current_price,
                         order_id=str(order.get('orderId'))
                     )
+                    closed_id = closed.id if closed else closed_id
+                
+                if not partial:
+                    self.in_position = False
+                    self.strategy.clear_position()
                 
                 trade = {
                     'type': 'SELL',
                     'symbol': self.symbol,
-                    'quantity': self.quantity,
+                    'quantity': quantity,
                     'price': current_price,
-                    'timestamp': datetime.now(),
+                    'timestamp': self.clock.now(),
                     'order_id': order.get('orderId'),
                     'profit_loss': profit_loss,
                     'profit_pct': profit_pct,
-                    'trade_id': self.current_trade_id
+                    'trade_id': closed_id
                 }
                 self.trades.append(trade)
-                self.current_trade_id = None
                 
                 emoji = "💰" if profit_loss >= 0 else "📉"
-                logger.info(f"{emoji} Sold {self.quantity} {self.symbol} @ ${current_price:,.2f}")
+                logger.info(f"{emoji} Sold {quantity} {self.symbol} @ ${current_price:,.2f}")
                 logger.info(f"   P/L: ${profit_loss:,.2f} ({profit_pct:+.2f}%)")
                 
+                if partial:
+                    # Only part of it sold: keep the rest open and protected
+                    logger.warning(f"⚠️ Partial exit, {intent.quantity - quantity:.8f} {self.symbol} still open")
+                    self._rearm_protective_exit()
+                    return True
+                
+                self.current_trade_id = None
                 self.entry_price = 0.0
                 return True
             
+            self._rearm_protective_exit()
             return False
             
         except Exception as e:
             logger.error(f"Error executing sell: {e}")
+            self._rearm_protective_exit()
+            return False
+    
+    def _protect_trade(self, trade):
+        """Protect an open trade with an exchange OCO, else with the tick-level engine"""
+        if self.oco_manager and self.oco_manager.protect(trade):
+            return
+        if self.exit_engine:
+            self.exit_engine.add_trade(trade)
+    
+    def _rearm_protective_exit(self):
+        """Re-protect the open trade after a failed sell"""
+        if self.in_position and self.current_trade_id:
+            trade = self.trade_manager.get_trade_by_id(self.current_trade_id)
+            if trade and trade.status == 'open':
+                self._protect_trade(trade)
+    
+    def sync_trade(self) -> bool:
+        """Drop the current trade if it was closed elsewhere (manual close, another process)"""
+        if not self.current_trade_id:
+            return False
+        trade = self.trade_manager.get_trade_by_id(self.current_trade_id)
+        if not trade or trade.status == 'open':
             return False
+        logger.info(f"🛡️ {self.current_trade_id} was closed elsewhere, nothing to sell")
+        self.in_position = False
+        self.strategy.clear_position()
+        self.current_trade_id = None
+        self.entry_price = 0.0
+        return True
+    
+    def _on_protective_exit(self, closed_trade, reason: str):
+        """Sync bot state after the tick-level engine closed our trade"""
+        if closed_trade.id != self.current_trade_id:
+            return
+        self.trades.append({
+            'type': 'SELL',
+            'symbol': self.symbol,
+            'quantity': closed_trade.quantity,
+            'price': closed_trade.exit_price,
+            'timestamp': self.clock.now(),
+            'order_id': closed_trade.order_id,
+            'profit_loss': closed_trade.profit_loss,
+            'profit_pct': closed_trade.profit_loss_pct,
+            'trade_id': closed_trade.id,
+            'reason': reason
+        })
+        self.in_position = False
+        self.entry_price = 0.0
+        self.current_trade_id = None
+        self.strategy.clear_position()
+        logger.info(f"🛡️ {reason} executed at tick level @ ${closed_trade.exit_price:,.2f}")
+    
+    def _on_algo_done(self, algo):
+        """Take the position once our sliced entry has finished"""
+        if algo.id != self.pending_algo_id:
+            return
+        self.pending_algo_id = None
+        self._algo_finished.set()
+        trade = self.trade_manager.get_trade_by_id(algo.trade_id) if algo.trade_id else None
+        if not trade:
+            logger.warning(f"⚠️ {algo.style} entry {algo.id} {algo.status} without a fill")
+            return
+        self.latency.record_order(self.strategy.name)
+        self.in_position = True
+        self.entry_price = trade.entry_price
+        self.current_trade_id = trade.id
+        self.strategy.update_position('LONG', trade.entry_price)
+        self._protect_trade(trade)
+        self.trades.append({
+            'type': 'BUY',
+            'symbol': self.symbol,
+            'quantity': trade.quantity,
+            'price': trade.entry_price,
+            'timestamp': self.clock.now(),
+            'order_id': trade.order_id,
+            'trade_id': trade.id
+        })
+        logger.info(f"📈 Bought {trade.quantity} {self.symbol} @ ${trade.entry_price:,.2f} "
+                    f"({algo.style}, {algo.children_done} child orders)")
+    
+    def _order_key(self, action: str) -> str:
+        """Idempotency key of a new order (clock time in ms plus a per-bot sequence)"""
+        self._order_seq += 1
+        return f"{self.slot_id or self.symbol}:{self.strategy.name}:{action}:" \
+               f"{int(self.clock.time() * 1000)}:{self._order_seq}"
+    
+    def _cancel_pending_algo(self):
+        """Stop a sliced entry in progress and wait for its in-flight children"""
+        if not self.algo_engine or not self.pending_algo_id:
+            return
+        algo = self.algo_engine.get(self.pending_algo_id)
+        if not algo:
+            # Pruned from the engine's finished algos: nothing left to wait for
+            self.pending_algo_id = None
+            return
+        self.algo_engine.cancel(algo.id)
+        # Real time, not the bot's clock: the children are in flight on the exchange
+        if not algo.done and not self._algo_finished.wait(config.ORDER_TIMEOUT_SECONDS):
+            logger.warning(f"⚠️ Entry {algo.id} still {algo.status} after cancelling")
     
     def check_stop_loss_take_profit(self, current_price: float) -> Optional[str]:
         """Check if stop loss or take profit is triggered"""
@@ -224,83 +565,83 @@ class TradingBot:
     
     def run_once(self) -> Optional[str]:
         """Run one iteration of the trading logic"""
+        self.latency.start_tick()
         try:
-            # Get current price
-            current_price = self.get_current_price()
-            logger.info(f"💵 {self.symbol}: ${current_price:,.2f}")
-            
-            # Check stop loss / take profit first
-            if self.in_position:
-                sl_tp = self.check_stop_loss_take_profit(current_price)
-                if sl_tp:
-                    self.execute_sell()
-                    return sl_tp
-            # Get historical data for strategy
-            if getattr(self.strategy, 'requires_multi_tf', False):
-                htf_interval = getattr(self.strategy, 'htf_interval', '1h')
-                ltf_interval = getattr(self.strategy, 'ltf_interval', '5m')
-                htf_limit = 150 if htf_interval.endswith('h') else 200
-                ltf_limit = 120 if ltf_interval.endswith('m') else 100
-
-                df_htf = self.client.get_historical_klines(
-                    self.symbol,
-                    interval=htf_interval,
-                    limit=htf_limit
-                )
-
-                df_ltf = self.client.get_historical_klines(
-                    self.symbol,
-                    interval=ltf_interval,
-                    limit=ltf_limit
-                )
-
-                if df_htf.empty or df_ltf.empty:
-                    logger.warning("No historical data available (multi-TF)")
-                    return None
-
-                signal = self.strategy.generate_signal({'htf': df_htf, 'ltf': df_ltf})
-            else:
-                # Use 1m candles for 1min strategy, otherwise configured interval
-                interval = '1m' if isinstance(self.strategy, OneMinuteStrategy) else self.interval
-                limit = 100 if interval == '1h' else 50  # Less data for 1m
-                
-                df = self.client.get_historical_klines(
-                    self.symbol,
-                    interval=interval,
-                    limit=limit
-                )
-                
-                if df.empty:
-                    logger.warning("No historical data available")
-                    return None
-                
-                # Generate trading signal
-                signal = self.strategy.generate_signal(df)
-            
-            # Log signal analysis
-            if signal == Signal.BUY:
-                logger.info("📊 Signal: BUY 🟢")
-            elif signal == Signal.SELL:
-                logger.info("📊 Signal: SELL 🔴")
-            else:
-                logger.info("📊 Signal: HOLD ⏸️")
-            
-            # Execute based on signal
-            if signal == Signal.BUY and not self.in_position:
-                self.execute_buy()
-                return 'BUY'
-            elif signal == Signal.SELL and self.in_position:
-                self.execute_sell()
-                return 'SELL'
-            
-            return 'HOLD'
-            
+            with self.latency.span(self.strategy.name, 'tick'):
+                return self._run_tick()
         except Exception as e:
             logger.error(f"Error in run_once: {e}")
             return None
+        finally:
+            self.latency.end_tick()
+    
+    def _run_tick(self) -> Optional[str]:
+        """Trading logic for one tick, timed stage by stage"""
+        span = self.latency.span
+        name = self.strategy.name
+        
+        # Get current price
+        with span(name, 'price_fetch'):
+            current_price = self.get_current_price()
+        logger.info(f"💵 {self.symbol}: ${current_price:,.2f}")
+        
+        if self.pending_algo_id:
+            logger.info(f"🧮 Entry {self.pending_algo_id} still working")
+            return 'ALGO'
+        
+        # Check stop loss / take profit first
+        if self.in_position:
+            with span(name, 'sl_tp_check'):
+                sl_tp = self.check_stop_loss_take_profit(current_price)
+            if sl_tp:
+                with span(name, 'order'):
+                    self.execute_sell(current_price, urgent=True)
+                return sl_tp
+        # Get historical data for strategy
+        requirements = kline_requirements(self.strategy, self.interval)
+        with span(name, 'kline_fetch'):
+            frames = {key: self._get_klines(interval, limit)
+                      for key, (interval, limit) in requirements.items()}
+        
+        if any(df.empty for df in frames.values()):
+            logger.warning("No historical data available")
+            return None
+        
+        # Generate trading signal (multi-TF strategies get {'htf': df, 'ltf': df})
+        with span(name, 'signal'):
+            signal = self.strategy.generate_signal(frames['df'] if 'df' in frames else frames)
+        
+        with span(name, 'snapshot'):
+            self._checkpoint_on_bar_close()
+        
+        # Log signal analysis
+        if signal == Signal.BUY:
+            logger.info("📊 Signal: BUY 🟢")
+        elif signal == Signal.SELL:
+            logger.info("📊 Signal: SELL 🔴")
+        else:
+            logger.info("📊 Signal: HOLD ⏸️")
+        
+        # Execute based on signal
+        if signal == Signal.BUY and not self.in_position:
+            with span(name, 'order'):
+                self.execute_buy(current_price)
+            return 'BUY'
+        elif signal == Signal.SELL and self.in_position:
+            with span(name, 'order'):
+                self.execute_sell(current_price)
+            return 'SELL'
+        
+        return 'HOLD'
+    
+    def get_latency_summary(self) -> dict:
+        """Get per-stage latency stats for this bot"""
+        summary = self.latency.summary()
+        summary['symbol'] = self.symbol
+        return summary
     
-    def run(self, interval_seconds: int = 60):
-        """Run the bot continuously"""
+    def run(self, interval_seconds: int = 60, iterations: int = None):
+        """Run the bot continuously (or for a fixed number of iterations)"""
         self.running = True
         logger.info(f"🚀 Starting bot - checking every {interval_seconds} seconds")
         
@@ -310,24 +651,29 @@ class TradingBot:
         while self.running:
             try:
                 self.run_once()
+                if iterations is not None:
+                    iterations -= 1
+                    if iterations <= 0:
+                        break
                 
                 # Wait for next iteration
                 logger.debug(f"Sleeping for {interval_seconds} seconds...")
-                time.sleep(interval_seconds)
+                self.clock.sleep(interval_seconds)
                 
             except KeyboardInterrupt:
                 logger.info("Bot stopped by user")
                 self.stop()
             except Exception as e:
                 logger.error(f"Error in main loop: {e}")
-                time.sleep(10)  # Wait before retrying
+                self.clock.sleep(10)  # Wait before retrying
     
     def close_all_positions(self):
         """Close all open positions before shutdown"""
+        self._cancel_pending_algo()
         if self.in_position:
             logger.warning("🔴 Closing open position before shutdown...")
             try:
-                self.execute_sell()
+                self.execute_sell(urgent=True)
                 logger.info("✅ Position closed successfully")
             except Exception as e:
                 logger.error(f"❌ Failed to close position: {e}")
@@ -341,6 +687,17 @@ class TradingBot:
         
         # Close all open positions first
         self.close_all_positions()
+        self.save_snapshot()
+        if self._owns_exit_engine:
+            self.exit_engine.stop()
+        if self._owns_oco_manager:
+            self.oco_manager.stop()
+        if self._owns_algo_engine:
+            self.algo_engine.stop()
+        if self._owns_maker:
+            self.maker.stop()
+        if self._owns_execution:
+            self.execution.shutdown()
         
         logger.info("🛑 Bot stopped")
         self.print_summary()
@@ -18,6 +18,10 @@ USE_TESTNET = os.getenv('USE_TESTNET', 'True').lower() == 'true'
 TESTNET_API_URL = 'https://testnet.binance.vision/api'
 TESTNET_WS_URL = 'wss://testnet.binance.vision/ws'
 
+# WebSocket base URLs (combined streams: <base>/stream?streams=...)
+LIVE_WS_BASE_URL = 'wss://stream.binance.com:9443'
+TESTNET_WS_BASE_URL = 'wss://testnet.binance.vision'
+
 # Trading Configuration
 TRADE_SYMBOL = os.getenv('TRADE_SYMBOL', 'BTCUSDT')
 TRADE_QUANTITY = float(os.getenv('TRADE_QUANTITY', '0.001'))
@@ -34,6 +38,60 @@ EMA_LONG_PERIOD = 21
 STOP_LOSS_PERCENT = 2.0  # 2% stop loss
 TAKE_PROFIT_PERCENT = 4.0  # 4% take profit
 MAX_POSITION_SIZE = 0.1  # Maximum 10% of portfolio per trade
+TICK_EXITS_ENABLED = os.getenv('TICK_EXITS_ENABLED', 'True').lower() == 'true'  # Watch SL/TP on every tick
+TRAILING_STOP_PERCENT = float(os.getenv('TRAILING_STOP_PERCENT', '0'))  # 0 = fixed stop loss
+EXCHANGE_OCO_ENABLED = os.getenv('EXCHANGE_OCO_ENABLED', 'False').lower() == 'true'  # Place OCO exits on entry (opt-in)
+OCO_STOP_LIMIT_OFFSET_PERCENT = 0.1  # Stop-limit price sits 0.1% beyond the stop trigger
+
+# Order Execution
+EXECUTION_WORKERS = int(os.getenv('EXECUTION_WORKERS', '8'))  # Orders placed in parallel
+ORDER_TIMEOUT_SECONDS = float(os.getenv('ORDER_TIMEOUT_SECONDS', '10'))  # REST request timeout
+ORDER_MAX_ATTEMPTS = 3  # Placements per order after timeouts (same client order ID)
+ORDER_RETRY_DELAY_SECONDS = 0.5  # Backoff step between attempts
+EXECUTION_MODE = os.getenv('EXECUTION_MODE', 'market').upper()  # MARKET or MAKER (post at best bid/ask)
+MAKER_MAX_CHASE_TICKS = int(os.getenv('MAKER_MAX_CHASE_TICKS', '5'))  # How far a maker order follows the book
+MAKER_TIME_BUDGET_SECONDS = float(os.getenv('MAKER_TIME_BUDGET_SECONDS', '30'))  # Then the rest goes market
+ALGO_EXECUTION = os.getenv('ALGO_EXECUTION', 'market').upper()  # MARKET, TWAP, VWAP or POV for entries
+ALGO_DURATION_SECONDS = float(os.getenv('ALGO_DURATION_SECONDS', '300'))  # Time to work a parent order
+ALGO_SLICES = int(os.getenv('ALGO_SLICES', '10'))  # Child orders (POV: volume checks)
+ALGO_PARTICIPATION_RATE = float(os.getenv('ALGO_PARTICIPATION_RATE', '0.1'))  # POV share of market volume
+
+# Paper Trading (simulated fills against the live book, no real orders)
+PAPER_TRADING = os.getenv('PAPER_TRADING', 'False').lower() == 'true'
+PAPER_BALANCES = os.getenv('PAPER_BALANCES', 'USDT:10000')  # Starting balances, e.g. USDT:10000,BTC:0.1
+PAPER_LATENCY_MS = float(os.getenv('PAPER_LATENCY_MS', '50'))  # Simulated order round trip
+PAPER_MAKER_FEE_BPS = float(os.getenv('PAPER_MAKER_FEE_BPS', '10'))  # 0.10%
+PAPER_TAKER_FEE_BPS = float(os.getenv('PAPER_TAKER_FEE_BPS', '10'))  # 0.10%
+PAPER_SLIPPAGE_BPS = float(os.getenv('PAPER_SLIPPAGE_BPS', '1'))  # Beyond the touch on market orders
+PAPER_IMPACT_BPS = float(os.getenv('PAPER_IMPACT_BPS', '5'))  # Extra per top-of-book size walked through
+PAPER_SPREAD_BPS = float(os.getenv('PAPER_SPREAD_BPS', '1'))  # Assumed spread when only a price is known
+REPLAY_KLINES_FILE = os.getenv('REPLAY_KLINES_FILE', '')  # Klines CSV test scripts replay with --virtual ('' = fetch once)
+VIRTUAL_TRADES_FILE = os.getenv('VIRTUAL_TRADES_FILE', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'virtual', 'trades.json'))  # --virtual runs keep their own history
+
+# Trade Storage
+TRADE_STORAGE = os.getenv('TRADE_STORAGE', 'journal').lower()  # journal (append-only), sqlite (indexed) or json (full rewrite)
+JOURNAL_FSYNC_INTERVAL_MS = float(os.getenv('JOURNAL_FSYNC_INTERVAL_MS', '50'))  # Group fsync window (0 = every write)
+JOURNAL_COMPACT_RECORDS = int(os.getenv('JOURNAL_COMPACT_RECORDS', '10000'))  # Fold into trades.json after this many
+TRADE_COLUMNAR = os.getenv('TRADE_COLUMNAR', 'False').lower() == 'true'  # Keep closed trades as NumPy columns in memory
+TRADE_ARCHIVE = os.getenv('TRADE_ARCHIVE', 'True').lower() == 'true'  # Move old closed trades to monthly segments
+ARCHIVE_HOT_DAYS = int(os.getenv('ARCHIVE_HOT_DAYS', '31'))  # Closed trades stay hot at least this long (whole months)
+ARCHIVE_CACHE_SEGMENTS = int(os.getenv('ARCHIVE_CACHE_SEGMENTS', '12'))  # Opened segments kept in memory
+ANALYTICS_TIMEZONE = os.getenv('ANALYTICS_TIMEZONE', '')  # Day/week/month boundaries, e.g. UTC ('' = server local time)
+ANALYTICS_STARTING_EQUITY = float(os.getenv('ANALYTICS_STARTING_EQUITY', '0'))  # Capital for return % and drawdown % (0 = P&L only)
+
+# State Snapshots (warm restarts)
+SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', 'True').lower() == 'true'
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv('SNAPSHOT_MAX_AGE_SECONDS', '900'))  # Ignore snapshots older than 15 min
+
+# Portfolio Runner (many symbol/strategy slots in one process)
+PORTFOLIO_CONFIG = os.getenv('PORTFOLIO_CONFIG', 'portfolio.json')
+MARKET_DATA_TTL_SECONDS = float(os.getenv('MARKET_DATA_TTL_SECONDS', '5'))  # Shared feed cache lifetime
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', str(max(1, (os.cpu_count() or 2) - 1))))  # Strategy worker processes
+
+# Latency Instrumentation
+LATENCY_TRACKING = os.getenv('LATENCY_TRACKING', 'True').lower() == 'true'
+LATENCY_WINDOW = int(os.getenv('LATENCY_WINDOW', '1000'))  # Samples kept per stage
 
 # Logging
 LOG_LEVEL = 'INFO'
@@ -3,6 +3,7 @@ Binance Exchange Client - Handles all API interactions
 """
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
+from decimal import Decimal, ROUND_DOWN
 import pandas as pd
 from typing import Optional, Dict, List
 import config
@@ -22,12 +23,46 @@ class BinanceClient:
             self.client = Client(
                 self.api_key, 
                 self.api_secret,
+                requests_params={'timeout': config.ORDER_TIMEOUT_SECONDS},
                 testnet=True
             )
             logger.info("🧪 Connected to Binance TESTNET")
         else:
-            self.client = Client(self.api_key, self.api_secret)
+            self.client = Client(
+                self.api_key,
+                self.api_secret,
+                requests_params={'timeout': config.ORDER_TIMEOUT_SECONDS}
+            )
             logger.info("🔴 Connected to Binance LIVE")
+        
+        self._symbol_filters = {}
+    
+    def get_symbol_filters(self, symbol: str) -> Dict[str, Dict]:
+        """Get exchange filters for a symbol (cached), keyed by filter type"""
+        if symbol not in self._symbol_filters:
+            try:
+                info = self.client.get_symbol_info(symbol) or {}
+                self._symbol_filters[symbol] = {f['filterType']: f for f in info.get('filters', [])}
+            except BinanceAPIException as e:
+                logger.error(f"Error getting symbol info for {symbol}: {e}")
+                return {}
+        return self._symbol_filters[symbol]
+    
+    @staticmethod
+    def _round_step(value: float, step: str) -> str:
+        step_dec = Decimal(step).normalize()
+        rounded = (Decimal(str(value)) / step_dec).to_integral_value(rounding=ROUND_DOWN) * step_dec
+        return format(rounded, 'f')
+    
+    def round_price(self, symbol: str, price: float) -> str:
+        """Round a price down to the symbol's tick size"""
+        tick = self.get_symbol_filters(symbol).get('PRICE_FILTER', {}).get('tickSize')
+        return self._round_step(price, tick) if tick and float(tick) > 0 else f"{price:.8f}"
+    
+    def round_quantity(self, symbol: str, quantity: float) -> str:
+        """Round a quantity down to the symbol's lot step size"""
+        step = self.get_symbol_filters(symbol).get('LOT_SIZE', {}).get('stepSize')
+        return self._round_step(quantity, step) if step and float(step) > 0 else f"{quantity:.8f}"
     
     def get_account_balance(self, asset: str = 'USDT') -> float:
         """Get balance for a specific asset"""
@@ -69,6 +104,29 @@ class BinanceClient:
             logger.error(f"Error getting price for {symbol}: {e}")
             return 0.0
     
+    def get_book_ticker(self, symbol: str) -> Optional[Dict[str, float]]:
+        """Get best bid/ask (and their sizes) for a symbol"""
+        try:
+            ticker = self.client.get_orderbook_ticker(symbol=symbol)
+            return {
+                'bid': float(ticker['bidPrice']),
+                'ask': float(ticker['askPrice']),
+                'bid_qty': float(ticker['bidQty']),
+                'ask_qty': float(ticker['askQty'])
+            }
+        except BinanceAPIException as e:
+            logger.error(f"Error getting book ticker for {symbol}: {e}")
+            return None
+    
+    def get_all_prices(self) -> Dict[str, float]:
+        """Get latest prices for all symbols in one request"""
+        try:
+            tickers = self.client.get_all_tickers()
+            return {t['symbol']: float(t['price']) for t in tickers}
+        except BinanceAPIException as e:
+            logger.error(f"Error getting all prices: {e}")
+            return {}
+    
     def get_historical_klines(
         self, 
         symbol: str, 
@@ -101,6 +159,22 @@ class BinanceClient:
             logger.error(f"Error getting klines: {e}")
             return pd.DataFrame()
     
+    @staticmethod
+    def fill_price(order: Optional[Dict]) -> Optional[float]:
+        """Get the average fill price from an order response"""
+        if not order:
+            return None
+        fills = order.get('fills') or []
+        qty = sum(float(f['qty']) for f in fills)
+        if qty > 0:
+            return sum(float(f['price']) * float(f['qty']) for f in fills) / qty
+        executed = float(order.get('executedQty', 0) or 0)
+        quote = float(order.get('cummulativeQuoteQty', 0) or 0)
+        if executed > 0 and quote > 0:
+            return quote / executed
+        price = float(order.get('price', 0) or 0)
+        return price or None
+    
     def place_market_buy(self, symbol: str, quantity: float) -> Optional[Dict]:
         """Place a market buy order"""
         try:
@@ -127,6 +201,29 @@ class BinanceClient:
             logger.error(f"Error placing sell order: {e}")
             return None
     
+    def place_market_order(
+        self,
+        symbol: str,
+        side: str,
+        quantity: float,
+        client_order_id: str
+    ) -> Optional[Dict]:
+        """Place a market order with our own client order ID (timeouts are raised)"""
+        try:
+            order = self.client.create_order(
+                symbol=symbol,
+                side=side,
+                type='MARKET',
+                quantity=self.round_quantity(symbol, quantity),
+                newClientOrderId=client_order_id,
+                newOrderRespType='FULL'
+            )
+            logger.info(f"✅ {side} Order placed: {quantity} {symbol} ({client_order_id})")
+            return order
+        except BinanceAPIException as e:
+            logger.error(f"Error placing {side.lower()} order {client_order_id}: {e}")
+            return None
+    
     def place_limit_buy(
         self, 
         symbol: str, 
@@ -165,6 +262,54 @@ class BinanceClient:
             logger.error(f"Error placing limit sell order: {e}")
             return None
     
+    def place_limit_maker(
+        self,
+        symbol: str,
+        side: str,
+        quantity: float,
+        price: float,
+        client_order_id: str
+    ) -> Optional[Dict]:
+        """Place a post-only limit order (rejected instead of taking liquidity)"""
+        try:
+            order = self.client.create_order(
+                symbol=symbol,
+                side=side,
+                type='LIMIT_MAKER',
+                quantity=self.round_quantity(symbol, quantity),
+                price=self.round_price(symbol, price),
+                newClientOrderId=client_order_id
+            )
+            logger.info(f"✅ {side} maker order placed: {quantity} {symbol} @ {price}")
+            return order
+        except BinanceAPIException as e:
+            logger.warning(f"⚠️ Maker order {client_order_id} rejected: {e}")
+            return None
+    
+    def place_oco_sell(
+        self,
+        symbol: str,
+        quantity: float,
+        take_profit: float,
+        stop_price: float,
+        stop_limit_price: float
+    ) -> Optional[Dict]:
+        """Place an OCO sell: limit take-profit + stop-limit stop-loss"""
+        try:
+            order_list = self.client.order_oco_sell(
+                symbol=symbol,
+                quantity=self.round_quantity(symbol, quantity),
+                price=self.round_price(symbol, take_profit),
+                stopPrice=self.round_price(symbol, stop_price),
+                stopLimitPrice=self.round_price(symbol, stop_limit_price),
+                stopLimitTimeInForce='GTC'
+            )
+            logger.info(f"🛡️ OCO placed: {quantity} {symbol} TP {take_profit:,.2f} / SL {stop_price:,.2f}")
+            return order_list
+        except BinanceAPIException as e:
+            logger.error(f"Error placing OCO order: {e}")
+            return None
+    
     def cancel_order(self, symbol: str, order_id: int) -> bool:
         """Cancel an existing order"""
         try:
@@ -175,6 +320,15 @@ class BinanceClient:
             logger.error(f"Error cancelling order: {e}")
             return False
     
+    def cancel_order_by_client_id(self, symbol: str, client_order_id: str) -> Optional[Dict]:
+        """Cancel an order by client order ID; the response has its final executed qty"""
+        try:
+            return self.client.cancel_order(symbol=symbol, origClientOrderId=client_order_id)
+        except BinanceAPIException as e:
+            if e.code != -2011:  # Unknown order: already filled or cancelled
+                logger.error(f"Error cancelling order {client_order_id}: {e}")
+            return None
+    
     def get_open_orders(self, symbol: str = None) -> List[Dict]:
         """Get all open orders"""
         try:
@@ -192,3 +346,12 @@ class BinanceClient:
         except BinanceAPIException as e:
             logger.error(f"Error getting order status: {e}")
             return None
+    
+    def get_order_by_client_id(self, symbol: str, client_order_id: str) -> Optional[Dict]:
+        """Get an order by our client order ID (None if the exchange never saw it)"""
+        try:
+            return self.client.get_order(symbol=symbol, origClientOrderId=client_order_id)
+        except BinanceAPIException as e:
+            if e.code != -2013:  # Order does not exist
+                logger.error(f"Error getting order {client_order_id}: {e}")
+            return None
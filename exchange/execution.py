@@ -0,0 +1,162 @@
+"""
+Execution Pipeline - Concurrent, idempotent market order placement
+
+Every order intent gets a deterministic newClientOrderId derived from its
+key, so a request that timed out can be looked up by client ID and retried
+without risking a double fill. The exchange only rejects a duplicate client
+ID while that order is open, so every retry looks its client ID up first and
+reuses what it finds; intents that must never fill twice (closes) do so even
+on the first attempt.
+"""
+import hashlib
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import requests
+import config
+from exchange.binance_client import BinanceClient
+from utils.logger import setup_logger
+
+logger = setup_logger('Execution')
+
+# Network errors where the order may or may not have reached the exchange
+AMBIGUOUS_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+# Final order states that filled nothing
+DEAD_STATUSES = ('CANCELED', 'REJECTED', 'EXPIRED', 'EXPIRED_IN_MATCH')
+
+
+def client_order_id(key: str) -> str:
+    """Deterministic Binance client order ID (max 36 chars) for an intent key"""
+    return 'tb-' + hashlib.sha1(key.encode()).hexdigest()[:32]
+
+
+@dataclass
+class OrderIntent:
+    """A market order we want filled exactly once"""
+    symbol: str
+    side: str  # BUY or SELL
+    quantity: float
+    key: str  # Same key => same client order ID (e.g. "close:<trade_id>")
+    created_at: float = field(default_factory=time.time)
+    once: bool = False  # Reuse an existing order with this client ID, whatever its status
+
+    @property
+    def client_order_id(self) -> str:
+        return client_order_id(self.key)
+
+
+def close_intent(trade) -> OrderIntent:
+    """Exit order for an open trade; every component closing it shares the client ID
+
+    The quantity is part of the key so the remainder of a partly exited trade gets a fresh one.
+    """
+    return OrderIntent(
+        symbol=trade.symbol,
+        side='SELL' if trade.side.upper() == 'BUY' else 'BUY',
+        quantity=trade.quantity,
+        key=f"close:{trade.id}:{trade.entry_time}:{trade.quantity}",
+        once=True
+    )
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of one order intent"""
+    intent: OrderIntent
+    order: Optional[Dict] = None
+    fill_price: Optional[float] = None
+    filled_qty: float = 0.0
+    attempts: int = 0
+    latency_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.order is not None
+
+    @property
+    def order_id(self) -> Optional[str]:
+        return str(self.order.get('orderId')) if self.order else None
+
+
+class ExecutionPipeline:
+    """Runs order intents on a pool of workers with timeout-safe retries"""
+
+    def __init__(self, client: BinanceClient, workers: int = None, max_attempts: int = None):
+        self.client = client
+        self.max_attempts = max_attempts or config.ORDER_MAX_ATTEMPTS
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or config.EXECUTION_WORKERS,
+            thread_name_prefix='order'
+        )
+
+    def submit(self, intent: OrderIntent) -> Future:
+        """Queue an intent; the future resolves to an ExecutionResult"""
+        return self._executor.submit(self._execute, intent)
+
+    def execute(self, intent: OrderIntent) -> ExecutionResult:
+        """Place an order and wait for the result"""
+        return self.submit(intent).result()
+
+    def execute_many(self, intents: List[OrderIntent]) -> List[ExecutionResult]:
+        """Place several orders in parallel, results in the same order"""
+        futures = [self.submit(intent) for intent in intents]
+        return [f.result() for f in futures]
+
+    def shutdown(self):
+        """Finish queued intents and stop the workers"""
+        self._executor.shutdown(wait=True)
+
+    def _execute(self, intent: OrderIntent) -> ExecutionResult:
+        result = ExecutionResult(intent=intent)
+        started = time.perf_counter()
+        coid = intent.client_order_id
+
+        while result.attempts < self.max_attempts and not result.ok:
+            result.attempts += 1
+            timed_out = False
+            try:
+                # A timed-out try may have filled yet not been visible to the lookup right after it
+                order = self.client.get_order_by_client_id(intent.symbol, coid) \
+                    if intent.once or result.attempts > 1 else None
+                if order:
+                    logger.info(f"♻️ {intent.side} {intent.symbol} ({coid}) already placed "
+                                f"({order.get('status')}), not sending it again")
+                else:
+                    order = self.client.place_market_order(intent.symbol, intent.side,
+                                                           intent.quantity, coid)
+            except AMBIGUOUS_ERRORS as e:
+                logger.warning(f"⏱️ {intent.side} {intent.symbol} ({coid}) timed out: {e}")
+                order = None
+                timed_out = True
+
+            # Rejected or timed out: it may still have filled (or be a duplicate of an earlier try)
+            if not order:
+                order = self.lookup(intent.symbol, coid)
+            if order and order.get('status') in DEAD_STATUSES and not float(order.get('executedQty', 0) or 0):
+                logger.warning(f"⚠️ {intent.side} {intent.symbol} ({coid}) {order['status'].lower()}")
+                break
+            if order:
+                result.order = order
+            elif not timed_out:
+                break  # Definitive rejection, retrying won't help
+            elif result.attempts < self.max_attempts:
+                time.sleep(config.ORDER_RETRY_DELAY_SECONDS * result.attempts)
+
+        result.latency_ms = (time.perf_counter() - started) * 1000
+        if result.ok:
+            result.fill_price = BinanceClient.fill_price(result.order)
+            result.filled_qty = float(result.order.get('executedQty', intent.quantity) or 0)
+        else:
+            logger.error(f"❌ {intent.side} {intent.quantity} {intent.symbol} failed "
+                         f"after {result.attempts} attempts")
+        return result
+
+    def lookup(self, symbol: str, coid: str) -> Optional[Dict]:
+        """Find an order by client ID, treating network errors as not found"""
+        try:
+            return self.client.get_order_by_client_id(symbol, coid)
+        except AMBIGUOUS_ERRORS as e:
+            logger.warning(f"⏱️ Order lookup for {coid} failed: {e}")
+            return None
@@ -0,0 +1,296 @@
+"""
+Maker Execution - Post-only limit orders that chase the best bid/ask
+
+An order is posted at the best bid (buy) or ask (sell) as LIMIT_MAKER and
+re-posted whenever the book moves away from it, up to a number of ticks from
+the first price. Fills are read from the user data stream. Whatever is
+still unfilled when the time budget runs out is sent as a market order.
+"""
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+import config
+from exchange.binance_client import BinanceClient
+from exchange.execution import (
+    AMBIGUOUS_ERRORS, ExecutionPipeline, ExecutionResult, OrderIntent, client_order_id
+)
+from exchange.market_stream import MarketStream, market_stream_for
+from exchange.user_stream import UserDataStream, user_stream_for
+from utils.logger import setup_logger
+
+logger = setup_logger('MakerExecution')
+
+# Longest wait between checks of the book / time budget
+POLL_SECONDS = 1.0
+# Cancel attempts at the deadline before giving up on the market remainder
+DEADLINE_CANCEL_ATTEMPTS = 10
+
+
+class _Chase:
+    """One passive order being worked"""
+
+    def __init__(self, intent: OrderIntent, tick: float, max_ticks: int):
+        self.intent = intent
+        self.is_buy = intent.side == 'BUY'
+        self.max_move = tick * max_ticks if tick > 0 else float('inf')
+        self.anchor: Optional[float] = None  # First posted price
+        self.price: Optional[float] = None   # Price of the resting order
+        self.coid: Optional[str] = None      # Client ID of the resting order
+        self.seq = 0
+        self.orders: Dict[str, Tuple[float, float]] = {}  # coid -> (executed qty, quote qty)
+        self.last_order_id = None
+        self.event = threading.Event()
+
+    @property
+    def filled(self) -> float:
+        return sum(q for q, _ in self.orders.values())
+
+    @property
+    def notional(self) -> float:
+        return sum(n for _, n in self.orders.values())
+
+    def record(self, coid: str, executed: float, quote: float):
+        """Store an order's cumulative fill (reports may arrive out of order)"""
+        if executed >= self.orders.get(coid, (0.0, 0.0))[0]:
+            self.orders[coid] = (executed, quote)
+
+    def target(self, bid: float, ask: float) -> float:
+        """Best price on our side, capped at max_ticks from the first post"""
+        if self.is_buy:
+            return bid if self.anchor is None else min(bid, self.anchor + self.max_move)
+        return ask if self.anchor is None else max(ask, self.anchor - self.max_move)
+
+    def needs_repost(self, bid: float, ask: float) -> bool:
+        if self.coid is None:
+            return True
+        target = self.target(bid, ask)
+        return target > self.price if self.is_buy else target < self.price
+
+
+class MakerExecutor:
+    """Same execute(intent) interface as ExecutionPipeline, but maker-first"""
+
+    def __init__(
+        self,
+        client: BinanceClient,
+        execution: ExecutionPipeline = None,
+        market_stream: MarketStream = None,
+        user_stream: UserDataStream = None,
+        max_chase_ticks: int = None,
+        time_budget_seconds: float = None
+    ):
+        self.client = client
+        self.execution = execution or ExecutionPipeline(client)
+        self.market_stream = market_stream or market_stream_for(client)
+        self.user_stream = user_stream or user_stream_for(client)
+        self.max_chase_ticks = config.MAKER_MAX_CHASE_TICKS if max_chase_ticks is None \
+            else max_chase_ticks
+        self.time_budget_seconds = time_budget_seconds or config.MAKER_TIME_BUDGET_SECONDS
+        self.book: Dict[str, Tuple[float, float]] = {}
+        self._chases: Dict[str, _Chase] = {}             # coid -> chase
+        self._by_symbol: Dict[str, Set[_Chase]] = {}
+        self._lock = threading.Lock()
+        self.market_stream.add_callback(self._on_price)
+        self.user_stream.on('executionReport', self._on_execution_report)
+
+    def start(self):
+        """Start the book and fill streams"""
+        self.market_stream.start()
+        self.user_stream.start()
+
+    def stop(self):
+        """Stop streaming"""
+        self.market_stream.stop()
+        self.user_stream.stop()
+
+    def execute(self, intent: OrderIntent) -> ExecutionResult:
+        """Work an order passively; the unfilled rest goes market at the deadline"""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.time_budget_seconds
+        symbol = intent.symbol
+        tick = float(self.client.get_symbol_filters(symbol).get('PRICE_FILTER', {}).get('tickSize', 0) or 0)
+        chase = _Chase(intent, tick, self.max_chase_ticks)
+
+        with self._lock:
+            self._by_symbol.setdefault(symbol, set()).add(chase)
+        self.market_stream.subscribe(symbol)
+        posts = 0
+        resting = False
+        try:
+            if intent.once:
+                self._recover(chase)
+            while self._remaining(chase) > 0 and time.monotonic() < deadline:
+                book = self._best(symbol)
+                if book and chase.needs_repost(*book) and self._repost(chase, chase.target(*book)):
+                    posts += 1
+                chase.event.wait(min(POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+                chase.event.clear()
+            # The resting order must be gone (and its fills counted) before the rest goes
+            # market; it stays registered meanwhile so fill reports still reach the chase
+            for _ in range(DEADLINE_CANCEL_ATTEMPTS):
+                if not chase.coid or self._cancel(chase):
+                    break
+                chase.event.wait(POLL_SECONDS)
+                chase.event.clear()
+            resting = chase.coid is not None
+        finally:
+            with self._lock:
+                self._by_symbol[symbol].discard(chase)
+                for coid in [c for c, ch in self._chases.items() if ch is chase]:
+                    del self._chases[coid]
+                idle = not self._by_symbol[symbol]
+                if idle:
+                    del self._by_symbol[symbol]
+            if idle:
+                self.market_stream.unsubscribe(symbol)
+
+        maker_qty = chase.filled
+        remaining = self._remaining(chase)
+        if resting and remaining > 0:
+            logger.error(f"❌ Could not cancel maker order {chase.coid} for {intent.side} {symbol}, "
+                         f"not sending the {remaining} left at market")
+        elif remaining > 0:
+            logger.info(f"⏱️ Maker budget spent for {intent.side} {symbol}, "
+                        f"sending {remaining} at market")
+            taker = self.execution.execute(OrderIntent(
+                symbol=symbol,
+                side=intent.side,
+                quantity=remaining,
+                key=f"{intent.key}:taker",
+                once=intent.once
+            ))
+            if taker.ok:
+                chase.record(taker.intent.client_order_id, taker.filled_qty,
+                             taker.filled_qty * (taker.fill_price or 0))
+                chase.last_order_id = taker.order.get('orderId')
+
+        result = ExecutionResult(intent=intent, attempts=posts)
+        result.latency_ms = (time.perf_counter() - started) * 1000
+        if chase.filled > 0:
+            result.filled_qty = chase.filled
+            result.fill_price = chase.notional / chase.filled
+            result.order = {
+                'orderId': chase.last_order_id,
+                'clientOrderId': intent.client_order_id,
+                'status': 'FILLED' if self._remaining(chase) <= 0 else 'PARTIALLY_FILLED',
+                'executedQty': str(chase.filled),
+                'cummulativeQuoteQty': str(chase.notional)
+            }
+            logger.info(f"✅ {intent.side} {chase.filled} {symbol} @ {result.fill_price:,.4f} "
+                        f"({maker_qty / chase.filled * 100:.0f}% maker, {posts} posts)")
+        return result
+
+    def _remaining(self, chase: _Chase) -> float:
+        remaining = chase.intent.quantity - chase.filled
+        return float(self.client.round_quantity(chase.intent.symbol, remaining)) if remaining > 0 else 0.0
+
+    def _best(self, symbol: str) -> Optional[Tuple[float, float]]:
+        book = self.book.get(symbol)
+        if book:
+            return book
+        ticker = self.client.get_book_ticker(symbol)
+        if not ticker:
+            return None
+        self.book[symbol] = (ticker['bid'], ticker['ask'])
+        return self.book[symbol]
+
+    def _repost(self, chase: _Chase, price: float) -> bool:
+        """Replace the resting order at a new price; False if nothing was posted"""
+        if chase.coid and not self._cancel(chase):
+            return False  # Still resting (cancel failed); wait for its fill report
+        quantity = self._remaining(chase)
+        if quantity <= 0:
+            return False
+
+        # The sequence only advances once an order exists, so client IDs stay contiguous
+        coid = client_order_id(f"{chase.intent.key}:maker:{chase.seq + 1}")
+        with self._lock:
+            self._chases[coid] = chase
+        try:
+            order = self.client.place_limit_maker(chase.intent.symbol, chase.intent.side,
+                                                  quantity, price, coid)
+        except AMBIGUOUS_ERRORS:
+            order = None
+        if not order:
+            # Rejected, or an earlier try with this ID reached the exchange after all
+            order = self.execution.lookup(chase.intent.symbol, coid)
+        if not order:
+            return False  # Book moved through our price; retry on the next update
+
+        chase.seq += 1
+        chase.coid = coid
+        chase.price = price
+        if chase.anchor is None:
+            chase.anchor = price
+        chase.last_order_id = order.get('orderId')
+        chase.record(coid, float(order.get('executedQty', 0) or 0),
+                     float(order.get('cummulativeQuoteQty', 0) or 0))
+        return True
+
+    def _recover(self, chase: _Chase):
+        """Pick up the orders an earlier execute() of the same intent left behind"""
+        intent = chase.intent
+        while True:
+            coid = client_order_id(f"{intent.key}:maker:{chase.seq + 1}")
+            order = self.execution.lookup(intent.symbol, coid)
+            if not order:
+                break
+            chase.seq += 1
+            chase.last_order_id = order.get('orderId')
+            chase.record(coid, float(order.get('executedQty', 0) or 0),
+                         float(order.get('cummulativeQuoteQty', 0) or 0))
+            if order.get('status') in ('NEW', 'PARTIALLY_FILLED'):
+                # Still resting: adopt it, it is cancelled or re-posted like our own
+                chase.coid = coid
+                chase.price = float(order.get('price', 0) or 0)
+                with self._lock:
+                    self._chases[coid] = chase
+            if chase.anchor is None:
+                chase.anchor = float(order.get('price', 0) or 0) or None
+        coid = client_order_id(f"{intent.key}:taker")
+        order = self.execution.lookup(intent.symbol, coid)
+        if order:
+            chase.last_order_id = order.get('orderId')
+            chase.record(coid, float(order.get('executedQty', 0) or 0),
+                         float(order.get('cummulativeQuoteQty', 0) or 0))
+        if chase.seq or order:
+            logger.info(f"🔁 Recovered {chase.filled} {intent.symbol} already filled for {intent.key}")
+
+    def _cancel(self, chase: _Chase) -> bool:
+        """Cancel the resting order and record its final fill"""
+        symbol = chase.intent.symbol
+        try:
+            response = self.client.cancel_order_by_client_id(symbol, chase.coid)
+            if response is None:
+                # Unknown to the cancel endpoint: it filled in the meantime, or the request failed
+                response = self.client.get_order_by_client_id(symbol, chase.coid)
+        except AMBIGUOUS_ERRORS as e:
+            logger.warning(f"⏱️ Cancel of maker order {chase.coid} failed: {e}")
+            return False  # Status unknown: its fills may still come
+        if response is None or response.get('status') in ('NEW', 'PARTIALLY_FILLED'):
+            return False  # Still working (or status unknown): its fills may still come
+        if response:
+            chase.record(chase.coid, float(response.get('executedQty', 0) or 0),
+                         float(response.get('cummulativeQuoteQty', 0) or 0))
+        chase.coid = None
+        chase.price = None
+        return True
+
+    def _on_price(self, symbol: str, bid: float, ask: float):
+        self.book[symbol] = (bid, ask)
+        with self._lock:
+            chases = list(self._by_symbol.get(symbol, ()))
+        for chase in chases:
+            if chase.needs_repost(bid, ask):
+                chase.event.set()
+
+    def _on_execution_report(self, event: dict):
+        if event.get('x') != 'TRADE':
+            return
+        coid = event.get('c')
+        with self._lock:
+            chase = self._chases.get(coid)
+        if not chase:
+            return
+        chase.record(coid, float(event.get('z', 0) or 0), float(event.get('Z', 0) or 0))
+        chase.event.set()
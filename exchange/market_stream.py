@@ -0,0 +1,119 @@
+"""
+Market Stream - Real-time bookTicker updates over the Binance WebSocket
+"""
+import json
+import threading
+import time
+from typing import Callable, List, Set
+import websocket
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger('MarketStream')
+
+# callback(symbol, bid, ask)
+PriceCallback = Callable[[str, float, float], None]
+
+
+class MarketStream:
+    """Streams best bid/ask for a dynamic set of symbols, reconnecting on failure"""
+
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url or (
+            config.TESTNET_WS_BASE_URL if config.USE_TESTNET else config.LIVE_WS_BASE_URL
+        )
+        self.symbols: Set[str] = set()
+        self.callbacks: List[PriceCallback] = []
+        self.running = False
+        self._ws = None
+        self._thread = None
+        self._request_id = 0
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback: PriceCallback):
+        """Register a listener for price updates"""
+        self.callbacks.append(callback)
+
+    def _send(self, method: str, symbols):
+        if not self._ws or not symbols:
+            return
+        self._request_id += 1
+        try:
+            self._ws.send(json.dumps({
+                'method': method,
+                'params': [f"{s.lower()}@bookTicker" for s in symbols],
+                'id': self._request_id
+            }))
+        except Exception as e:
+            logger.warning(f"⚠️ Stream {method} failed: {e}")
+
+    def subscribe(self, symbol: str):
+        """Start streaming a symbol"""
+        with self._lock:
+            if symbol in self.symbols:
+                return
+            self.symbols.add(symbol)
+        self._send('SUBSCRIBE', [symbol])
+
+    def unsubscribe(self, symbol: str):
+        """Stop streaming a symbol"""
+        with self._lock:
+            if symbol not in self.symbols:
+                return
+            self.symbols.discard(symbol)
+        self._send('UNSUBSCRIBE', [symbol])
+
+    def _on_open(self, ws):
+        logger.info(f"🔌 Market stream connected ({len(self.symbols)} symbols)")
+        self._send('SUBSCRIBE', list(self.symbols))
+
+    def _on_message(self, ws, message):
+        msg = json.loads(message)
+        data = msg.get('data', msg)
+        if 'b' not in data or 's' not in data:
+            return  # Subscription ack or unrelated event
+        symbol = data['s']
+        bid = float(data['b'])
+        ask = float(data['a'])
+        for callback in self.callbacks:
+            try:
+                callback(symbol, bid, ask)
+            except Exception as e:
+                logger.error(f"Error in price callback: {e}")
+
+    def _on_error(self, ws, error):
+        logger.warning(f"⚠️ Market stream error: {error}")
+
+    def _run(self):
+        while self.running:
+            self._ws = websocket.WebSocketApp(
+                f"{self.base_url}/stream",
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error
+            )
+            self._ws.run_forever(ping_interval=20, ping_timeout=10)
+            if self.running:
+                logger.warning("🔌 Market stream disconnected, reconnecting...")
+                time.sleep(1)
+
+    def start(self):
+        """Connect in a background thread"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Disconnect"""
+        self.running = False
+        if self._ws:
+            self._ws.close()
+
+
+def market_stream_for(client=None) -> MarketStream:
+    """Book stream for a client (a paper exchange streams the book it matches against)"""
+    if hasattr(client, 'market_stream'):
+        return client.market_stream()
+    return MarketStream()
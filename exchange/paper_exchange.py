@@ -0,0 +1,702 @@
+"""
+Paper Exchange - Simulated order matching behind the BinanceClient interface
+
+Orders fill against a live book (pulled from a BinanceClient or its
+bookTicker stream) or a replayed one (candles fed through feed_candle), with
+latency, partial fills, fees and slippage. Nothing here is random, so a
+replay under a simulated clock is fully deterministic.
+
+Drop it in wherever a BinanceClient is expected:
+    client = PaperExchange(BinanceClient())
+"""
+import bisect
+import itertools
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+import config
+from exchange.binance_client import BinanceClient
+from utils.clock import REAL_CLOCK, Clock, VirtualClock
+from utils.logger import setup_logger
+
+logger = setup_logger('PaperExchange')
+
+QUOTE_ASSETS = ('USDT', 'FDUSD', 'USDC', 'BUSD', 'BTC', 'ETH', 'BNB')
+OPEN_STATUSES = ('NEW', 'PARTIALLY_FILLED')
+BOOK_TTL_SECONDS = 1.0  # Re-pull the live book after this long (when not streamed)
+MAX_ORDERS = 100_000    # Finished orders are pruned beyond this
+
+
+def parse_balances(spec: str) -> Dict[str, float]:
+    """'USDT:10000,BTC:0.5' -> {'USDT': 10000.0, 'BTC': 0.5}"""
+    balances = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        asset, amount = part.split(':')
+        balances[asset.strip().upper()] = float(amount)
+    return balances
+
+
+def split_symbol(symbol: str) -> Tuple[str, str]:
+    """BTCUSDT -> (BTC, USDT)"""
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    return symbol[:-4], symbol[-4:]
+
+
+class _PaperOrder:
+    """One simulated order"""
+    __slots__ = ('order_id', 'client_order_id', 'symbol', 'side', 'type', 'price', 'stop_price',
+                 'quantity', 'executed', 'quote', 'status', 'time', 'list_id', 'fills',
+                 'lock', 'lock_rate', 'triggered', 'entry')
+
+    def __init__(self, order_id, client_order_id, symbol, side, type_, quantity, price=0.0,
+                 stop_price=0.0, list_id=-1, now_ms=0):
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.symbol = symbol
+        self.side = side
+        self.type = type_
+        self.price = price
+        self.stop_price = stop_price
+        self.quantity = quantity
+        self.executed = 0.0
+        self.quote = 0.0
+        self.status = 'NEW'
+        self.time = now_ms
+        self.list_id = list_id
+        self.fills: List[Dict] = []
+        self.lock = [0.0]      # Funds still locked (shared by the legs of an OCO)
+        self.lock_rate = 1.0   # Locked units per unit of quantity
+        self.triggered = False
+        self.entry = None      # (list, key) while resting
+
+    @property
+    def remaining(self) -> float:
+        return self.quantity - self.executed
+
+    def to_dict(self) -> Dict:
+        return {
+            'symbol': self.symbol,
+            'orderId': self.order_id,
+            'orderListId': self.list_id,
+            'clientOrderId': self.client_order_id,
+            'transactTime': self.time,
+            'price': f"{self.price:.8f}",
+            'origQty': f"{self.quantity:.8f}",
+            'executedQty': f"{self.executed:.8f}",
+            'cummulativeQuoteQty': f"{self.quote:.8f}",
+            'status': self.status,
+            'type': self.type,
+            'side': self.side,
+            'stopPrice': f"{self.stop_price:.8f}",
+            'fills': list(self.fills)
+        }
+
+
+class _RestingBook:
+    """Our resting orders for one symbol, sorted for O(1) crossing checks"""
+
+    def __init__(self):
+        self.bids: List[Tuple[float, int]] = []   # (-price, order_id): best first
+        self.asks: List[Tuple[float, int]] = []   # (price, order_id): best first
+        self.stops: List[Tuple[float, int]] = []  # (stop, order_id): sell stops, highest last
+
+
+class PaperUserStream:
+    """UserDataStream stand-in fed by the paper exchange"""
+
+    def __init__(self, exchange: 'PaperExchange'):
+        self.callbacks: Dict[str, List[Callable[[dict], None]]] = {}
+        self.running = False
+        exchange._user_streams.append(self)
+
+    def on(self, event_type: str, callback: Callable[[dict], None]):
+        self.callbacks.setdefault(event_type, []).append(callback)
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def _dispatch(self, event: dict):
+        if not self.running:
+            return
+        for callback in self.callbacks.get(event['e'], []):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Error in paper user stream callback: {e}")
+
+
+class PaperMarketStream:
+    """MarketStream stand-in: best bid/ask as the paper exchange sees it"""
+
+    def __init__(self, exchange: 'PaperExchange'):
+        self.exchange = exchange
+        self.symbols = set()
+        self.callbacks = []
+        self.running = False
+        exchange._market_streams.append(self)
+
+    def add_callback(self, callback: Callable[[str, float, float], None]):
+        self.callbacks.append(callback)
+
+    def subscribe(self, symbol: str):
+        self.symbols.add(symbol)
+        self.exchange.watch(symbol)
+
+    def unsubscribe(self, symbol: str):
+        self.symbols.discard(symbol)
+
+    def start(self):
+        self.running = True
+        self.exchange.start()
+
+    def stop(self):
+        self.running = False
+
+    def _dispatch(self, symbol: str, bid: float, ask: float):
+        if not self.running or symbol not in self.symbols:
+            return
+        for callback in self.callbacks:
+            try:
+                callback(symbol, bid, ask)
+            except Exception as e:
+                logger.error(f"Error in paper price callback: {e}")
+
+
+class PaperExchange:
+    """Simulated exchange with the same interface as BinanceClient"""
+
+    fill_price = staticmethod(BinanceClient.fill_price)
+    _round_step = staticmethod(BinanceClient._round_step)
+    round_price = BinanceClient.round_price
+    round_quantity = BinanceClient.round_quantity
+
+    def __init__(
+        self,
+        source: BinanceClient = None,
+        balances: Dict[str, float] = None,
+        live_stream=None,
+        clock: Clock = None,
+        latency_ms: float = None,
+        maker_fee_bps: float = None,
+        taker_fee_bps: float = None,
+        slippage_bps: float = None,
+        impact_bps: float = None,
+        spread_bps: float = None
+    ):
+        self.source = source
+        # Raw market-data client (server endpoints read tickers/klines through it)
+        self.client = getattr(source, 'client', None)
+        self.live_stream = live_stream
+        self.clock = clock or REAL_CLOCK  # Latency is slept on it; order/report times come from it
+        self.latency = (config.PAPER_LATENCY_MS if latency_ms is None else latency_ms) / 1000
+        self.maker_fee = (config.PAPER_MAKER_FEE_BPS if maker_fee_bps is None else maker_fee_bps) / 1e4
+        self.taker_fee = (config.PAPER_TAKER_FEE_BPS if taker_fee_bps is None else taker_fee_bps) / 1e4
+        self.slippage = (config.PAPER_SLIPPAGE_BPS if slippage_bps is None else slippage_bps) / 1e4
+        self.impact = (config.PAPER_IMPACT_BPS if impact_bps is None else impact_bps) / 1e4
+        self.spread = (config.PAPER_SPREAD_BPS if spread_bps is None else spread_bps) / 1e4
+
+        start = parse_balances(config.PAPER_BALANCES) if balances is None else balances
+        self.free: Dict[str, float] = dict(start)
+        self.locked: Dict[str, float] = {}
+        self.books: Dict[str, List] = {}  # symbol -> [bid, ask, bid_qty, ask_qty, updated_at]
+        self.orders: Dict[int, _PaperOrder] = {}
+        self._by_client_id: Dict[str, _PaperOrder] = {}
+        self._resting: Dict[str, _RestingBook] = {}
+        self._klines: Dict[Tuple[str, str], List[list]] = {}
+        self._symbol_filters: Dict[str, Dict] = {}
+        self._ids = itertools.count(1)
+        self._list_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._reports: List[dict] = []
+        self._user_streams: List[PaperUserStream] = []
+        self._market_streams: List[PaperMarketStream] = []
+        self._lock = threading.RLock()
+        self.stats = {'orders': 0, 'fills': 0, 'rejected': 0, 'fees': 0.0, 'volume': 0.0}
+        if self.live_stream:
+            self.live_stream.add_callback(self.update_book)
+
+        logger.info(f"📝 Paper exchange ready ({'live' if source else 'replay'} book, "
+                    f"{', '.join(f'{a} {v:g}' for a, v in start.items())})")
+
+    # --- streams --------------------------------------------------------
+
+    def user_stream(self) -> PaperUserStream:
+        """Execution reports for simulated orders"""
+        return PaperUserStream(self)
+
+    def market_stream(self) -> PaperMarketStream:
+        """Book updates the simulator matches against"""
+        return PaperMarketStream(self)
+
+    def start(self):
+        """Start the live book stream (if any)"""
+        if self.live_stream:
+            self.live_stream.start()
+
+    def watch(self, symbol: str):
+        """Keep a symbol's live book streaming"""
+        if self.live_stream:
+            self.live_stream.subscribe(symbol)
+
+    # --- market data ----------------------------------------------------
+
+    def update_book(self, symbol: str, bid: float, ask: float,
+                    bid_qty: float = None, ask_qty: float = None):
+        """New best bid/ask: match resting orders and notify stream listeners"""
+        with self._lock:
+            self.books[symbol] = [bid, ask, bid_qty, ask_qty, self.clock.time()]
+            if symbol in self._resting:
+                self._match(symbol)
+            reports, self._reports = self._reports, []
+        for stream in self._market_streams:
+            stream._dispatch(symbol, bid, ask)
+        self._emit(reports)
+
+    def _book(self, symbol: str) -> Optional[List]:
+        book = self.books.get(symbol)
+        streamed = self.live_stream is not None and symbol in getattr(self.live_stream, 'symbols', ())
+        if book and (not self.source or streamed or self.clock.time() - book[4] < BOOK_TTL_SECONDS):
+            return book
+        if not self.source:
+            return book
+        ticker = self.source.get_book_ticker(symbol)
+        if ticker:
+            self.update_book(symbol, ticker['bid'], ticker['ask'],
+                             ticker.get('bid_qty'), ticker.get('ask_qty'))
+        else:
+            price = self.source.get_current_price(symbol)
+            if price:
+                self.update_book(symbol, price * (1 - self.spread / 2), price * (1 + self.spread / 2))
+        return self.books.get(symbol)
+
+    def feed_candle(self, symbol: str, interval: str, timestamp, open_: float, high: float,
+                    low: float, close: float, volume: float = 0.0):
+        """Replay one candle: store it and walk the book along O -> L/H -> H/L -> C"""
+        self._klines.setdefault((symbol, interval), []).append(
+            [pd.Timestamp(timestamp), open_, high, low, close, volume])
+        path = (open_, low, high, close) if close >= open_ else (open_, high, low, close)
+        half = self.spread / 2
+        for price in path:
+            self.update_book(symbol, price * (1 - half), price * (1 + half))
+
+    def replay_klines(self, symbol: str, df: pd.DataFrame, interval: str = '1h'):
+        """Replay a kline DataFrame (timestamp index, OHLCV columns) bar by bar"""
+        for ts, row in df.iterrows():
+            self.feed_candle(symbol, interval, ts, row['open'], row['high'], row['low'],
+                             row['close'], row.get('volume', 0.0))
+            yield ts, row
+
+    def get_current_price(self, symbol: str) -> float:
+        book = self._book(symbol)
+        return (book[0] + book[1]) / 2 if book else 0.0
+
+    def get_all_prices(self) -> Dict[str, float]:
+        if self.source:
+            return self.source.get_all_prices()
+        return {s: (b[0] + b[1]) / 2 for s, b in self.books.items()}
+
+    def get_book_ticker(self, symbol: str) -> Optional[Dict[str, float]]:
+        book = self._book(symbol)
+        if not book:
+            return None
+        return {'bid': book[0], 'ask': book[1], 'bid_qty': book[2], 'ask_qty': book[3]}
+
+    def get_historical_klines(self, symbol: str, interval: str = '1h', limit: int = 100) -> pd.DataFrame:
+        if self.source:
+            return self.source.get_historical_klines(symbol, interval=interval, limit=limit)
+        rows = self._klines.get((symbol, interval), [])[-limit:]
+        df = pd.DataFrame(rows, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        return df.set_index('timestamp')
+
+    def get_symbol_filters(self, symbol: str) -> Dict[str, Dict]:
+        if self.source:
+            return self.source.get_symbol_filters(symbol)
+        return self._symbol_filters.get(symbol, {})
+
+    # --- account --------------------------------------------------------
+
+    def get_account_balance(self, asset: str = 'USDT') -> float:
+        return self.free.get(asset, 0.0)
+
+    def get_all_balances(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            assets = set(self.free) | set(self.locked)
+            return {
+                a: {'free': self.free.get(a, 0.0), 'locked': self.locked.get(a, 0.0),
+                    'total': self.free.get(a, 0.0) + self.locked.get(a, 0.0)}
+                for a in sorted(assets)
+                if self.free.get(a, 0.0) > 0 or self.locked.get(a, 0.0) > 0
+            }
+
+    def _move(self, asset: str, free: float = 0.0, locked: float = 0.0):
+        self.free[asset] = self.free.get(asset, 0.0) + free
+        self.locked[asset] = self.locked.get(asset, 0.0) + locked
+
+    # --- order placement ------------------------------------------------
+
+    def _new_order(self, symbol, side, type_, quantity, client_order_id=None, **kwargs) -> Optional[_PaperOrder]:
+        existing = self._by_client_id.get(client_order_id) if client_order_id else None
+        if existing and existing.status in OPEN_STATUSES:
+            return self._reject(f"Duplicate open order {client_order_id}")
+        order_id = next(self._ids)
+        order = _PaperOrder(order_id, client_order_id or f"paper-{order_id}", symbol, side, type_,
+                            float(quantity), now_ms=int(self.clock.time() * 1000), **kwargs)
+        self.orders[order_id] = order
+        self._by_client_id[order.client_order_id] = order
+        self.stats['orders'] += 1
+        if len(self.orders) > MAX_ORDERS and order_id % 10_000 == 0:
+            self._prune()
+        return order
+
+    def _reject(self, reason: str) -> None:
+        self.stats['rejected'] += 1
+        logger.debug(f"Paper order rejected: {reason}")
+        return None
+
+    def place_market_order(self, symbol: str, side: str, quantity: float,
+                           client_order_id: str = None) -> Optional[Dict]:
+        """Fill immediately against the book (after latency) with slippage and taker fee"""
+        self.clock.sleep(self.latency)
+        book = self._book(symbol)
+        if not book:
+            return self._reject(f"No book for {symbol}")
+        quantity = float(quantity)
+        with self._lock:
+            fills = self._market_fills(side, quantity, book)
+            base, quote = split_symbol(symbol)
+            cost = sum(p * q for p, q in fills)
+            if side == 'BUY' and self.free.get(quote, 0.0) < cost * (1 + self.taker_fee):
+                return self._reject(f"Insufficient {quote}")
+            if side == 'SELL' and self.free.get(base, 0.0) < quantity - 1e-12:
+                return self._reject(f"Insufficient {base}")
+            order = self._new_order(symbol, side, 'MARKET', quantity, client_order_id)
+            if not order:
+                return None
+            for price, qty in fills:
+                self._fill(order, price, qty, maker=False)
+            reports, self._reports = self._reports, []
+        self._emit(reports)
+        return order.to_dict()
+
+    def _market_fills(self, side: str, quantity: float, book: List) -> List[Tuple[float, float]]:
+        """Top-of-book size at the touch, the rest with size-dependent impact"""
+        touch, top_qty = (book[1], book[3]) if side == 'BUY' else (book[0], book[2])
+        sign = 1 if side == 'BUY' else -1
+        at_touch = quantity if not top_qty else min(quantity, top_qty)
+        fills = [(touch * (1 + sign * self.slippage), at_touch)]
+        rest = quantity - at_touch
+        if rest > 1e-12:
+            impact = self.slippage + self.impact * (rest / top_qty)
+            fills.append((touch * (1 + sign * impact), rest))
+        return fills
+
+    def place_market_buy(self, symbol: str, quantity: float) -> Optional[Dict]:
+        return self.place_market_order(symbol, 'BUY', quantity)
+
+    def place_market_sell(self, symbol: str, quantity: float) -> Optional[Dict]:
+        return self.place_market_order(symbol, 'SELL', quantity)
+
+    def _place_limit(self, symbol, side, quantity, price, client_order_id=None,
+                     post_only=False) -> Optional[Dict]:
+        self.clock.sleep(self.latency)
+        book = self._book(symbol)
+        quantity, price = float(quantity), float(price)
+        with self._lock:
+            crosses = book and (price >= book[1] if side == 'BUY' else price <= book[0])
+            if post_only and crosses:
+                return self._reject("LIMIT_MAKER would immediately match")
+            base, quote = split_symbol(symbol)
+            asset, amount = (quote, quantity * price * (1 + self.taker_fee)) if side == 'BUY' \
+                else (base, quantity)
+            if self.free.get(asset, 0.0) < amount - 1e-12:
+                return self._reject(f"Insufficient {asset}")
+            order = self._new_order(symbol, side, 'LIMIT_MAKER' if post_only else 'LIMIT',
+                                    quantity, client_order_id, price=price)
+            if not order:
+                return None
+            order.lock_rate = amount / quantity
+            order.lock[0] = amount
+            self._move(asset, -amount, amount)
+            self._rest(order)
+            if crosses:
+                self._match(symbol)
+            reports, self._reports = self._reports, []
+        self._emit(reports)
+        return order.to_dict()
+
+    def place_limit_buy(self, symbol: str, quantity: float, price: float) -> Optional[Dict]:
+        return self._place_limit(symbol, 'BUY', quantity, price)
+
+    def place_limit_sell(self, symbol: str, quantity: float, price: float) -> Optional[Dict]:
+        return self._place_limit(symbol, 'SELL', quantity, price)
+
+    def place_limit_maker(self, symbol: str, side: str, quantity: float, price: float,
+                          client_order_id: str) -> Optional[Dict]:
+        return self._place_limit(symbol, side, quantity, price, client_order_id, post_only=True)
+
+    def place_oco_sell(self, symbol: str, quantity: float, take_profit: float,
+                       stop_price: float, stop_limit_price: float) -> Optional[Dict]:
+        """Limit-maker take-profit + stop-limit stop-loss sharing one locked balance"""
+        self.clock.sleep(self.latency)
+        quantity = float(quantity)
+        with self._lock:
+            base, _ = split_symbol(symbol)
+            if self.free.get(base, 0.0) < quantity - 1e-12:
+                return self._reject(f"Insufficient {base}")
+            list_id = next(self._list_ids)
+            tp = self._new_order(symbol, 'SELL', 'LIMIT_MAKER', quantity,
+                                 price=float(take_profit), list_id=list_id)
+            sl = self._new_order(symbol, 'SELL', 'STOP_LOSS_LIMIT', quantity,
+                                 price=float(stop_limit_price), stop_price=float(stop_price),
+                                 list_id=list_id)
+            sl.lock = tp.lock  # One balance lock for both legs
+            tp.lock[0] = quantity
+            self._move(base, -quantity, quantity)
+            self._rest(tp)
+            self._rest(sl)
+            if symbol in self.books:
+                self._match(symbol)
+            reports, self._reports = self._reports, []
+        self._emit(reports)
+        return {
+            'orderListId': list_id,
+            'listOrderStatus': 'EXECUTING',
+            'orders': [{'symbol': symbol, 'orderId': o.order_id, 'clientOrderId': o.client_order_id}
+                       for o in (sl, tp)],
+            'orderReports': [o.to_dict() for o in (sl, tp)]
+        }
+
+    # --- cancel / query -------------------------------------------------
+
+    def _cancel(self, order: Optional[_PaperOrder], status: str = 'CANCELED') -> Optional[Dict]:
+        if not order or order.status not in OPEN_STATUSES:
+            return None
+        self._unrest(order)
+        order.status = status
+        self._report(order, status)
+        self._release(order)
+        return order.to_dict()
+
+    def cancel_order(self, symbol: str, order_id: int) -> bool:
+        with self._lock:
+            order = self.orders.get(int(order_id))
+            response = self._cancel(order)
+            if response and order.list_id != -1:  # Cancelling one OCO leg cancels the list
+                for sibling in self._siblings(order):
+                    self._cancel(sibling)
+            reports, self._reports = self._reports, []
+        self._emit(reports)
+        return response is not None
+
+    def cancel_order_by_client_id(self, symbol: str, client_order_id: str) -> Optional[Dict]:
+        order = self._by_client_id.get(client_order_id)
+        if order and self.cancel_order(symbol, order.order_id):
+            return order.to_dict()
+        return None
+
+    def get_open_orders(self, symbol: str = None) -> List[Dict]:
+        with self._lock:
+            return [o.to_dict() for o in self.orders.values()
+                    if o.status in OPEN_STATUSES and (not symbol or o.symbol == symbol)]
+
+    def get_order_status(self, symbol: str, order_id: int) -> Optional[Dict]:
+        order = self.orders.get(int(order_id))
+        return order.to_dict() if order else None
+
+    def get_order_by_client_id(self, symbol: str, client_order_id: str) -> Optional[Dict]:
+        order = self._by_client_id.get(client_order_id)
+        return order.to_dict() if order else None
+
+    # --- matching -------------------------------------------------------
+
+    def _rest(self, order: _PaperOrder):
+        book = self._resting.setdefault(order.symbol, _RestingBook())
+        if order.type == 'STOP_LOSS_LIMIT' and not order.triggered:
+            levels, key = book.stops, (order.stop_price, order.order_id)
+        elif order.side == 'BUY':
+            levels, key = book.bids, (-order.price, order.order_id)
+        else:
+            levels, key = book.asks, (order.price, order.order_id)
+        bisect.insort(levels, key)
+        order.entry = (levels, key)
+
+    def _unrest(self, order: _PaperOrder):
+        if not order.entry:
+            return
+        levels, key = order.entry
+        i = bisect.bisect_left(levels, key)
+        if i < len(levels) and levels[i] == key:
+            del levels[i]
+        order.entry = None
+
+    def _match(self, symbol: str):
+        """Fill resting orders the book has moved through (top-of-book size permitting)"""
+        bid, ask, bid_qty, ask_qty, _ = self.books[symbol]
+        book = self._resting[symbol]
+
+        # Triggered stops become limit sells
+        while book.stops and book.stops[-1][0] >= bid:
+            order = self.orders[book.stops.pop()[1]]
+            order.entry = None
+            order.triggered = True
+            self._rest(order)
+
+        available = ask_qty if ask_qty else float('inf')
+        while book.bids and -book.bids[0][0] >= ask and available > 1e-12:
+            order = self.orders[book.bids[0][1]]
+            qty = min(order.remaining, available)
+            available -= qty
+            self._fill(order, order.price, qty, maker=True)
+
+        available = bid_qty if bid_qty else float('inf')
+        while book.asks and book.asks[0][0] <= bid and available > 1e-12:
+            order = self.orders[book.asks[0][1]]
+            qty = min(order.remaining, available)
+            available -= qty
+            # A triggered stop takes the bid; a resting limit fills at its own price
+            price, maker = (bid, False) if order.triggered else (order.price, True)
+            self._fill(order, price, qty, maker=maker)
+
+    def _fill(self, order: _PaperOrder, price: float, qty: float, maker: bool):
+        fee_rate = self.maker_fee if maker else self.taker_fee
+        notional = price * qty
+        fee = notional * fee_rate
+        base, quote = split_symbol(order.symbol)
+
+        if order.side == 'BUY':
+            locked = min(order.lock[0], order.lock_rate * qty) if order.type != 'MARKET' else 0.0
+            order.lock[0] -= locked
+            self._move(quote, locked - notional - fee, -locked)
+            self._move(base, qty)
+        else:
+            locked = min(order.lock[0], qty) if order.type != 'MARKET' else 0.0
+            order.lock[0] -= locked
+            self._move(base, locked - qty, -locked)
+            self._move(quote, notional - fee)
+
+        order.executed += qty
+        order.quote += notional
+        order.fills.append({
+            'price': f"{price:.8f}",
+            'qty': f"{qty:.8f}",
+            'commission': f"{fee:.8f}",
+            'commissionAsset': quote,
+            'tradeId': next(self._trade_ids)
+        })
+        self.stats['fills'] += 1
+        self.stats['fees'] += fee
+        self.stats['volume'] += notional
+
+        done = order.remaining <= 1e-12
+        order.status = 'FILLED' if done else 'PARTIALLY_FILLED'
+        if done:
+            self._unrest(order)
+        self._report(order, 'TRADE', last_qty=qty, last_price=price, fee=fee)
+        if order.list_id != -1:
+            for sibling in self._siblings(order):
+                self._cancel(sibling, status='EXPIRED')
+        if done:
+            self._release(order)
+
+    def _siblings(self, order: _PaperOrder) -> List[_PaperOrder]:
+        return [o for o in self.orders.values()
+                if o.list_id == order.list_id and o.order_id != order.order_id
+                and o.status in OPEN_STATUSES]
+
+    def _release(self, order: _PaperOrder):
+        """Unlock leftover funds once no order sharing the lock is still open"""
+        if order.lock[0] <= 0 or (order.list_id != -1 and self._siblings(order)):
+            return
+        base, quote = split_symbol(order.symbol)
+        asset = quote if order.side == 'BUY' else base
+        self._move(asset, order.lock[0], -order.lock[0])
+        order.lock[0] = 0.0
+
+    def _report(self, order: _PaperOrder, execution_type: str, last_qty: float = 0.0,
+                last_price: float = 0.0, fee: float = 0.0):
+        self._reports.append({
+            'e': 'executionReport',
+            'E': int(self.clock.time() * 1000),
+            's': order.symbol,
+            'c': order.client_order_id,
+            'S': order.side,
+            'o': order.type,
+            'q': f"{order.quantity:.8f}",
+            'p': f"{order.price:.8f}",
+            'P': f"{order.stop_price:.8f}",
+            'g': order.list_id,
+            'x': execution_type,
+            'X': order.status,
+            'i': order.order_id,
+            'l': f"{last_qty:.8f}",
+            'z': f"{order.executed:.8f}",
+            'L': f"{last_price:.8f}",
+            'n': f"{fee:.8f}",
+            'N': split_symbol(order.symbol)[1],
+            'Z': f"{order.quote:.8f}"
+        })
+
+    def _emit(self, reports: List[dict]):
+        for event in reports:
+            for stream in self._user_streams:
+                stream._dispatch(event)
+
+    def _prune(self):
+        finished = [i for i, o in self.orders.items() if o.status not in OPEN_STATUSES]
+        for order_id in finished[:len(self.orders) - MAX_ORDERS]:
+            order = self.orders.pop(order_id)
+            if self._by_client_id.get(order.client_order_id) is order:
+                del self._by_client_id[order.client_order_id]
+
+    def summary(self) -> Dict:
+        """Balances and simulation counters"""
+        return {'balances': self.get_all_balances(), **self.stats}
+
+
+class ReplayFeed:
+    """Walks a replay PaperExchange's book through klines as its simulated clock advances"""
+
+    def __init__(self, exchange: PaperExchange, symbol: str, df: pd.DataFrame, interval: str = '1m'):
+        self.clock = exchange.clock
+        self.times = [pd.Timestamp(ts).timestamp() for ts in df.index]
+        self._bars = exchange.replay_klines(symbol, df, interval)
+        self.fed = 0
+        self.catch_up()
+
+    @property
+    def done(self) -> bool:
+        """True once the clock is past the last bar"""
+        return not self.times or self.clock.time() > self.times[-1]
+
+    def catch_up(self):
+        """Feed every bar that has opened by the clock's time (at least the first)"""
+        while self.fed < len(self.times) and (self.fed == 0 or self.times[self.fed] <= self.clock.time()):
+            next(self._bars)
+            self.fed += 1
+
+
+def create_virtual_client(symbol: str, interval: str = '1m', limit: int = 1000):
+    """Replay PaperExchange on a VirtualClock starting at the first bar, plus its feed.
+
+    Bars come from REPLAY_KLINES_FILE (CSV with a timestamp index and OHLC[V] columns),
+    else the last `limit` ones are fetched once; nothing is priced live afterwards.
+    """
+    if config.REPLAY_KLINES_FILE:
+        df = pd.read_csv(config.REPLAY_KLINES_FILE, index_col=0, parse_dates=True)
+    else:
+        df = BinanceClient().get_historical_klines(symbol, interval=interval, limit=limit)
+    if df.empty:
+        raise ValueError(f"No klines to replay for {symbol}")
+    exchange = PaperExchange(clock=VirtualClock(pd.Timestamp(df.index[0]).timestamp()))
+    return exchange, ReplayFeed(exchange, symbol, df, interval)
+
+
+def create_client(clock: Clock = None):
+    """Exchange client for the configured mode (paper trading or Binance)"""
+    client = BinanceClient()
+    return PaperExchange(client, clock=clock) if config.PAPER_TRADING else client
@@ -0,0 +1,108 @@
+"""
+User Data Stream - Real-time order/fill events for our account
+"""
+import json
+import threading
+import time
+from typing import Callable, Dict, List
+import websocket
+from binance.exceptions import BinanceAPIException
+import config
+from exchange.binance_client import BinanceClient
+from utils.logger import setup_logger
+
+logger = setup_logger('UserStream')
+
+KEEPALIVE_SECONDS = 30 * 60  # Binance expires listen keys after 60 minutes
+
+
+class UserDataStream:
+    """Streams executionReport / listStatus events, keeping the listen key alive"""
+
+    def __init__(self, client: BinanceClient, base_url: str = None):
+        self.client = client
+        self.base_url = base_url or (
+            config.TESTNET_WS_BASE_URL if config.USE_TESTNET else config.LIVE_WS_BASE_URL
+        )
+        self.callbacks: Dict[str, List[Callable[[dict], None]]] = {}
+        self.running = False
+        self.listen_key = None
+        self._ws = None
+        self._thread = None
+        self._keepalive_thread = None
+
+    def on(self, event_type: str, callback: Callable[[dict], None]):
+        """Register callback for an event type ('executionReport', 'listStatus', ...)"""
+        self.callbacks.setdefault(event_type, []).append(callback)
+
+    def _on_message(self, ws, message):
+        event = json.loads(message)
+        for callback in self.callbacks.get(event.get('e'), []):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Error in user stream callback: {e}")
+
+    def _on_error(self, ws, error):
+        logger.warning(f"⚠️ User stream error: {error}")
+
+    def _run(self):
+        while self.running:
+            try:
+                self.listen_key = self.client.client.stream_get_listen_key()
+            except BinanceAPIException as e:
+                logger.error(f"Error getting listen key: {e}")
+                time.sleep(5)
+                continue
+            except Exception as e:
+                logger.warning(f"⚠️ User stream unavailable: {e}")
+                time.sleep(5)
+                continue
+
+            self._ws = websocket.WebSocketApp(
+                f"{self.base_url}/ws/{self.listen_key}",
+                on_open=lambda ws: logger.info("🔌 User data stream connected"),
+                on_message=self._on_message,
+                on_error=self._on_error
+            )
+            self._ws.run_forever(ping_interval=20, ping_timeout=10)
+            if self.running:
+                logger.warning("🔌 User data stream disconnected, reconnecting...")
+                time.sleep(1)
+
+    def _keepalive(self):
+        while self.running:
+            time.sleep(KEEPALIVE_SECONDS)
+            if self.running and self.listen_key:
+                try:
+                    self.client.client.stream_keepalive(self.listen_key)
+                except Exception as e:
+                    logger.warning(f"⚠️ Listen key keepalive failed: {e}")
+
+    def start(self):
+        """Connect in a background thread"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._keepalive_thread = threading.Thread(target=self._keepalive, daemon=True)
+        self._keepalive_thread.start()
+
+    def stop(self):
+        """Disconnect and release the listen key"""
+        self.running = False
+        if self._ws:
+            self._ws.close()
+        if self.listen_key:
+            try:
+                self.client.client.stream_close(self.listen_key)
+            except Exception:
+                pass
+
+
+def user_stream_for(client) -> UserDataStream:
+    """User data stream for a client (a paper exchange reports its own fills)"""
+    if hasattr(client, 'user_stream'):
+        return client.user_stream()
+    return UserDataStream(client)
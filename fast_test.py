@@ -2,29 +2,41 @@
 Super Fast Test Mode - 5 trades in 5 minutes (1 trade per minute)
 For quick testing of trade history, analytics, etc.
 """
-import time
-from datetime import datetime
 from exchange.binance_client import BinanceClient
+from exchange.paper_exchange import PaperExchange, create_virtual_client
+from utils.clock import REAL_CLOCK
 from utils.logger import setup_logger
 from utils.trade_manager import TradeManager
 import config
-import random
 
 logger = setup_logger('FastTest')
 
 class FastTestBot:
     """Bot that executes 5 trades quickly for testing"""
     
-    def __init__(self):
-        self.client = BinanceClient()
+    def __init__(self, virtual: bool = False):
         self.symbol = config.TRADE_SYMBOL
         self.quantity = config.TRADE_QUANTITY
-        self.trade_manager = TradeManager()
+        if virtual:
+            # Simulated time priced from replayed klines; trades go to a separate history
+            self.client, self.replay = create_virtual_client(self.symbol)
+            self.clock = self.client.clock
+        else:
+            self.client = PaperExchange(BinanceClient())  # Simulated fills, no real orders
+            self.replay = None
+            self.clock = REAL_CLOCK
+        self.trade_manager = TradeManager(config.VIRTUAL_TRADES_FILE if virtual else None, clock=self.clock)
         
         logger.info("⚡ FAST TEST MODE - 5 Trades in 5 Minutes!")
         logger.info(f"   Symbol: {self.symbol}")
         logger.info(f"   Quantity: {self.quantity}")
     
+    def wait(self, seconds: float):
+        """Sleep (instantly when virtual, moving the replayed price along)"""
+        self.clock.sleep(seconds)
+        if self.replay:
+            self.replay.catch_up()
+    
     def get_current_price(self):
         return self.client.get_current_price(self.symbol)
     
@@ -32,7 +44,11 @@ class FastTestBot:
         """Execute one BUY + SELL pair"""
         try:
             # BUY
-            buy_price = self.get_current_price()
+            buy_order = self.client.place_market_buy(self.symbol, self.quantity)
+            if not buy_order:
+                logger.error(f"Trade #{trade_num} BUY rejected")
+                return False
+            buy_price = self.client.fill_price(buy_order)
             logger.info(f"\n{'='*60}")
             logger.info(f"Trade #{trade_num} - BUY")
             logger.info(f"{'='*60}")
@@ -43,19 +59,20 @@ class FastTestBot:
                 side='BUY',
                 quantity=self.quantity,
                 entry_price=buy_price,
-                order_id=f'TEST_BUY_{int(time.time())}',
+                order_id=str(buy_order['orderId']),
                 strategy='FAST_TEST'
-            )
+            ).id
             
             logger.info(f"✅ BUY completed - Trade ID: {trade_id}")
             logger.info(f"⏳ Waiting 30 seconds before SELL...")
-            time.sleep(30)
+            self.wait(30)
             
             # SELL
-            sell_price = self.get_current_price()
-            # Add some random variation to make it interesting
-            price_variation = random.uniform(-0.005, 0.015)  # -0.5% to +1.5%
-            sell_price = sell_price * (1 + price_variation)
+            sell_order = self.client.place_market_sell(self.symbol, self.quantity)
+            if not sell_order:
+                logger.error(f"Trade #{trade_num} SELL rejected")
+                return False
+            sell_price = self.client.fill_price(sell_order)
             
             profit = (sell_price - buy_price) * self.quantity
             profit_pct = ((sell_price - buy_price) / buy_price) * 100
@@ -66,7 +83,7 @@ class FastTestBot:
             self.trade_manager.close_trade(
                 trade_id=trade_id,
                 exit_price=sell_price,
-                order_id=f'TEST_SELL_{int(time.time())}'
+                order_id=str(sell_order['orderId'])
             )
             
             emoji = "✅" if profit >= 0 else "❌"
@@ -84,7 +101,7 @@ class FastTestBot:
         logger.info("📊 Will execute 5 complete trades (BUY + SELL pairs)")
         logger.info("⏰ Each trade takes ~1 minute\n")
         
-        start_time = datetime.now()
+        start_time = self.clock.now()
         
         for i in range(1, 6):  # 5 trades
             logger.info(f"\n{'#'*60}")
@@ -95,9 +112,9 @@ class FastTestBot:
             
             if success and i < 5:
                 logger.info(f"\n⏳ Waiting 30 seconds before next trade...\n")
-                time.sleep(30)
+                self.wait(30)
         
-        end_time = datetime.now()
+        end_time = self.clock.now()
         duration = (end_time - start_time).total_seconds()
         
         logger.info(f"\n{'='*60}")
@@ -112,5 +129,8 @@ class FastTestBot:
         logger.info(f"{'='*60}\n")
 
 if __name__ == '__main__':
-    bot = FastTestBot()
+    import sys
+    
+    # --virtual: simulated time priced from replayed klines, so the 30s waits are skipped
+    bot = FastTestBot(virtual='--virtual' in sys.argv)
     bot.run()
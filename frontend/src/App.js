@@ -6,6 +6,7 @@ import TradeHistory from './components/TradeHistory';
 import Analytics from './components/Analytics';
 import Wallet from './components/Wallet';
 import TestingLab from './components/TestingLab';
+import { subscribe } from './live';
 import './App.css';
 
 // Use environment variable for API URL, fallback to localhost for development
@@ -94,22 +95,22 @@ function App() {
       setLoading(false);
     };
     init();
+  }, [selectedCrypto]);
 
-    // Refresh prices every 10 seconds
-    const priceInterval = setInterval(fetchPrices, 10000);
-    // Refresh balances every 30 seconds
-    const balanceInterval = setInterval(fetchBalances, 30000);
-    // Refresh analysis every 30 seconds
-    const analysisInterval = setInterval(() => fetchAnalysis(selectedCrypto), 30000);
-    // Refresh bot status every 5 seconds
-    const botInterval = setInterval(fetchBotStatus, 5000);
+  // Pushed by the server whenever they change (replaces polling)
+  useEffect(() => {
+    const unsubscribers = [
+      subscribe('prices', state => setPrices(state)),
+      subscribe('balances', state => setBalances(state)),
+      subscribe('bot', state => setBotStatus(state))
+    ];
+    return () => unsubscribers.forEach(unsubscribe => unsubscribe());
+  }, []);
 
-    return () => {
-      clearInterval(priceInterval);
-      clearInterval(balanceInterval);
-      clearInterval(analysisInterval);
-      clearInterval(botInterval);
-    };
+  useEffect(() => {
+    return subscribe('analysis', state => {
+      if (state[selectedCrypto]) setAnalysis(state[selectedCrypto]);
+    });
   }, [selectedCrypto]);
 
   const handleSelectCrypto = (symbol) => {
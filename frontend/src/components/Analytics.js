@@ -10,6 +10,7 @@ import {
   Award,
   Target
 } from 'lucide-react';
+import { subscribe } from '../live';
 
 function Analytics({ apiUrl }) {
   const [analytics, setAnalytics] = useState(null);
@@ -17,30 +18,16 @@ function Analytics({ apiUrl }) {
   const [selectedPeriod, setSelectedPeriod] = useState('daily');
   const [loading, setLoading] = useState(true);
 
-  const fetchAnalytics = async () => {
-    try {
-      const [summaryRes, breakdownRes] = await Promise.all([
-        fetch(`${apiUrl}/api/analytics/summary`),
-        fetch(`${apiUrl}/api/analytics/breakdown?days=7`)
-      ]);
-      
-      const summaryData = await summaryRes.json();
-      const breakdownData = await breakdownRes.json();
-      
-      setAnalytics(summaryData);
-      setBreakdown(breakdownData.breakdown || []);
-      setLoading(false);
-    } catch (error) {
-      console.error('Error fetching analytics:', error);
-      setLoading(false);
-    }
-  };
-
+  // Summary and 7-day breakdown, pushed when a trade changes (and as rolling periods move)
   useEffect(() => {
-    fetchAnalytics();
-    const interval = setInterval(fetchAnalytics, 30000); // Refresh every 30 seconds
-    return () => clearInterval(interval);
-  }, [apiUrl]);
+    return subscribe('analytics', state => {
+      setLoading(false);
+      if (!state.all_time) return; // Analyzer not initialized
+      const { breakdown: days, ...summary } = state;
+      setAnalytics(summary);
+      setBreakdown(days || []);
+    });
+  }, []);
 
   const formatPrice = (price) => {
     if (!price && price !== 0) return '$0.00';
@@ -12,6 +12,7 @@ import {
   XCircle,
   Clock
 } from 'lucide-react';
+import { subscribe } from '../live';
 
 const API_BASE = process.env.REACT_APP_API_URL || 'http://localhost:5001';
 
@@ -24,21 +25,9 @@ function Dashboard({ prices, selectedCrypto, analysis, botStatus, onStartBot, on
   });
   const [openTrades, setOpenTrades] = useState([]);
 
-  // Fetch open trades from API
-  const fetchOpenTrades = async () => {
-    try {
-      const response = await fetch(`${API_BASE}/api/trades/open`);
-      const data = await response.json();
-      setOpenTrades(data.trades || []);
-    } catch (error) {
-      console.error('Error fetching open trades:', error);
-    }
-  };
-
+  // Open trades with unrealized P&L, pushed whenever a trade or price changes
   useEffect(() => {
-    fetchOpenTrades();
-    const interval = setInterval(fetchOpenTrades, 5000); // Refresh every 5 seconds
-    return () => clearInterval(interval);
+    return subscribe('open_trades', state => setOpenTrades(Object.values(state)));
   }, []);
 
   const currentPrice = prices[selectedCrypto]?.price || 0;
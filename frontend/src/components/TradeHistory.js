@@ -10,9 +10,15 @@ import {
   ChevronDown,
   ChevronUp
 } from 'lucide-react';
+import { subscribe } from '../live';
 
 function TradeHistory({ apiUrl }) {
   const [trades, setTrades] = useState([]);
+  const [closedTotal, setClosedTotal] = useState(null);
+  const [firstCursor, setFirstCursor] = useState(null);
+  const [olderTrades, setOlderTrades] = useState([]);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [openTrades, setOpenTrades] = useState([]);
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('open');
@@ -31,6 +37,8 @@ function TradeHistory({ apiUrl }) {
       
       setOpenTrades(openData.trades || []);
       setTrades(closedData.trades || []);
+      setClosedTotal(closedData.total ?? null);
+      setFirstCursor(closedData.next_cursor || null);
       setLoading(false);
     } catch (error) {
       console.error('Error fetching trades:', error);
@@ -38,13 +46,33 @@ function TradeHistory({ apiUrl }) {
     }
   };
 
+  // Older pages are fetched by cursor and kept while the first page keeps refreshing
+  const loadMoreTrades = async () => {
+    const cursor = olderTrades.length ? olderCursor : firstCursor;
+    if (!cursor) return;
+    try {
+      setLoadingMore(true);
+      const res = await fetch(`${apiUrl}/api/trades/closed?limit=20&cursor=${encodeURIComponent(cursor)}`);
+      const data = await res.json();
+      setOlderTrades(prev => [...prev, ...(data.trades || [])]);
+      setOlderCursor(data.next_cursor || null);
+    } catch (error) {
+      console.error('Error loading more trades:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const firstPageIds = new Set(trades.map(t => t.id));
+  const closedTrades = [...trades, ...olderTrades.filter(t => !firstPageIds.has(t.id))];
+  const hasMore = olderTrades.length ? !!olderCursor : !!firstCursor;
+
   const handleCloseTrade = async (tradeId) => {
     try {
       setClosingId(tradeId);
       await fetch(`${apiUrl}/api/trades/${tradeId}/close`, {
         method: 'POST'
       });
-      await fetchTrades();
     } catch (error) {
       console.error('Error closing trade:', error);
     } finally {
@@ -52,10 +80,23 @@ function TradeHistory({ apiUrl }) {
     }
   };
 
+  // First page over REST (total and cursor), then open / newly closed trades are pushed
   useEffect(() => {
     fetchTrades();
-    const interval = setInterval(fetchTrades, 10000); // Refresh every 10 seconds
-    return () => clearInterval(interval);
+    const unsubscribers = [
+      subscribe('open_trades', state => setOpenTrades(Object.values(state))),
+      subscribe('closed_trades', (state, added) => {
+        // The channel holds the latest closed trades: merge, so ones it drops stay listed
+        setTrades(prev => {
+          const latest = Object.values(state);
+          const ids = new Set(latest.map(t => t.id));
+          return [...latest, ...prev.filter(t => !ids.has(t.id))]
+            .sort((a, b) => (b.exit_time || '').localeCompare(a.exit_time || ''));
+        });
+        if (added.length) setClosedTotal(total => (total === null ? total : total + added.length));
+      })
+    ];
+    return () => unsubscribers.forEach(unsubscribe => unsubscribe());
   }, [apiUrl]);
 
   const formatPrice = (price) => {
@@ -121,7 +162,7 @@ function TradeHistory({ apiUrl }) {
           className={`trade-tab ${activeTab === 'closed' ? 'active' : ''}`}
           onClick={() => setActiveTab('closed')}
         >
-          ✅ Closed ({trades.length})
+          ✅ Closed ({closedTotal ?? closedTrades.length})
         </button>
       </div>
 
@@ -210,12 +251,12 @@ function TradeHistory({ apiUrl }) {
       {/* Closed Trades */}
       {activeTab === 'closed' && (
         <div className="trades-list">
-          {trades.length === 0 ? (
+          {closedTrades.length === 0 ? (
             <div className="no-trades">
               <p>No closed trades yet</p>
             </div>
           ) : (
-            trades.map((trade, index) => (
+            closedTrades.map((trade, index) => (
               <div 
                 key={trade.id || index} 
                 className={`trade-item closed-trade ${trade.profit_loss >= 0 ? 'profitable' : 'loss'}`}
@@ -268,6 +309,15 @@ function TradeHistory({ apiUrl }) {
               </div>
             ))
           )}
+          {hasMore && (
+            <button
+              className="trade-tab"
+              disabled={loadingMore}
+              onClick={loadMoreTrades}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>
@@ -0,0 +1,81 @@
+import { io } from 'socket.io-client';
+
+// Live channels pushed by the API server (see api/live.py). Each channel is a
+// keyed state kept up to date from sequenced diffs; on a sequence gap or a
+// reconnect we ask for what was missed and the server answers with the missing
+// updates or a fresh snapshot.
+const API_BASE = process.env.REACT_APP_API_URL || 'http://localhost:5001';
+
+const channels = {}; // name -> { state, seq, listeners }
+let socket = null;
+let epoch = null;
+
+const notify = (channel, added) => {
+  channel.listeners.forEach(listener => listener(channel.state, added));
+};
+
+const connect = () => {
+  if (socket) return socket;
+  socket = io(API_BASE);
+
+  socket.on('connect', () => {
+    // (Re)subscribe everything; the server replays what we missed while disconnected
+    const names = Object.keys(channels);
+    if (!names.length) return;
+    const seqs = {};
+    names.forEach(name => {
+      if (channels[name].seq !== null) seqs[name] = channels[name].seq;
+    });
+    socket.emit('subscribe', { channels: names, seqs, epoch });
+  });
+
+  socket.on('snapshot', snapshot => {
+    const channel = channels[snapshot.channel];
+    if (!channel) return;
+    epoch = snapshot.epoch;
+    const added = channel.seq === null ? [] // First sync: nothing is new yet
+      : Object.keys(snapshot.state).filter(key => !(key in channel.state));
+    channel.state = snapshot.state;
+    channel.seq = snapshot.seq;
+    notify(channel, added);
+  });
+
+  socket.on('update', update => {
+    const channel = channels[update.channel];
+    if (!channel || channel.seq === null || update.seq <= channel.seq) return; // Not synced yet, or a duplicate
+    if (update.seq !== channel.seq + 1) {
+      socket.emit('resync', { channel: update.channel, seq: channel.seq, epoch });
+      return;
+    }
+    const state = { ...channel.state, ...update.changed };
+    update.removed.forEach(key => delete state[key]);
+    const added = Object.keys(update.changed).filter(key => !(key in channel.state));
+    channel.state = state;
+    channel.seq = update.seq;
+    notify(channel, added);
+  });
+
+  return socket;
+};
+
+// Calls listener(state, addedKeys) with the channel's state now and on every change.
+// Returns an unsubscribe function.
+export function subscribe(name, listener) {
+  connect();
+  let channel = channels[name];
+  if (!channel) {
+    channel = channels[name] = { state: {}, seq: null, listeners: new Set() };
+    if (socket.connected) socket.emit('subscribe', { channels: [name] });
+  } else if (channel.seq !== null) {
+    listener(channel.state, []);
+  }
+  channel.listeners.add(listener);
+
+  return () => {
+    channel.listeners.delete(listener);
+    if (!channel.listeners.size) {
+      delete channels[name];
+      socket.emit('unsubscribe', { channels: [name] });
+    }
+  };
+}
@@ -2,29 +2,41 @@
 Instant Test Mode - 5 trades immediately for quick testing
 No waiting between trades
 """
-import time
-from datetime import datetime
 from exchange.binance_client import BinanceClient
+from exchange.paper_exchange import PaperExchange, create_virtual_client
+from utils.clock import REAL_CLOCK
 from utils.logger import setup_logger
 from utils.trade_manager import TradeManager
 import config
-import random
 
 logger = setup_logger('InstantTest')
 
 class InstantTestBot:
     """Bot that executes trades instantly"""
     
-    def __init__(self):
-        self.client = BinanceClient()
+    def __init__(self, virtual: bool = False):
         self.symbol = config.TRADE_SYMBOL
         self.quantity = config.TRADE_QUANTITY
-        self.trade_manager = TradeManager()
+        if virtual:
+            # Simulated time priced from replayed klines; trades go to a separate history
+            self.client, self.replay = create_virtual_client(self.symbol)
+            self.clock = self.client.clock
+        else:
+            self.client = PaperExchange(BinanceClient())  # Simulated fills, no real orders
+            self.replay = None
+            self.clock = REAL_CLOCK
+        self.trade_manager = TradeManager(config.VIRTUAL_TRADES_FILE if virtual else None, clock=self.clock)
         
         logger.info("⚡ INSTANT TEST MODE")
         logger.info(f"   Symbol: {self.symbol}")
         logger.info(f"   Quantity: {self.quantity}")
     
+    def wait(self, seconds: float):
+        """Sleep (instantly when virtual, moving the replayed price along)"""
+        self.clock.sleep(seconds)
+        if self.replay:
+            self.replay.catch_up()
+    
     def get_current_price(self):
         return self.client.get_current_price(self.symbol)
     
@@ -32,7 +44,11 @@ class InstantTestBot:
         """Execute one BUY + SELL pair instantly"""
         try:
             # BUY
-            buy_price = self.get_current_price()
+            buy_order = self.client.place_market_buy(self.symbol, self.quantity)
+            if not buy_order:
+                logger.error(f"Trade #{trade_num} BUY rejected")
+                return 0, 0
+            buy_price = self.client.fill_price(buy_order)
             logger.info(f"\n{'='*60}")
             logger.info(f"Trade #{trade_num} - BUY @ ${buy_price:,.2f}")
             
@@ -41,19 +57,21 @@ class InstantTestBot:
                 side='BUY',
                 quantity=self.quantity,
                 entry_price=buy_price,
-                order_id=f'TEST_BUY_{int(time.time())}_{trade_num}',
+                order_id=str(buy_order['orderId']),
                 strategy='INSTANT_TEST'
-            )
+            ).id
             
             logger.info(f"✅ BUY completed - Trade ID: {trade_id}")
             
             # Small delay to get different price
-            time.sleep(2)
+            self.wait(2)
             
-            # SELL with simulated price change
-            sell_price = self.get_current_price()
-            price_variation = random.uniform(-0.003, 0.008)  # -0.3% to +0.8%
-            sell_price = sell_price * (1 + price_variation)
+            # SELL at whatever the book gives us
+            sell_order = self.client.place_market_sell(self.symbol, self.quantity)
+            if not sell_order:
+                logger.error(f"Trade #{trade_num} SELL rejected")
+                return 0, 0
+            sell_price = self.client.fill_price(sell_order)
             
             profit = (sell_price - buy_price) * self.quantity
             profit_pct = ((sell_price - buy_price) / buy_price) * 100
@@ -63,7 +81,7 @@ class InstantTestBot:
             self.trade_manager.close_trade(
                 trade_id=trade_id,
                 exit_price=sell_price,
-                order_id=f'TEST_SELL_{int(time.time())}_{trade_num}'
+                order_id=str(sell_order['orderId'])
             )
             
             emoji = "💰" if profit >= 0 else "📉"
@@ -81,7 +99,7 @@ class InstantTestBot:
         logger.info("\n🚀 Starting INSTANT TEST MODE")
         logger.info(f"📊 Will execute {num_trades} complete trades immediately\n")
         
-        start_time = datetime.now()
+        start_time = self.clock.now()
         total_profit = 0
         profits = []
         
@@ -89,9 +107,9 @@ class InstantTestBot:
             profit, profit_pct = self.execute_trade_pair(i)
             total_profit += profit
             profits.append(profit)
-            time.sleep(1)  # Small delay between trades
+            self.wait(1)  # Small delay between trades
         
-        end_time = datetime.now()
+        end_time = self.clock.now()
         duration = (end_time - start_time).total_seconds()
         
         # Summary
@@ -102,6 +120,7 @@ class InstantTestBot:
         logger.info(f"📊 Total Trades: {num_trades} pairs")
         logger.info(f"💰 Total P/L: ${total_profit:,.4f}")
         logger.info(f"📈 Average P/L: ${(total_profit/num_trades):,.4f}")
+        logger.info(f"🧾 Fees paid: ${self.client.stats['fees']:,.4f}")
         logger.info(f"{'#'*60}")
         logger.info(f"\n🎯 Now check your dashboard:")
         logger.info(f"   ✅ Trade History - {num_trades} closed trades")
@@ -114,10 +133,12 @@ class InstantTestBot:
 if __name__ == '__main__':
     import sys
     
-    # Get number of trades from command line or default to 5
-    num_trades = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    # Get number of trades from command line or default to 5 (--virtual replays klines
+    # on simulated time, skipping the waits)
+    args = [a for a in sys.argv[1:] if a != '--virtual']
+    num_trades = int(args[0]) if args else 5
     
     logger.info(f"🎯 Will execute {num_trades} test trades")
     
-    bot = InstantTestBot()
+    bot = InstantTestBot(virtual='--virtual' in sys.argv)
     bot.run(num_trades)
@@ -9,6 +9,8 @@ Usage:
     python main.py --symbol ETHUSDT   # Trade ETH/USDT
     python main.py --strategy rsi     # Use RSI strategy
     python main.py --demo             # Run demo without trading
+    python main.py --portfolio portfolio.json  # Run many symbol/strategy slots
+    python main.py --portfolio portfolio.json --shards 4  # ...across 4 worker processes
 """
 
 import argparse
@@ -20,6 +22,8 @@ import signal
 os.makedirs('logs', exist_ok=True)
 
 from bot.trading_bot import TradingBot
+from bot.portfolio import PortfolioRunner
+from bot.sharding import ShardedPortfolioRunner
 from exchange.binance_client import BinanceClient
 from utils.logger import setup_logger
 import config
@@ -102,6 +106,40 @@ def run_demo():
     
     print("\n✅ Demo complete! Configure .env file to start real trading.\n")
 
+def run_portfolio(config_path: str, shards: int = 0):
+    """Run every slot of a portfolio config (optionally sharded across processes)"""
+    global bot_instance
+    
+    try:
+        if shards:
+            runner = ShardedPortfolioRunner.from_config(config_path, workers=shards)
+        else:
+            runner = PortfolioRunner.from_config(config_path)
+        bot_instance = runner
+        
+        signal.signal(signal.SIGTERM, signal_handler)
+        signal.signal(signal.SIGINT, signal_handler)
+        
+        logger.info(f"{'='*50}")
+        logger.info(f"🔔 TESTNET: {config.USE_TESTNET}")
+        logger.info(f"📂 Portfolio: {config_path} ({len(runner.bots)} slots)")
+        if shards:
+            logger.info(f"🧩 Workers: {runner.workers}")
+        logger.info(f"⏱️  Interval: {runner.interval_seconds}s")
+        logger.info(f"{'='*50}")
+        
+        runner.run()
+        
+    except KeyboardInterrupt:
+        logger.info("\n👋 Portfolio stopped by user")
+        if bot_instance:
+            bot_instance.stop()
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        if bot_instance:
+            bot_instance.stop()
+        sys.exit(1)
+
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description='Crypto Auto Trading Bot')
@@ -117,6 +155,10 @@ def main():
                        help='Check interval in seconds')
     parser.add_argument('--demo', action='store_true',
                        help='Run in demo mode (no real trades)')
+    parser.add_argument('--portfolio', type=str, nargs='?', const=config.PORTFOLIO_CONFIG,
+                       help='Run all slots from a portfolio config file')
+    parser.add_argument('--shards', type=int, default=0,
+                       help='Evaluate portfolio slots in N worker processes')
     
     args = parser.parse_args()
     
@@ -144,6 +186,10 @@ def main():
     # Create and run bot
     global bot_instance
     
+    if args.portfolio:
+        run_portfolio(args.portfolio, args.shards)
+        return
+    
     try:
         bot = TradingBot(
             symbol=args.symbol,
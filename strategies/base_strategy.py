@@ -47,3 +47,12 @@ class BaseStrategy(ABC):
         """Clear current position"""
         self.position = None
         self.entry_price = 0.0
+    
+    def get_state(self) -> dict:
+        """Get serializable strategy state (for snapshots)"""
+        return {'position': self.position, 'entry_price': self.entry_price}
+    
+    def load_state(self, state: dict):
+        """Restore strategy state from a snapshot"""
+        self.position = state.get('position')
+        self.entry_price = state.get('entry_price', 0.0)
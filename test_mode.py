@@ -2,9 +2,9 @@
 Quick Test Mode - Forces trades every 1 minute for testing
 WARNING: Only for testing! Not for real trading!
 """
-import time
-from datetime import datetime
 from exchange.binance_client import BinanceClient
+from exchange.paper_exchange import PaperExchange, create_virtual_client
+from utils.clock import REAL_CLOCK
 from utils.logger import setup_logger
 from utils.trade_manager import TradeManager
 import config
@@ -14,11 +14,18 @@ logger = setup_logger('TestMode')
 class QuickTestBot:
     """Bot that alternates BUY/SELL every minute for testing"""
     
-    def __init__(self):
-        self.client = BinanceClient()
+    def __init__(self, virtual: bool = False):
         self.symbol = config.TRADE_SYMBOL
         self.quantity = config.TRADE_QUANTITY
-        self.trade_manager = TradeManager()
+        if virtual:
+            # Simulated time priced from replayed klines; trades go to a separate history
+            self.client, self.replay = create_virtual_client(self.symbol)
+            self.clock = self.client.clock
+        else:
+            self.client = PaperExchange(BinanceClient())  # Simulated fills, no real orders
+            self.replay = None
+            self.clock = REAL_CLOCK
+        self.trade_manager = TradeManager(config.VIRTUAL_TRADES_FILE if virtual else None, clock=self.clock)
         self.in_position = False
         self.entry_price = 0.0
         self.current_trade_id = None
@@ -29,6 +36,12 @@ class QuickTestBot:
         logger.info(f"   Quantity: {self.quantity}")
         logger.warning("⚠️ This is TEST MODE only! Not for real trading!")
     
+    def wait(self, seconds: float):
+        """Sleep (instantly when virtual, moving the replayed price along)"""
+        self.clock.sleep(seconds)
+        if self.replay:
+            self.replay.catch_up()
+    
     def get_current_price(self):
         """Get current price"""
         return self.client.get_current_price(self.symbol)
@@ -36,19 +49,14 @@ class QuickTestBot:
     def execute_test_buy(self):
         """Execute a test buy"""
         try:
-            current_price = self.get_current_price()
+            order = self.client.place_market_buy(self.symbol, self.quantity)
+            if not order:
+                logger.error("TEST BUY rejected")
+                return False
+            current_price = self.client.fill_price(order)
             
             logger.info(f"🟢 TEST BUY @ ${current_price:,.2f}")
             
-            # Create simulated order
-            order = {
-                'orderId': f'TEST_{int(time.time())}',
-                'symbol': self.symbol,
-                'price': current_price,
-                'executedQty': self.quantity,
-                'status': 'FILLED'
-            }
-            
             # Record trade
             self.current_trade_id = self.trade_manager.open_trade(
                 symbol=self.symbol,
@@ -57,7 +65,7 @@ class QuickTestBot:
                 entry_price=current_price,
                 order_id=str(order['orderId']),
                 strategy='TEST_MODE'
-            )
+            ).id
             
             self.entry_price = current_price
             self.in_position = True
@@ -73,7 +81,11 @@ class QuickTestBot:
     def execute_test_sell(self):
         """Execute a test sell"""
         try:
-            current_price = self.get_current_price()
+            order = self.client.place_market_sell(self.symbol, self.quantity)
+            if not order:
+                logger.error("TEST SELL rejected")
+                return False
+            current_price = self.client.fill_price(order)
             
             # Calculate P&L
             profit_loss = (current_price - self.entry_price) * self.quantity
@@ -82,15 +94,6 @@ class QuickTestBot:
             logger.info(f"🔴 TEST SELL @ ${current_price:,.2f}")
             logger.info(f"   P/L: ${profit_loss:,.2f} ({profit_pct:+.2f}%)")
             
-            # Create simulated order
-            order = {
-                'orderId': f'TEST_{int(time.time())}',
-                'symbol': self.symbol,
-                'price': current_price,
-                'executedQty': self.quantity,
-                'status': 'FILLED'
-            }
-            
             # Close trade
             if self.current_trade_id:
                 self.trade_manager.close_trade(
@@ -113,8 +116,11 @@ class QuickTestBot:
             logger.error(f"Error in test sell: {e}")
             return False
     
-    def run(self):
-        """Run test bot - alternates BUY/SELL every minute"""
+    def run(self, max_iterations: int = None):
+        """Run test bot - alternates BUY/SELL every minute.
+
+        Stops after max_iterations, or when a virtual run's replayed klines run out.
+        """
         logger.info("🚀 Starting QUICK TEST MODE")
         logger.info("📊 Will alternate BUY/SELL every 60 seconds")
         logger.info("⏰ Press Ctrl+C to stop\n")
@@ -122,12 +128,15 @@ class QuickTestBot:
         iteration = 0
         
         try:
-            while True:
+            while max_iterations is None or iteration < max_iterations:
+                if self.replay and self.replay.done:
+                    logger.info("🏁 Replayed klines exhausted")
+                    break
                 iteration += 1
                 current_price = self.get_current_price()
                 
                 logger.info(f"{'='*60}")
-                logger.info(f"Iteration #{iteration} - {datetime.now().strftime('%H:%M:%S')}")
+                logger.info(f"Iteration #{iteration} - {self.clock.now().strftime('%H:%M:%S')}")
                 logger.info(f"💵 Current Price: ${current_price:,.2f}")
                 logger.info(f"📊 Total Trades: {self.trade_count}")
                 
@@ -142,17 +151,24 @@ class QuickTestBot:
                 logger.info(f"⏳ Waiting 60 seconds for next trade...")
                 logger.info(f"{'='*60}\n")
                 
-                time.sleep(60)  # Wait 1 minute
+                self.wait(60)  # Wait 1 minute
                 
         except KeyboardInterrupt:
             logger.info("\n🛑 Test mode stopped by user")
-            logger.info(f"📊 Total trades executed: {self.trade_count}")
-            
-            # Close any open position
-            if self.in_position:
-                logger.info("🔄 Closing open position...")
-                self.execute_test_sell()
+        
+        logger.info(f"📊 Total trades executed: {self.trade_count}")
+        
+        # Close any open position
+        if self.in_position:
+            logger.info("🔄 Closing open position...")
+            self.execute_test_sell()
 
 if __name__ == '__main__':
-    bot = QuickTestBot()
-    bot.run()
+    import sys
+    
+    # --virtual: simulated time priced from replayed klines, so the 60s waits are skipped
+    # --iterations N: stop after N iterations (default: until Ctrl+C / the replay ends)
+    args = sys.argv[1:]
+    iterations = int(args[args.index('--iterations') + 1]) if '--iterations' in args else None
+    bot = QuickTestBot(virtual='--virtual' in args)
+    bot.run(iterations)
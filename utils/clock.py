@@ -0,0 +1,76 @@
+"""
+Clock - Time source shared by the bot, trade storage and the simulators
+
+RealClock is the wall clock. VirtualClock only moves when something sleeps
+on it (or advances it), so test runs that "wait" minutes between trades
+finish instantly and produce the same timestamps every run.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Union
+
+
+class Clock:
+    """Time source interface"""
+
+    def time(self) -> float:
+        """Seconds since the epoch"""
+        raise NotImplementedError
+
+    def sleep(self, seconds: float):
+        """Block until `seconds` have passed on this clock"""
+        raise NotImplementedError
+
+    def now(self) -> datetime:
+        """Local naive datetime (drop-in for datetime.now())"""
+        return datetime.fromtimestamp(self.time())
+
+
+class RealClock(Clock):
+    """Wall-clock time"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+
+class VirtualClock(Clock):
+    """Simulated time that advances instantly on sleep()"""
+
+    def __init__(self, start: Union[float, datetime, str] = None):
+        if isinstance(start, str):
+            start = datetime.fromisoformat(start)
+        if isinstance(start, datetime):
+            start = start.timestamp()
+        self._now = time.time() if start is None else float(start)
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def advance(self, seconds: float):
+        """Move time forward"""
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+
+    def set(self, timestamp: Union[float, datetime]):
+        """Jump to a point in time (never backwards)"""
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+        with self._lock:
+            self._now = max(self._now, float(timestamp))
+
+
+# Process-wide default
+REAL_CLOCK = RealClock()
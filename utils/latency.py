@@ -0,0 +1,152 @@
+"""
+Latency Tracker - Monotonic-clock timing of trading loop stages
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+import config
+
+# Upper bounds (ms) of the histogram buckets reported in summaries
+HISTOGRAM_BUCKETS_MS = [0.1, 0.5, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class _NullSpan:
+    """No-op span returned when tracking is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Times one stage with time.perf_counter_ns"""
+    __slots__ = ('samples', 'start')
+
+    def __init__(self, samples: deque):
+        self.samples = samples
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.samples.append((time.perf_counter_ns() - self.start) / 1e6)
+        return False
+
+
+class LatencyTracker:
+    """Rolling per-stage, per-strategy latency histograms"""
+
+    def __init__(self, enabled: bool = None, window: int = None):
+        self.enabled = config.LATENCY_TRACKING if enabled is None else enabled
+        self.window = window or config.LATENCY_WINDOW
+        self._samples: Dict[tuple, deque] = {}
+        self._lock = threading.Lock()
+        self._tick_start: Optional[int] = None
+
+    def _series(self, strategy: str, stage: str) -> deque:
+        key = (strategy, stage)
+        samples = self._samples.get(key)
+        if samples is None:
+            with self._lock:
+                samples = self._samples.setdefault(key, deque(maxlen=self.window))
+        return samples
+
+    def span(self, strategy: str, stage: str):
+        """Context manager timing one stage (no-op when disabled)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self._series(strategy, stage))
+
+    def record(self, strategy: str, stage: str, elapsed_ms: float):
+        """Record an externally measured duration"""
+        if self.enabled:
+            self._series(strategy, stage).append(elapsed_ms)
+
+    def instrument(self, obj, method_name: str, strategy: str, stage: str):
+        """Wrap a bound method of obj so every call is timed as a stage"""
+        if not self.enabled or not hasattr(obj, method_name):
+            return
+        original = getattr(obj, method_name)
+        samples = self._series(strategy, stage)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                samples.append((time.perf_counter_ns() - start) / 1e6)
+
+        setattr(obj, method_name, timed)
+
+    def start_tick(self):
+        """Mark the start of a tick (for tick-to-order latency)"""
+        if self.enabled:
+            self._tick_start = time.perf_counter_ns()
+
+    def end_tick(self):
+        """Clear the tick marker"""
+        self._tick_start = None
+
+    def record_order(self, strategy: str):
+        """Record time from tick start to an executed order"""
+        if self.enabled and self._tick_start is not None:
+            elapsed = (time.perf_counter_ns() - self._tick_start) / 1e6
+            self._series(strategy, 'tick_to_order').append(elapsed)
+
+    @staticmethod
+    def _percentile(sorted_samples: List[float], pct: float) -> float:
+        idx = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+        return sorted_samples[idx]
+
+    @staticmethod
+    def _histogram(samples: List[float]) -> Dict[str, int]:
+        counts = {f"<={b}ms": 0 for b in HISTOGRAM_BUCKETS_MS}
+        counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] = 0
+        for value in samples:
+            for bound in HISTOGRAM_BUCKETS_MS:
+                if value <= bound:
+                    counts[f"<={bound}ms"] += 1
+                    break
+            else:
+                counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] += 1
+        return counts
+
+    def summary(self) -> Dict:
+        """Get latency stats per strategy and stage over the rolling window"""
+        with self._lock:
+            series = {key: list(samples) for key, samples in self._samples.items()}
+
+        stats = {}
+        for (strategy, stage), samples in series.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            stats.setdefault(strategy, {})[stage] = {
+                'count': len(ordered),
+                'mean_ms': round(sum(ordered) / len(ordered), 3),
+                'p50_ms': round(self._percentile(ordered, 50), 3),
+                'p95_ms': round(self._percentile(ordered, 95), 3),
+                'p99_ms': round(self._percentile(ordered, 99), 3),
+                'max_ms': round(ordered[-1], 3),
+                'histogram': self._histogram(ordered)
+            }
+        return {
+            'enabled': self.enabled,
+            'window': self.window,
+            'strategies': stats
+        }
+
+    def reset(self):
+        """Drop all recorded samples (in place: instrumented methods hold their series)"""
+        with self._lock:
+            for samples in self._samples.values():
+                samples.clear()
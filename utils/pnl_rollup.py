@@ -0,0 +1,160 @@
+"""
+P&L Rollups - Time-bucketed closed-trade aggregates for ProfitLossAnalyzer
+
+Every closed trade is added to its month, day and hour bucket, keyed by the
+prefix of its ISO exit time (nothing is parsed). A period query combines the
+largest whole buckets that fit the range and only scans the trades in the
+partial hours at its two ends.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+MONTH, DAY, HOUR = 7, 10, 13  # ISO prefix lengths: 2024-05 / 2024-05-17 / 2024-05-17T09
+
+
+class Bucket:
+    """Aggregates of a set of closed trades"""
+    __slots__ = ('count', 'wins', 'losses', 'profit_loss', 'profit_loss_pct',
+                 'win_total', 'loss_total', 'best', 'worst')
+
+    def __init__(self):
+        self.count = 0
+        self.wins = 0
+        self.losses = 0
+        self.profit_loss = 0.0
+        self.profit_loss_pct = 0.0
+        self.win_total = 0.0
+        self.loss_total = 0.0
+        self.best: Optional[Tuple[float, str]] = None   # (profit_loss, trade id)
+        self.worst: Optional[Tuple[float, str]] = None
+
+    def add(self, trade):
+        pl = trade.profit_loss or 0
+        self.count += 1
+        if pl > 0:
+            self.wins += 1
+            self.win_total += pl
+        elif pl < 0:
+            self.losses += 1
+            self.loss_total += pl
+        self.profit_loss += pl
+        self.profit_loss_pct += trade.profit_loss_pct or 0
+        if self.best is None or pl > self.best[0]:
+            self.best = (pl, trade.id)
+        if self.worst is None or pl < self.worst[0]:
+            self.worst = (pl, trade.id)
+
+    def merge(self, other: 'Bucket'):
+        """Fold in a later bucket (earlier trades win ties, as in a scan)"""
+        self.count += other.count
+        self.wins += other.wins
+        self.losses += other.losses
+        self.profit_loss += other.profit_loss
+        self.profit_loss_pct += other.profit_loss_pct
+        self.win_total += other.win_total
+        self.loss_total += other.loss_total
+        if other.best and (self.best is None or other.best[0] > self.best[0]):
+            self.best = other.best
+        if other.worst and (self.worst is None or other.worst[0] < self.worst[0]):
+            self.worst = other.worst
+
+
+def _next_month(dt: datetime) -> datetime:
+    return dt.replace(year=dt.year + dt.month // 12, month=dt.month % 12 + 1)
+
+
+def _aligned(dt: datetime, level: int) -> bool:
+    if dt.minute or dt.second or dt.microsecond:
+        return False
+    return level == HOUR or (dt.hour == 0 and (level == DAY or dt.day == 1))
+
+
+def _step(dt: datetime, level: int) -> datetime:
+    if level == MONTH:
+        return _next_month(dt)
+    return dt + (timedelta(days=1) if level == DAY else timedelta(hours=1))
+
+
+class PnLRollup:
+    """Month/day/hour buckets of closed trades, fed incrementally"""
+
+    def __init__(self):
+        self.buckets: Dict[int, Dict[str, Bucket]] = {MONTH: {}, DAY: {}, HOUR: {}}
+        self.ids = set()  # Trades already counted
+        self._lock = threading.Lock()
+
+    def add(self, trade) -> bool:
+        """Count a closed trade once"""
+        if not trade.exit_time:
+            return False
+        with self._lock:
+            if trade.id in self.ids:
+                return False
+            for level, buckets in self.buckets.items():
+                key = trade.exit_time[:level]
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = Bucket()
+                bucket.add(trade)
+            self.ids.add(trade.id)
+        return True
+
+    def add_all(self, trades: Iterable) -> int:
+        return sum(1 for t in trades if self.add(t))
+
+    def clear(self):
+        with self._lock:
+            self.buckets = {MONTH: {}, DAY: {}, HOUR: {}}
+            self.ids = set()
+
+    def bucket(self, level: int, key: str) -> Bucket:
+        with self._lock:
+            return self.buckets[level].get(key) or Bucket()
+
+    def total(
+        self,
+        since: Optional[datetime],
+        until: datetime,
+        scan: Callable[[datetime, datetime], List]
+    ) -> Bucket:
+        """Aggregates of trades exited in [since, until]
+
+        scan(start, end) returns the trades exited in [start, end) and is only
+        called for the partial hours at either end.
+        """
+        result = Bucket()
+        if since is None:  # From the first month that has trades
+            with self._lock:
+                first = min(self.buckets[MONTH], default=None)
+            if first is None:
+                return result
+            since = datetime.strptime(first, '%Y-%m')
+        if since > until:
+            return result
+        pieces: List[Tuple[datetime, datetime, Optional[int]]] = []
+        cursor = since
+        if not _aligned(cursor, HOUR):
+            head_end = min(cursor.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1), until)
+            pieces.append((cursor, head_end, None))
+            cursor = head_end
+        while cursor < until:
+            for level in (MONTH, DAY, HOUR):
+                end = _step(cursor, level) if _aligned(cursor, level) else None
+                if end and end <= until:
+                    pieces.append((cursor, end, level))
+                    cursor = end
+                    break
+            else:
+                break  # Less than an hour left
+        pieces.append((cursor, until + timedelta(microseconds=1), None))  # Tail includes until itself
+
+        for start, end, level in pieces:
+            if level is None:
+                partial = Bucket()
+                for trade in scan(start, end):
+                    partial.add(trade)
+                result.merge(partial)
+            else:
+                result.merge(self.bucket(level, start.isoformat()[:level]))
+        return result
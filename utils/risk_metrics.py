@@ -0,0 +1,396 @@
+"""
+Risk Metrics - Equity curve, drawdown and risk-adjusted performance
+
+Everything is computed in a few vectorized passes over closed trades sorted
+by exit time (int64 microsecond times, P&L, P&L%): the realized equity curve
+and its drawdowns, Sharpe/Sortino on daily P&L, profit factor, expectancy,
+holding time and time in market. Open trades are marked to market on top
+(with_open). compute() takes the arrays of a TradeSeries; for any list
+of trades (Trade objects or dicts, e.g. a backtest's output) use
+metrics_from_trades(). RunningMetrics keeps the same numbers for all closed
+trades up to date one close at a time.
+"""
+import heapq
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from utils.trade_analytics import to_micros
+
+DAY_US = 86_400_000_000
+PERIODS_PER_YEAR = 365  # Crypto markets trade every day
+
+
+def _field(trade, name: str):
+    return trade.get(name) if isinstance(trade, dict) else getattr(trade, name, None)
+
+
+def _iso(us: int) -> str:
+    return np.datetime64(int(us), 'us').astype(datetime).isoformat()
+
+
+def _num(value, digits: int = 2) -> Optional[float]:
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def unrealized(open_trades: Iterable, prices: Dict[str, float] = None) -> dict:
+    """Unrealized P&L and notional of open trades at the given prices (entry price if none)"""
+    prices = prices or {}
+    profit_loss = 0.0
+    notional = 0.0
+    count = 0
+    for trade in open_trades:
+        entry = _field(trade, 'entry_price') or 0
+        quantity = _field(trade, 'quantity') or 0
+        price = prices.get(_field(trade, 'symbol')) or entry
+        direction = 1 if _field(trade, 'side') == 'BUY' else -1
+        profit_loss += (price - entry) * quantity * direction
+        notional += price * quantity
+        count += 1
+    return {'open_trades': count, 'unrealized_profit_loss': profit_loss, 'open_exposure': notional}
+
+
+def _drawdown(exit_us: np.ndarray, equity: np.ndarray, starting_equity: float, start_us: int, end_us: int):
+    """(max drawdown, its % of the peak, longest time in seconds without a new high)"""
+    peak = np.maximum.accumulate(np.concatenate(([starting_equity], equity)))[1:]
+    drawdown = peak - equity
+    worst = int(np.argmax(drawdown))
+    max_dd = float(drawdown[worst])
+    max_dd_pct = max_dd / peak[worst] * 100 if peak[worst] > 0 else None
+    # Underwater stretches run from a high (or the start) to the next high (or the end)
+    highs = np.concatenate(([-1], np.flatnonzero(drawdown <= 0)))
+    high_us = np.where(highs < 0, start_us, exit_us[np.maximum(highs, 0)])
+    gaps = np.flatnonzero(np.diff(highs) > 1)
+    durations = exit_us[highs[gaps + 1]] - high_us[gaps]
+    if highs[-1] < len(equity) - 1:
+        durations = np.append(durations, end_us - high_us[-1])
+    longest = int(durations.max()) // 1_000_000 if len(durations) else 0
+    return max_dd, max_dd_pct, longest, float(drawdown[-1])
+
+
+def _daily_ratios(exit_us: np.ndarray, profit_loss: np.ndarray, starting_equity: float, end_us: int):
+    """Annualized Sharpe and Sortino of daily returns (daily P&L if no starting equity), idle days as 0"""
+    days = exit_us // DAY_US
+    first = days[0]
+    daily = np.bincount(days - first, weights=profit_loss, minlength=int(end_us // DAY_US - first + 1))
+    if starting_equity > 0:
+        opening = starting_equity + np.concatenate(([0], np.cumsum(daily)[:-1]))
+        daily = np.where(opening > 0, daily / np.where(opening > 0, opening, 1), 0)
+    if len(daily) < 2:
+        return None, None
+    mean = daily.mean()
+    std = daily.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(daily, 0) ** 2))
+    scale = np.sqrt(PERIODS_PER_YEAR)
+    return (mean / std * scale if std > 0 else None,
+            mean / downside * scale if downside > 0 else None)
+
+
+def _time_in_market(entry_us: np.ndarray, exit_us: np.ndarray) -> int:
+    """Microseconds with at least one trade open (union of the holding intervals)"""
+    order = np.argsort(entry_us, kind='stable')
+    starts = entry_us[order]
+    ends = np.maximum.accumulate(exit_us[order])
+    new = np.concatenate(([True], starts[1:] > ends[:-1]))
+    first = np.flatnonzero(new)
+    last = np.concatenate((first[1:] - 1, [len(starts) - 1]))
+    return int((ends[last] - starts[first]).sum())
+
+
+def compute(
+    exit_us: np.ndarray,
+    entry_us: np.ndarray,
+    profit_loss: np.ndarray,
+    profit_loss_pct: np.ndarray,
+    starting_equity: float = 0.0,
+    end_us: int = None
+) -> dict:
+    """Metrics of closed trades sorted by exit time (end_us: end of the period, default last exit)"""
+    count = len(profit_loss)
+    result = {'trades': count, 'starting_equity': starting_equity}
+    if count == 0:
+        return result
+    entry_us = np.minimum(entry_us, exit_us)
+    start_us = int(entry_us.min())
+    end_us = max(int(exit_us[-1]), end_us or 0)
+
+    equity = starting_equity + np.cumsum(profit_loss)
+    max_dd, max_dd_pct, dd_seconds, current_dd = _drawdown(exit_us, equity, starting_equity, start_us, end_us)
+    sharpe, sortino = _daily_ratios(exit_us, profit_loss, starting_equity, end_us)
+
+    wins = profit_loss[profit_loss > 0]
+    losses = profit_loss[profit_loss < 0]
+    gross_profit = float(wins.sum())
+    gross_loss = float(-losses.sum())
+    avg_win = float(wins.mean()) if len(wins) else None
+    avg_loss = float(losses.mean()) if len(losses) else None
+    holding = (exit_us - entry_us) / 1_000_000
+    total = float(equity[-1] - starting_equity)
+
+    result.update({
+        'start': _iso(start_us),
+        'end': _iso(end_us),
+        'total_profit_loss': _num(total),
+        'total_return_pct': _num(total / starting_equity * 100) if starting_equity > 0 else None,
+        'compounded_return_pct': _num(np.expm1(np.log1p(profit_loss_pct / 100).sum()) * 100),
+        'win_rate': _num(len(wins) / count * 100),
+        'profit_factor': _num(gross_profit / gross_loss) if gross_loss > 0 else None,
+        'expectancy': _num(total / count, 4),
+        'expectancy_pct': _num(profit_loss_pct.mean(), 4),
+        'avg_win': _num(avg_win, 4),
+        'avg_loss': _num(avg_loss, 4),
+        'payoff_ratio': _num(avg_win / -avg_loss) if avg_win and avg_loss else None,
+        'max_drawdown': _num(max_dd),
+        'max_drawdown_pct': _num(max_dd_pct),
+        'max_drawdown_duration_seconds': dd_seconds,
+        'current_drawdown': _num(current_dd),
+        'sharpe_ratio': _num(sharpe),
+        'sortino_ratio': _num(sortino),
+        'avg_holding_seconds': int(holding.mean()),
+        'median_holding_seconds': int(np.median(holding)),
+        'time_in_market_pct': _num(_time_in_market(entry_us, exit_us) / max(end_us - start_us, 1) * 100)
+    })
+    return result
+
+
+class RunningMetrics:
+    """compute() over every closed trade, updated in O(log n) per close
+
+    Trades must arrive in exit order (as they close); one that doesn't marks
+    the accumulators invalid and callers fall back to compute().
+    """
+
+    def __init__(self, starting_equity: float = 0.0):
+        self.starting_equity = starting_equity
+        self.valid = True
+        self.count = 0
+        self._lock = threading.Lock()
+        self._start_us = None
+        self._last_exit_us = None
+        self._total = 0.0
+        self._wins = 0
+        self._gross_profit = 0.0
+        self._gross_loss = 0.0
+        self._losses = 0
+        self._pct_sum = 0.0
+        self._log_growth = 0.0
+        self._holding_sum = 0.0
+        self._low, self._high = [], []  # Max-heap (negated) / min-heap halves of the holding times
+        # Drawdown: peak, worst point, underwater stretches (the first one runs from the start)
+        self._peak = starting_equity
+        self._max_dd = 0.0
+        self._max_dd_peak = starting_equity
+        self._last_high_us = None
+        self._underwater = False
+        self._first_high_us = None  # First high after starting underwater
+        self._longest_us = 0
+        # Daily returns of finished days (idle days count as 0)
+        self._day = None
+        self._day_pl = 0.0
+        self._pl_before_day = 0.0
+        self._days = 0
+        self._day_sum = 0.0
+        self._day_sq = 0.0
+        self._day_down_sq = 0.0
+        # Union of holding intervals: disjoint (start, end) sorted by start
+        self._intervals = []
+        self._covered_us = 0
+
+    def add(self, exit_us: int, entry_us: int, profit_loss: float, profit_loss_pct: float):
+        with self._lock:
+            if not self.valid:
+                return
+            if self._last_exit_us is not None and exit_us < self._last_exit_us:
+                self.valid = False
+                return
+            entry_us = min(entry_us, exit_us)
+            self.count += 1
+            self._last_exit_us = exit_us
+            self._start_us = entry_us if self._start_us is None else min(self._start_us, entry_us)
+            self._total += profit_loss
+            if profit_loss > 0:
+                self._wins += 1
+                self._gross_profit += profit_loss
+            elif profit_loss < 0:
+                self._losses += 1
+                self._gross_loss -= profit_loss
+            self._pct_sum += profit_loss_pct
+            self._log_growth += np.log1p(profit_loss_pct / 100)
+            self._add_holding((exit_us - entry_us) / 1_000_000)
+            self._add_drawdown(exit_us)
+            self._add_day(exit_us // DAY_US, profit_loss)
+            self._add_interval(entry_us, exit_us)
+
+    def _add_holding(self, seconds: float):
+        self._holding_sum += seconds
+        heapq.heappush(self._low, -seconds)
+        heapq.heappush(self._high, -heapq.heappop(self._low))
+        if len(self._high) > len(self._low):
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+
+    def _add_drawdown(self, exit_us: int):
+        equity = self.starting_equity + self._total
+        self._peak = max(self._peak, equity)
+        drawdown = self._peak - equity
+        if self.count == 1 or drawdown > self._max_dd:
+            self._max_dd, self._max_dd_peak = drawdown, self._peak
+        if drawdown > 0:
+            self._underwater = True
+            return
+        if self._underwater and self._last_high_us is None:
+            self._first_high_us = exit_us  # Ends the stretch that started underwater
+        elif self._underwater:
+            self._longest_us = max(self._longest_us, exit_us - self._last_high_us)
+        self._last_high_us = exit_us
+        self._underwater = False
+
+    def _day_return(self) -> float:
+        if self.starting_equity <= 0:
+            return self._day_pl
+        opening = self.starting_equity + self._pl_before_day
+        return self._day_pl / opening if opening > 0 else 0.0
+
+    def _add_day(self, day: int, profit_loss: float):
+        if self._day is not None and day > self._day:
+            r = self._day_return()
+            self._days += day - self._day  # The finished day plus the idle ones after it
+            self._day_sum += r
+            self._day_sq += r * r
+            self._day_down_sq += min(r, 0.0) ** 2
+            self._pl_before_day += self._day_pl
+            self._day_pl = 0.0
+        if self._day is None or day > self._day:
+            self._day = day
+        self._day_pl += profit_loss
+
+    def _add_interval(self, start: int, end: int):
+        while self._intervals and self._intervals[-1][1] >= start:
+            s, e = self._intervals.pop()
+            self._covered_us -= e - s
+            start = min(start, s)
+            end = max(end, e)
+        self._intervals.append((start, end))
+        self._covered_us += end - start
+
+    def _ratios(self, end_us: int):
+        r = self._day_return()
+        days = self._days + 1 + (end_us // DAY_US - self._day)
+        if days < 2:
+            return None, None
+        total = self._day_sum + r
+        mean = total / days
+        var = max((self._day_sq + r * r - days * mean * mean) / (days - 1), 0.0)
+        std = np.sqrt(var)
+        downside = np.sqrt((self._day_down_sq + min(r, 0.0) ** 2) / days)
+        scale = np.sqrt(PERIODS_PER_YEAR)
+        return (mean / std * scale if std > abs(mean) * 1e-9 else None,  # Sum-of-squares rounding
+                mean / downside * scale if downside > 0 else None)
+
+    def metrics(self, end_us: int = None) -> dict:
+        """Same result as compute() over every trade added"""
+        with self._lock:
+            count = self.count
+            result = {'trades': count, 'starting_equity': self.starting_equity}
+            if count == 0:
+                return result
+            start_us = self._start_us
+            end_us = max(self._last_exit_us, end_us or 0)
+            equity = self.starting_equity + self._total
+            current_dd = self._peak - equity
+            stretches = [self._longest_us]
+            if self._first_high_us is not None:
+                stretches.append(self._first_high_us - start_us)
+            if self._underwater:
+                stretches.append(end_us - (self._last_high_us if self._last_high_us is not None else start_us))
+            sharpe, sortino = self._ratios(end_us)
+            avg_win = self._gross_profit / self._wins if self._wins else None
+            avg_loss = -self._gross_loss / self._losses if self._losses else None
+            median = -self._low[0] if len(self._low) > len(self._high) else (self._high[0] - self._low[0]) / 2
+            total = self._total
+            result.update({
+                'start': _iso(start_us),
+                'end': _iso(end_us),
+                'total_profit_loss': _num(total),
+                'total_return_pct': _num(total / self.starting_equity * 100) if self.starting_equity > 0 else None,
+                'compounded_return_pct': _num(np.expm1(self._log_growth) * 100),
+                'win_rate': _num(self._wins / count * 100),
+                'profit_factor': _num(self._gross_profit / self._gross_loss) if self._gross_loss > 0 else None,
+                'expectancy': _num(total / count, 4),
+                'expectancy_pct': _num(self._pct_sum / count, 4),
+                'avg_win': _num(avg_win, 4),
+                'avg_loss': _num(avg_loss, 4),
+                'payoff_ratio': _num(avg_win / -avg_loss) if avg_win and avg_loss else None,
+                'max_drawdown': _num(self._max_dd),
+                'max_drawdown_pct': _num(self._max_dd / self._max_dd_peak * 100) if self._max_dd_peak > 0 else None,
+                'max_drawdown_duration_seconds': int(max(stretches)) // 1_000_000,
+                'current_drawdown': _num(current_dd),
+                'sharpe_ratio': _num(sharpe),
+                'sortino_ratio': _num(sortino),
+                'avg_holding_seconds': int(self._holding_sum / count),
+                'median_holding_seconds': int(median),
+                'time_in_market_pct': _num(self._covered_us / max(end_us - start_us, 1) * 100)
+            })
+            return result
+
+
+def groups(columns: Dict[str, np.ndarray], by: str):
+    """(code, columns) per distinct value of the code column `by` (rows stay in exit order)"""
+    order = np.argsort(columns[by], kind='stable')
+    codes = columns[by][order]
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    for rows in np.split(order, bounds) if len(order) else []:
+        yield int(columns[by][rows[0]]), {name: values[rows] for name, values in columns.items()}
+
+
+def equity_curve(exit_us: np.ndarray, profit_loss: np.ndarray, starting_equity: float = 0.0,
+                 points: int = 500) -> List[dict]:
+    """Equity and drawdown after each trade, thinned to about `points` (keeping the deepest drawdown)"""
+    if len(profit_loss) == 0:
+        return []
+    equity = starting_equity + np.cumsum(profit_loss)
+    drawdown = np.maximum.accumulate(np.maximum(equity, starting_equity)) - equity
+    keep = np.arange(len(equity))
+    if len(keep) > points > 1:
+        keep = np.unique(np.concatenate((
+            np.linspace(0, len(equity) - 1, points - 1).astype(np.int64), [np.argmax(drawdown)]
+        )))
+    return [{
+        'time': _iso(t),
+        'equity': round(e, 2),
+        'drawdown': round(d, 2)
+    } for t, e, d in zip(exit_us[keep].tolist(), equity[keep].tolist(), drawdown[keep].tolist())]
+
+
+def with_open(metrics: dict, open_stats: dict) -> dict:
+    """Closed-trade metrics plus open trades marked to market"""
+    result = dict(metrics)
+    pl = open_stats['unrealized_profit_loss']
+    equity = result['starting_equity'] + (result.get('total_profit_loss') or 0)
+    result.update({
+        'open_trades': open_stats['open_trades'],
+        'open_exposure': _num(open_stats['open_exposure']),
+        'unrealized_profit_loss': _num(pl),
+        'equity': _num(equity + pl)
+    })
+    if result['trades'] and pl < 0:  # Marked-to-market equity can only deepen the drawdown
+        result['current_drawdown'] = _num(result['current_drawdown'] - pl)
+    return result
+
+
+def metrics_from_trades(trades: Iterable, starting_equity: float = 0.0,
+                        prices: Dict[str, float] = None, curve_points: int = 0) -> dict:
+    """Metrics of any trades (Trade objects or dicts); open ones are marked at `prices`"""
+    closed = []
+    open_trades = []
+    for trade in trades:
+        (closed if _field(trade, 'exit_time') else open_trades).append(trade)
+    closed.sort(key=lambda t: _field(t, 'exit_time'))
+    exit_us = to_micros([_field(t, 'exit_time') for t in closed])
+    entry_us = to_micros([_field(t, 'entry_time') or _field(t, 'exit_time') for t in closed])
+    profit_loss = np.array([_field(t, 'profit_loss') or 0 for t in closed], dtype=float)
+    profit_loss_pct = np.array([_field(t, 'profit_loss_pct') or 0 for t in closed], dtype=float)
+    result = with_open(compute(exit_us, entry_us, profit_loss, profit_loss_pct, starting_equity),
+                       unrealized(open_trades, prices))
+    if curve_points:
+        result['equity_curve'] = equity_curve(exit_us, profit_loss, starting_equity, curve_points)
+    return result
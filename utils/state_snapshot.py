@@ -0,0 +1,129 @@
+"""
+State Snapshot - Compact binary checkpoints of bot state for warm restarts
+"""
+import os
+import pickle
+import zlib
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+import config
+from utils.clock import REAL_CLOCK, Clock
+from utils.logger import setup_logger
+
+logger = setup_logger('StateSnapshot')
+
+SNAPSHOT_VERSION = 1
+CANDLE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class StateSnapshot:
+    """Saves and restores a bot's candle window and strategy state"""
+
+    def __init__(
+        self,
+        symbol: str,
+        strategy_name: str,
+        interval: str,
+        snapshot_dir: str = None,
+        max_age_seconds: int = None,
+        clock: Clock = None
+    ):
+        self.symbol = symbol
+        self.clock = clock or REAL_CLOCK  # Save time / staleness on the bot's clock
+        self.strategy_name = strategy_name
+        self.interval = interval
+        self.max_age_seconds = max_age_seconds or config.SNAPSHOT_MAX_AGE_SECONDS
+        self.snapshot_dir = snapshot_dir or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'data',
+            'snapshots'
+        )
+        self.path = os.path.join(
+            self.snapshot_dir,
+            f"{symbol}_{strategy_name}_{interval}.snap"
+        )
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    @staticmethod
+    def _encode_candles(candles: Dict[str, pd.DataFrame]) -> dict:
+        """Pack each candle window into raw int64/float64 arrays"""
+        packed = {}
+        for interval, df in candles.items():
+            if df is None or df.empty:
+                continue
+            packed[interval] = (
+                df.index.asi8.copy(),
+                df[CANDLE_COLUMNS].to_numpy(dtype=np.float64)
+            )
+        return packed
+
+    @staticmethod
+    def _decode_candles(packed: dict) -> Dict[str, pd.DataFrame]:
+        """Rebuild candle DataFrames from packed arrays"""
+        candles = {}
+        for interval, (index, values) in packed.items():
+            df = pd.DataFrame(values, columns=CANDLE_COLUMNS)
+            df.index = pd.DatetimeIndex(index, name='timestamp')
+            candles[interval] = df
+        return candles
+
+    def save(
+        self,
+        candles: Dict[str, pd.DataFrame],
+        strategy_state: dict,
+        bot_state: dict = None
+    ) -> bool:
+        """Write snapshot atomically (temp file + rename)"""
+        payload = {
+            'version': SNAPSHOT_VERSION,
+            'symbol': self.symbol,
+            'strategy': self.strategy_name,
+            'interval': self.interval,
+            'saved_at': self.clock.time(),
+            'candles': self._encode_candles(candles),
+            'strategy_state': strategy_state,
+            'bot_state': bot_state or {}
+        }
+        tmp_path = self.path + '.tmp'
+        try:
+            blob = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL), 1)
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving snapshot: {e}")
+            return False
+
+    def load(self) -> Optional[dict]:
+        """Load snapshot if it exists, matches this bot and is not stale"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                payload = pickle.loads(zlib.decompress(f.read()))
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable snapshot {self.path}: {e}")
+            return None
+
+        if payload.get('version') != SNAPSHOT_VERSION:
+            logger.info("Snapshot version mismatch, doing full warm-up")
+            return None
+        if (payload.get('symbol'), payload.get('strategy'), payload.get('interval')) != \
+                (self.symbol, self.strategy_name, self.interval):
+            return None
+
+        age = self.clock.time() - payload.get('saved_at', 0)
+        if age > self.max_age_seconds:
+            logger.info(f"Snapshot is stale ({age:.0f}s old), doing full warm-up")
+            return None
+
+        payload['candles'] = self._decode_candles(payload.get('candles', {}))
+        payload['age_seconds'] = age
+        return payload
+
+    def clear(self):
+        """Delete the snapshot file"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
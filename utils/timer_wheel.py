@@ -0,0 +1,86 @@
+"""
+Timer Wheel - Cheap scheduling for many short-lived timers on one thread
+
+Timers are hashed into slots by their due tick, so scheduling and
+cancelling are O(1) and each tick only looks at one slot.
+"""
+import math
+import threading
+import time
+from typing import Callable, List
+from utils.logger import setup_logger
+
+logger = setup_logger('TimerWheel')
+
+
+class Timer:
+    """Handle for a scheduled callback"""
+    __slots__ = ('due_tick', 'callback', 'args', 'cancelled')
+
+    def __init__(self, due_tick: int, callback: Callable, args: tuple):
+        self.due_tick = due_tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Hashed timer wheel driven by a background thread"""
+
+    def __init__(self, tick_seconds: float = 0.1, slots: int = 512):
+        self.tick_seconds = tick_seconds
+        self.slots: List[List[Timer]] = [[] for _ in range(slots)]
+        self.running = False
+        self._tick = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def schedule(self, delay_seconds: float, callback: Callable, *args) -> Timer:
+        """Run callback(*args) after delay_seconds (rounded up to the next tick)"""
+        ticks = max(1, math.ceil(delay_seconds / self.tick_seconds))
+        with self._lock:
+            timer = Timer(self._tick + ticks, callback, args)
+            self.slots[timer.due_tick % len(self.slots)].append(timer)
+        return timer
+
+    def advance(self):
+        """Move one tick forward and fire the timers that are due"""
+        with self._lock:
+            self._tick += 1
+            slot = self.slots[self._tick % len(self.slots)]
+            due = [t for t in slot if t.due_tick <= self._tick]
+            slot[:] = [t for t in slot if t.due_tick > self._tick]
+        for timer in due:
+            if timer.cancelled:
+                continue
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                logger.error(f"Error in timer callback: {e}")
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while self.running:
+            next_tick += self.tick_seconds
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            self.advance()
+
+    def start(self):
+        """Start ticking in a background thread"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop ticking (pending timers are dropped)"""
+        self.running = False
+
+    def pending(self) -> int:
+        """Number of scheduled, not yet fired timers"""
+        with self._lock:
+            return sum(1 for slot in self.slots for t in slot if not t.cancelled)
@@ -0,0 +1,169 @@
+"""
+Trade Analytics - Vectorized series of closed trades
+
+TradeSeries keeps the exit and entry time (int64 microseconds, as recorded),
+P&L, P&L% and symbol/strategy codes of every closed trade in NumPy arrays
+sorted by exit time, plus running sums. A breakdown at any granularity is one searchsorted over the bucket
+edges and differences of the running sums, so its cost depends on the number
+of buckets, not trades. Bucket boundaries follow ANALYTICS_TIMEZONE.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+import numpy as np
+import config
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+LABELS = {'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d', 'week': '%Y-%m-%d', 'month': '%Y-%m'}
+
+
+def to_micros(times) -> np.ndarray:
+    """Naive ISO times (or datetimes) -> int64 microseconds since the epoch"""
+    return np.array(times, dtype='datetime64[us]').astype(np.int64)
+
+
+def timezone_for(name: str = None) -> Optional[ZoneInfo]:
+    """Zone for bucket boundaries (None: the server's local time, which trades are stamped in)"""
+    name = config.ANALYTICS_TIMEZONE if name is None else name
+    return ZoneInfo(name) if name else None
+
+
+def _add_months(year: int, month: int, months: int):
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def bucket_edges(granularity: str, periods: int, now: datetime, tz: ZoneInfo = None) -> List[datetime]:
+    """periods + 1 bucket boundaries ending with the one after the bucket holding `now` (naive local)"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    current = now.astimezone(tz) if tz else now
+    offsets = range(1 - periods, 2)
+    if granularity == 'hour':
+        start = current.replace(minute=0, second=0, microsecond=0)
+        if tz:  # Step in UTC so DST changes don't skip or repeat an hour
+            start = start.astimezone(timezone.utc)
+            return [(start + timedelta(hours=k)).astimezone(tz) for k in offsets]
+        return [start + timedelta(hours=k) for k in offsets]
+    if granularity == 'month':
+        return [datetime(*_add_months(current.year, current.month, k), 1, tzinfo=tz) for k in offsets]
+    day = current.date()
+    step = 1
+    if granularity == 'week':  # Weeks start on Monday
+        day -= timedelta(days=day.weekday())
+        step = 7
+    return [datetime.combine(day + timedelta(days=k * step), datetime.min.time(), tzinfo=tz) for k in offsets]
+
+
+class TradeSeries:
+    """Closed trades as sorted exit-time / P&L arrays, appended to incrementally"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.exit_us = np.empty(0, dtype=np.int64)
+            self.entry_us = np.empty(0, dtype=np.int64)
+            self.profit_loss = np.empty(0)
+            self.profit_loss_pct = np.empty(0)
+            self.symbol = np.empty(0, dtype=np.int32)    # Codes into self.names
+            self.strategy = np.empty(0, dtype=np.int32)
+            self.names: List[Optional[str]] = []
+            self._codes: Dict[Optional[str], int] = {}
+            self._pending: List[tuple] = []  # Appended since the last query
+            self._sums = None  # Running sums with a leading 0 (P&L, P&L%, wins, losses)
+            self.version = 0   # Bumped on every add, for caches built on the arrays
+
+    def add(self, trade):
+        if not trade.exit_time:
+            return
+        with self._lock:
+            self._pending.append((trade.exit_time, trade.entry_time or trade.exit_time,
+                                  trade.profit_loss or 0, trade.profit_loss_pct or 0,
+                                  self._code(trade.symbol), self._code(trade.strategy)))
+            self.version += 1
+
+    def _code(self, name: Optional[str]) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def code(self, name: Optional[str]) -> int:
+        """Code of a symbol / strategy name (-1 if no trade has it)"""
+        return self._codes.get(name, -1)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.exit_us) + len(self._pending)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        exits, entries, pl, pct, symbols, strategies = zip(*self._pending)
+        old = len(self.exit_us)
+        columns = {
+            'exit_us': to_micros(exits), 'entry_us': to_micros(entries),
+            'profit_loss': np.asarray(pl, dtype=float), 'profit_loss_pct': np.asarray(pct, dtype=float),
+            'symbol': np.asarray(symbols, dtype=np.int32), 'strategy': np.asarray(strategies, dtype=np.int32)
+        }
+        for name, values in columns.items():
+            columns[name] = np.concatenate([getattr(self, name), values])
+        tail = columns['exit_us'][old - 1 if old else 0:]
+        if np.any(tail[1:] < tail[:-1]):  # Usual case is already in order: no sort
+            order = np.argsort(columns['exit_us'], kind='stable')
+            columns = {name: values[order] for name, values in columns.items()}
+        for name, values in columns.items():
+            setattr(self, name, values)
+        self._pending = []
+        self._sums = None
+
+    def arrays(self):
+        """(exit_us, profit_loss, profit_loss_pct, running sums) as of now"""
+        with self._lock:
+            self._flush()
+            if self._sums is None:
+                pl = self.profit_loss
+                self._sums = tuple(
+                    np.concatenate(([0], np.cumsum(values)))
+                    for values in (pl, self.profit_loss_pct, pl > 0, pl < 0)
+                )
+            return self.exit_us, self.profit_loss, self.profit_loss_pct, self._sums
+
+    def select(self, symbol: str = None, strategy: str = None,
+               since: datetime = None, until: datetime = None) -> Dict[str, np.ndarray]:
+        """Columns of the matching trades (exit range by binary search, names by code)"""
+        with self._lock:
+            self._flush()
+            lo = np.searchsorted(self.exit_us, to_micros([since])[0], 'left') if since else 0
+            hi = np.searchsorted(self.exit_us, to_micros([until])[0], 'right') if until else len(self.exit_us)
+            columns = {name: getattr(self, name)[lo:hi] for name in
+                       ('exit_us', 'entry_us', 'profit_loss', 'profit_loss_pct', 'symbol', 'strategy')}
+            for field, name in (('symbol', symbol), ('strategy', strategy)):
+                if name:
+                    mask = columns[field] == self._codes.get(name, -1)
+                    columns = {key: values[mask] for key, values in columns.items()}
+            return columns
+
+    def breakdown(self, granularity: str, periods: int, now: datetime, tz: ZoneInfo = None) -> List[dict]:
+        """Per-bucket counts and P&L for the last `periods` buckets, oldest first"""
+        edges = bucket_edges(granularity, periods, now, tz)
+        local = [e.astimezone().replace(tzinfo=None) for e in edges] if tz else edges  # As trades are stamped
+        exit_us, _, _, (pl, pct, wins, losses) = self.arrays()
+        idx = np.searchsorted(exit_us, to_micros(local), side='left')
+        counts = np.diff(idx)
+        columns = [np.diff(s[idx]) for s in (pl, pct, wins, losses)]
+        label = LABELS[granularity]
+        return [{
+            'start': start.isoformat(),
+            'label': start.strftime(label),
+            'trades': int(count),
+            'winning_trades': int(n_wins),
+            'losing_trades': int(n_losses),
+            'profit_loss': round(float(total), 2),
+            'profit_loss_pct': round(float(total_pct), 2)
+        } for start, count, total, total_pct, n_wins, n_losses in zip(edges, counts, *columns)]
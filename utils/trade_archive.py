@@ -0,0 +1,187 @@
+"""
+Trade Archive - Immutable monthly segments of closed trades (cold tier)
+
+A segment holds trades that exited in one month as gzip-compressed JSON
+lines, followed by a small JSON footer (count, P&L sums, exit time range)
+and a fixed-size trailer pointing at it, so a segment can be summarized or
+skipped without decompressing it. Segments are never rewritten: trades
+archived for a month later on go into the next part (trades-2024-05.1.seg).
+"""
+import gzip
+import json
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger('TradeArchive')
+
+TRAILER = struct.Struct('>I4s')  # Footer length, magic
+MAGIC = b'TSG1'
+SEGMENT_NAME = re.compile(r'^trades-(\d{4}-\d{2})\.(\d+)\.seg$')
+
+
+def _exit_time(item) -> str:
+    return item['exit_time'] if isinstance(item, dict) else item.exit_time
+
+
+def _key(item) -> tuple:
+    return (item['exit_time'], item['id']) if isinstance(item, dict) else (item.exit_time, item.id)
+
+
+def summarize(month: str, records: List[dict]) -> dict:
+    """Segment footer for a month's trades"""
+    pl = [r.get('profit_loss') or 0 for r in records]
+    exits = [r['exit_time'] for r in records]
+    return {
+        'month': month,
+        'count': len(records),
+        'winning_trades': sum(1 for p in pl if p > 0),
+        'losing_trades': sum(1 for p in pl if p < 0),
+        'profit_loss': sum(pl),
+        'profit_loss_pct': sum(r.get('profit_loss_pct') or 0 for r in records),
+        'first_exit': min(exits),
+        'last_exit': max(exits)
+    }
+
+
+def write_segment(path: str, month: str, records: List[dict]):
+    """Compressed trades + footer + trailer, written atomically"""
+    body = gzip.compress(b''.join(json.dumps(r, separators=(',', ':')).encode() + b'\n' for r in records))
+    footer = json.dumps(summarize(month, records)).encode()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(body + footer + TRAILER.pack(len(footer), MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _split(data: bytes, path: str):
+    length, magic = TRAILER.unpack(data[-TRAILER.size:])
+    if magic != MAGIC:
+        raise ValueError(f"Not a trade segment: {path}")
+    end = len(data) - TRAILER.size
+    return data[:end - length], data[end - length:end]
+
+
+def read_footer(path: str) -> dict:
+    """Just the footer (reads the last few hundred bytes)"""
+    with open(path, 'rb') as f:
+        f.seek(-TRAILER.size, os.SEEK_END)
+        length, magic = TRAILER.unpack(f.read(TRAILER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a trade segment: {path}")
+        f.seek(-TRAILER.size - length, os.SEEK_END)
+        return json.loads(f.read(length))
+
+
+def read_segment(path: str) -> List[dict]:
+    with open(path, 'rb') as f:
+        body, _ = _split(f.read(), path)
+    return [json.loads(line) for line in gzip.decompress(body).splitlines()]
+
+
+class TradeArchive:
+    """Directory of monthly segments with cached footers and an LRU of opened segments"""
+
+    def __init__(self, directory: str, factory: Callable[[dict], object] = None, cache_segments: int = None):
+        self.directory = directory
+        self.factory = factory  # Turns stored dicts into trade objects once per segment load
+        self.cache_segments = config.ARCHIVE_CACHE_SEGMENTS if cache_segments is None else cache_segments
+        self._footers: Dict[str, dict] = {}
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def segments(self) -> List[dict]:
+        """Footers of every segment (plus its file name), oldest first"""
+        with self._lock:
+            names = []
+            for name in os.listdir(self.directory):
+                match = SEGMENT_NAME.match(name)
+                if match:
+                    names.append((match.group(1), int(match.group(2)), name))
+            names.sort()
+            current = {name for _, _, name in names}
+            for name in list(self._footers):
+                if name not in current:
+                    del self._footers[name]
+            footers = []
+            for _, _, name in names:
+                if name not in self._footers:
+                    try:
+                        self._footers[name] = dict(read_footer(os.path.join(self.directory, name)), file=name)
+                    except Exception as e:
+                        logger.error(f"Unreadable archive segment {name}: {e}")
+                        continue
+                footers.append(self._footers[name])
+            return footers
+
+    def _load(self, name: str) -> list:
+        with self._lock:
+            if name in self._cache:
+                self._cache.move_to_end(name)
+                return self._cache[name]
+        records = read_segment(os.path.join(self.directory, name))
+        if self.factory:
+            records = [self.factory(r) for r in records]
+        with self._lock:
+            self._cache[name] = records
+            while len(self._cache) > max(self.cache_segments, 0):
+                self._cache.popitem(last=False)
+        return records
+
+    def months(self, since: str = None, until: str = None, descending: bool = False) -> Iterator[list]:
+        """Archived trades exited within [since, until] (ISO times), one month at a time, by (exit time, id)
+
+        Segments outside the range are never opened; only one month is held at a time.
+        """
+        by_month: Dict[str, List[dict]] = {}
+        for footer in self.segments():
+            if (since and footer['last_exit'] < since) or (until and footer['first_exit'] > until):
+                continue
+            by_month.setdefault(footer['month'], []).append(footer)
+        for month in sorted(by_month, reverse=descending):
+            found = []
+            for footer in by_month[month]:
+                records = self._load(footer['file'])
+                if (since and footer['first_exit'] < since) or (until and footer['last_exit'] > until):
+                    records = [r for r in records
+                               if (not since or _exit_time(r) >= since) and (not until or _exit_time(r) <= until)]
+                found.extend(records)
+            found.sort(key=_key, reverse=descending)  # Parts of one month can interleave
+            yield found
+
+    def records(self, since: str = None, until: str = None) -> list:
+        """Archived trades exited within [since, until] (ISO times), by exit time"""
+        return [r for month in self.months(since, until) for r in month]
+
+    def get(self, trade_id: str, not_before: str = None):
+        """One archived trade by id, newest segments first (skipping those exited before not_before)"""
+        # By last exit, not file order: parts of a month archived later can hold older exits
+        for footer in sorted(self.segments(), key=lambda f: f['last_exit'], reverse=True):
+            if not_before and footer['last_exit'] < not_before:
+                break  # Every remaining segment ended even earlier
+            for record in self._load(footer['file']):
+                if (record['id'] if isinstance(record, dict) else record.id) == trade_id:
+                    return record
+        return None
+
+    def append(self, month: str, records: List[dict]) -> int:
+        """Write a month's trades as a new part; ids already archived for the month are skipped"""
+        with self._lock:
+            parts = [f for f in self.segments() if f['month'] == month]
+            archived = set()
+            for footer in parts:
+                archived.update(r['id'] for r in read_segment(os.path.join(self.directory, footer['file'])))
+            records = sorted((r for r in records if r['id'] not in archived), key=_exit_time)
+            if not records:
+                return 0
+            part = max((int(SEGMENT_NAME.match(f['file']).group(2)) for f in parts), default=-1) + 1
+            write_segment(os.path.join(self.directory, f"trades-{month}.{part}.seg"), month, records)
+            return len(records)
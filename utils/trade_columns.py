@@ -0,0 +1,232 @@
+"""
+Trade Columns - Columnar in-memory store for closed trades
+
+Numeric fields live in float64 arrays, times in int64 microseconds, and
+symbol/strategy/side/status as codes into one interned string table. Rows
+are read through TradeRow views (attribute access like a Trade) that hold
+nothing but a row number; many rows convert to dicts in bulk.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+
+NUMERIC = ('quantity', 'entry_price', 'exit_price', 'profit_loss', 'profit_loss_pct',
+           'take_profit', 'stop_loss')
+TIMES = ('entry_time', 'exit_time')
+CODED = ('symbol', 'side', 'status', 'strategy')
+FIELDS = ('id', 'symbol', 'side', 'quantity', 'entry_price', 'entry_time', 'exit_price',
+          'exit_time', 'profit_loss', 'profit_loss_pct', 'take_profit', 'stop_loss', 'status',
+          'order_id', 'strategy', 'oco_order_list_id', 'oco_order_ids')
+
+EPOCH = datetime(1970, 1, 1)
+NAT = np.iinfo(np.int64).min      # Missing time
+NO_ORDER = np.iinfo(np.int64).min  # Missing / non-numeric order id
+
+
+def to_micros(value: Optional[str]) -> int:
+    """Naive ISO time -> int64 microseconds since the epoch"""
+    if not value:
+        return NAT
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        raise ValueError('aware time')
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value: int) -> Optional[str]:
+    return None if value == NAT else (EPOCH + timedelta(microseconds=int(value))).isoformat()
+
+
+def _order_code(order_id) -> Optional[int]:
+    """int64 for an order id string that reads back identically, else None (kept as is)"""
+    if not isinstance(order_id, str) or not order_id.isdigit():
+        return None
+    code = int(order_id)
+    return code if str(code) == order_id and code <= np.iinfo(np.int64).max else None
+
+
+class TradeRow:
+    """Read/write view of one row, duck-typed as a Trade"""
+    __slots__ = ('_columns', '_row')
+
+    def __init__(self, columns: 'TradeColumns', row: int):
+        object.__setattr__(self, '_columns', columns)
+        object.__setattr__(self, '_row', row)
+
+    def __getattr__(self, name: str):
+        if name not in FIELDS:
+            raise AttributeError(name)
+        return self._columns.get(self._row, name)
+
+    def __setattr__(self, name: str, value):
+        self._columns.set(self._row, name, value)
+
+    def __repr__(self) -> str:
+        return f"TradeRow({self.id}, {self.symbol}, {self.status})"
+
+    def to_dict(self) -> dict:
+        return self._columns.to_dict(self._row)
+
+    def index_keys(self) -> tuple:
+        columns, row = self._columns, self._row
+        extras = columns.extras.get(row)
+        if extras:
+            return tuple(columns.get(row, f) for f in ('id', 'status', 'symbol', 'strategy', 'exit_time'))
+        codes, strings = columns.codes, columns.strings
+        code = lambda name: None if codes[name][row] < 0 else strings[codes[name][row]]
+        return (columns.ids[row], code('status'), code('symbol'), code('strategy'),
+                from_micros(columns.times['exit_time'][row]))
+
+    def to_trade(self):
+        """Materialize a full Trade"""
+        from utils.trade_manager import Trade
+        return Trade.from_dict(self.to_dict())
+
+
+class TradeColumns:
+    """Growable column arrays, one row per trade"""
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.capacity = capacity
+        self.numeric = {f: np.full(capacity, np.nan) for f in NUMERIC}
+        self.times = {f: np.full(capacity, NAT, dtype=np.int64) for f in TIMES}
+        self.codes = {f: np.full(capacity, -1, dtype=np.int32) for f in CODED}
+        self.order_ids = np.full(capacity, NO_ORDER, dtype=np.int64)
+        self.ids: List[str] = []
+        self.extras: Dict[int, dict] = {}       # Values that don't fit their column (rare)
+        self.strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self):
+        self.capacity *= 2
+        for group, fill in ((self.numeric, np.nan), (self.times, NAT), (self.codes, -1)):
+            for name, array in group.items():
+                grown = np.full(self.capacity, fill, dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                group[name] = grown
+        grown = np.full(self.capacity, NO_ORDER, dtype=np.int64)
+        grown[:self.size] = self.order_ids[:self.size]
+        self.order_ids = grown
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._string_codes.get(value)
+        if code is None:
+            code = self._string_codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def append(self, record: dict) -> TradeRow:
+        if self.size == self.capacity:
+            self._grow()
+        row = self.size
+        self.size += 1
+        self.ids.append(record['id'])
+        get = record.get
+        try:
+            for name in NUMERIC:
+                value = get(name)
+                self.numeric[name][row] = np.nan if value is None else value
+            for name in TIMES:
+                self.times[name][row] = to_micros(get(name))
+            for name in CODED:
+                self.codes[name][row] = self.intern(get(name))
+            order_id = get('order_id')
+            if order_id is not None:
+                code = _order_code(order_id)
+                self.order_ids[row] = self._odd(row, order_id) if code is None else code
+            if get('oco_order_list_id') is not None or get('oco_order_ids') is not None:
+                self.extras[row] = {'oco_order_list_id': get('oco_order_list_id'),
+                                    'oco_order_ids': get('oco_order_ids')}
+        except (ValueError, TypeError, OverflowError):
+            for name in FIELDS[1:]:  # Slow path: field by field, odd values to extras
+                self.set(row, name, get(name))
+        return TradeRow(self, row)
+
+    def _odd(self, row: int, order_id) -> int:
+        self.extras.setdefault(row, {})['order_id'] = order_id
+        return NO_ORDER
+
+    def set(self, row: int, name: str, value):
+        extras = self.extras.get(row)
+        if extras and name in extras:
+            del extras[name]
+        try:
+            if name in NUMERIC:
+                self.numeric[name][row] = np.nan if value is None else float(value)
+            elif name in TIMES:
+                self.times[name][row] = to_micros(value)
+            elif name in CODED:
+                self.codes[name][row] = self.intern(value)
+            elif name == 'order_id':
+                code = None if value is None else _order_code(value)
+                self.order_ids[row] = NO_ORDER if code is None else code
+                if value is not None and code is None:
+                    raise ValueError('order id not stored as a number')
+            elif name == 'id':
+                self.ids[row] = value
+            elif value is not None:  # OCO fields: only a few rows have them
+                raise ValueError('sparse field')
+        except (ValueError, TypeError, OverflowError):
+            self.extras.setdefault(row, {})[name] = value
+
+    def get(self, row: int, name: str):
+        extras = self.extras.get(row)
+        if extras and name in extras:
+            return extras[name]
+        if name in NUMERIC:
+            value = self.numeric[name][row]
+            return None if np.isnan(value) else float(value)
+        if name in TIMES:
+            return from_micros(self.times[name][row])
+        if name in CODED:
+            code = self.codes[name][row]
+            return None if code < 0 else self.strings[code]
+        if name == 'order_id':
+            value = self.order_ids[row]
+            return None if value == NO_ORDER else str(value)
+        if name == 'id':
+            return self.ids[row]
+        return None
+
+    def to_dict(self, row: int) -> dict:
+        return {name: self.get(row, name) for name in FIELDS}
+
+    def to_dicts(self, rows) -> List[dict]:
+        """Many rows at once, converting each column in bulk"""
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = {'id': [self.ids[r] for r in rows]}
+        for name in NUMERIC:
+            values = self.numeric[name][rows]
+            columns[name] = [None if v != v else v for v in values.tolist()]
+        for name in TIMES:
+            columns[name] = [from_micros(v) for v in self.times[name][rows].tolist()]
+        for name in CODED:
+            columns[name] = [None if c < 0 else self.strings[c] for c in self.codes[name][rows].tolist()]
+        columns['order_id'] = [None if v == NO_ORDER else str(v) for v in self.order_ids[rows].tolist()]
+        records = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        for record, row in zip(records, rows.tolist()):
+            record.setdefault('oco_order_list_id', None)
+            record.setdefault('oco_order_ids', None)
+            if row in self.extras:
+                record.update(self.extras[row])
+        return [{name: record[name] for name in FIELDS} for record in records]
+
+    def rows_of(self, trades: list) -> Optional[np.ndarray]:
+        """Row numbers if every trade is a view into these columns, else None"""
+        rows = np.empty(len(trades), dtype=np.int64)
+        for i, trade in enumerate(trades):
+            if type(trade) is not TradeRow or trade._columns is not self:
+                return None
+            rows[i] = trade._row
+        return rows
+
+    def memory_bytes(self) -> int:
+        """Approximate footprint of the arrays (strings excluded)"""
+        arrays = [*self.numeric.values(), *self.times.values(), *self.codes.values(), self.order_ids]
+        return sum(a.nbytes for a in arrays)
@@ -1,12 +1,28 @@
 """
 Trade Manager - Persistent storage and analysis for trade history
 """
-import json
+import bisect
+import heapq
+import itertools
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
+import config
+from utils.clock import REAL_CLOCK, Clock
+from utils.pnl_rollup import PnLRollup
+from utils import risk_metrics
+from utils.trade_analytics import TradeSeries, timezone_for, to_micros
+from utils.trade_archive import TradeArchive
+from utils.trade_columns import TradeColumns
+from utils.trade_storage import TradeStorage, create_trade_storage
+
+
+MAX_KEY = '\U0010ffff'  # Sorts after any trade id / time string
+PAGE_CHUNK = 500  # Index entries taken per lock hold while iterating
 
 
 class TradeStatus(Enum):
@@ -32,10 +48,16 @@ class Trade:
     status: str = "open"
     order_id: Optional[str] = None
     strategy: Optional[str] = None
+    oco_order_list_id: Optional[str] = None  # Exchange-side OCO protecting this trade
+    oco_order_ids: Optional[List[int]] = None
     
     def to_dict(self) -> dict:
         return asdict(self)
     
+    def index_keys(self) -> tuple:
+        """(id, status, symbol, strategy, exit_time) for TradeIndex"""
+        return self.id, self.status, self.symbol, self.strategy, self.exit_time
+    
     @classmethod
     def from_dict(cls, data: dict) -> 'Trade':
         defaults = {
@@ -47,52 +69,263 @@ class Trade:
             'stop_loss': None,
             'order_id': None,
             'strategy': None,
+            'oco_order_list_id': None,
+            'oco_order_ids': None,
         }
         merged = {**defaults, **data}
         return cls(**merged)
 
 
+class TradeIndex:
+    """Secondary indexes over the in-memory trades, kept in step with every change"""
+    
+    def __init__(self, trades: List[Trade] = ()):
+        self.by_id: Dict[str, Trade] = {}
+        self.open: Dict[str, Trade] = {}  # Insertion-ordered
+        self.open_by_symbol: Dict[str, Dict[str, Trade]] = {}
+        self.open_by_strategy: Dict[str, Dict[str, Trade]] = {}
+        self.exits: List[Tuple[str, str]] = []  # (exit_time, id) of closed trades, sorted
+        self._keys: Dict[str, tuple] = {}  # id -> (seq, status, symbol, strategy, exit_time) as indexed
+        self._seq = itertools.count()
+        for trade in trades:
+            self.add(trade)
+    
+    def add(self, trade: Trade):
+        self.by_id[trade.id] = trade
+        self._keys[trade.id] = (next(self._seq), None, None, None, None)
+        self._index(trade)
+    
+    def position(self, trade_id: str) -> int:
+        """Insertion order of a trade (its slot in TradeManager.trades)"""
+        return self._keys[trade_id][0]
+    
+    def update(self, trade: Trade):
+        """Re-index a trade after its fields changed"""
+        self._unindex(trade.id)
+        self._index(trade)
+    
+    def _index(self, trade: Trade):
+        trade_id, status, symbol, strategy, exit_time = trade.index_keys()
+        seq = self._keys[trade_id][0]
+        if status == TradeStatus.OPEN.value:
+            self.open[trade_id] = trade
+            self.open_by_symbol.setdefault(symbol, {})[trade_id] = trade
+            self.open_by_strategy.setdefault(strategy, {})[trade_id] = trade
+        elif status == TradeStatus.CLOSED.value:
+            entry = (exit_time or '', trade_id)
+            if self.exits and entry < self.exits[-1]:
+                bisect.insort(self.exits, entry)
+            else:
+                self.exits.append(entry)  # Usual case: closes arrive in time order
+        self._keys[trade_id] = (seq, status, symbol, strategy, exit_time)
+    
+    def _unindex(self, trade_id: str):
+        seq, status, symbol, strategy, exit_time = self._keys[trade_id]
+        if status == TradeStatus.OPEN.value:
+            del self.open[trade_id]
+            for buckets, key in ((self.open_by_symbol, symbol), (self.open_by_strategy, strategy)):
+                del buckets[key][trade_id]
+                if not buckets[key]:
+                    del buckets[key]
+        elif status == TradeStatus.CLOSED.value:
+            entry = (exit_time or '', trade_id)
+            i = bisect.bisect_left(self.exits, entry)
+            if i < len(self.exits) and self.exits[i] == entry:
+                del self.exits[i]
+    
+    def open_trades(self, symbol: str = None, strategy: str = None) -> List[Trade]:
+        if symbol and strategy:
+            by_symbol = self.open_by_symbol.get(symbol, {})
+            by_strategy = self.open_by_strategy.get(strategy, {})
+            if len(by_symbol) <= len(by_strategy):
+                return [t for t in by_symbol.values() if t.strategy == strategy]
+            return [t for t in by_strategy.values() if t.symbol == symbol]
+        if symbol:
+            return list(self.open_by_symbol.get(symbol, {}).values())
+        if strategy:
+            return list(self.open_by_strategy.get(strategy, {}).values())
+        return list(self.open.values())
+    
+    def closed_trades(self, exit_after: str = None, exit_before: str = None) -> List[Trade]:
+        """Closed trades ordered by exit time, optionally within [exit_after, exit_before]"""
+        lo = bisect.bisect_left(self.exits, (exit_after,)) if exit_after else 0
+        hi = bisect.bisect_right(self.exits, (exit_before, MAX_KEY)) if exit_before else len(self.exits)
+        return [self.by_id[trade_id] for _, trade_id in self.exits[lo:hi]]
+    
+    def closed_after(self, key: tuple, limit: int, descending: bool = False) -> List[Tuple[tuple, Trade]]:
+        """Up to `limit` closed trades past a (exit_time, id) key, in key order"""
+        if descending:
+            hi = bisect.bisect_left(self.exits, key)
+            keys = self.exits[max(hi - limit, 0):hi][::-1]
+        else:
+            lo = bisect.bisect_right(self.exits, key)
+            keys = self.exits[lo:lo + limit]
+        return [(k, self.by_id[k[1]]) for k in keys]
+
+
 class TradeManager:
     """Manages trade history with persistent storage"""
     
-    def __init__(self, storage_path: str = None):
+    def __init__(
+        self,
+        storage_path: str = None,
+        clock: Clock = None,
+        storage: TradeStorage = None,
+        columnar: bool = None,
+        archive: bool = None
+    ):
+        self.clock = clock or REAL_CLOCK  # Stamps entry/exit times
         self.storage_path = storage_path or os.path.join(
             os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
             'data',
             'trades.json'
         )
         self.trades: List[Trade] = []
+        self.index = TradeIndex()
+        # Closed trades as NumPy columns + TradeRow views instead of Trade objects
+        self.columnar = config.TRADE_COLUMNAR if columnar is None else columnar
+        self.columns: Optional[TradeColumns] = None
+        self.version = 0  # Bumped on every change to the in-memory trades (ours or another process's)
+        self.listeners: List[Callable[[Optional[Trade], str], None]] = []
+        self._lock = threading.RLock()
+        self._closing = set()  # Trade ids an exit is in progress for (see closing())
         self._ensure_storage_dir()
+        self.storage = storage or create_trade_storage(self.storage_path)
+        # Closed trades of past months move to compressed monthly segments (cold tier)
+        archive = config.TRADE_ARCHIVE if archive is None else archive
+        self.archive = TradeArchive(
+            os.path.join(os.path.dirname(self.storage_path), 'archive'),
+            factory=Trade.from_dict
+        ) if archive else None
+        self._archived_before = None  # Cutoff of the last archive pass
         self._load_trades()
+        self._maybe_archive()
+    
+    def add_listener(self, callback: Callable[[Optional[Trade], str], None]):
+        """Register callback(trade, event) for 'opened' / 'updated' / 'closed' trades
+        (ours or another process's) and 'reloaded' (trade None: the hot tier was re-read)"""
+        self.listeners.append(callback)
+    
+    def _notify(self, trade: Optional[Trade], event: str):
+        for callback in self.listeners:
+            try:
+                callback(trade, event)
+            except Exception as e:
+                print(f"Error in trade listener: {e}")
     
     def _ensure_storage_dir(self):
         """Ensure the data directory exists"""
         os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
     
     def _load_trades(self):
-        """Load trades from JSON file"""
-        if os.path.exists(self.storage_path):
+        """Load trades from storage"""
+        with self._lock:
+            self.columns = TradeColumns() if self.columnar else None
             try:
-                with open(self.storage_path, 'r') as f:
-                    data = json.load(f)
-                    self.trades = [Trade.from_dict(t) for t in data]
+                self.trades = [self._materialize(t) for t in self.storage.load()]
             except Exception as e:
                 print(f"Error loading trades: {e}")
                 self.trades = []
+            self.index = TradeIndex(self.trades)
+            self.version += 1
+            self._notify(None, 'reloaded')
+    
+    def _sync(self):
+        """Apply changes other processes made to storage (a stat/pragma check when there are none)"""
+        with self._lock:
+            try:
+                records = self.storage.refresh()
+            except Exception as e:
+                print(f"Error refreshing trades: {e}")
+                return
+            if records is None:
+                self._load_trades()
+                return
+            changed = False
+            for record in records:
+                trade = self.index.by_id.get(record['id'])
+                if trade is None or trade.to_dict() != record:
+                    self._adopt(record)
+                    changed = True
+            if changed:
+                self.version += 1
+    
+    def _materialize(self, record: dict) -> Trade:
+        """Trade object, or a column row for closed trades in columnar mode"""
+        if self.columns is not None and record.get('status') == TradeStatus.CLOSED.value:
+            return self.columns.append(record)
+        return Trade.from_dict(record)
+    
+    def _to_columns(self, trade: Trade) -> Trade:
+        """Move a trade that just closed into the columns (columnar mode)"""
+        if self.columns is None or not isinstance(trade, Trade) \
+                or trade.status != TradeStatus.CLOSED.value:
+            return trade
+        row = self.columns.append(trade.to_dict())
+        self.trades[self.index.position(trade.id)] = row
+        self.index.by_id[trade.id] = row
+        return row
+    
+    def _adopt(self, record: dict) -> Trade:
+        """Merge a stored trade into the in-memory list (one object per id)"""
+        trade = self.index.by_id.get(record['id'])
+        is_new = trade is None
+        was_open = is_new or trade.status == TradeStatus.OPEN.value
+        if trade is None:
+            trade = self._materialize(record)
+            self.trades.append(trade)
+            self.index.add(trade)
         else:
-            self.trades = []
+            for field, value in record.items():
+                setattr(trade, field, value)
+            self.index.update(trade)
+            trade = self._to_columns(trade)
+        if trade.status == TradeStatus.CLOSED.value:
+            self._notify(trade, 'closed' if was_open else 'updated')
+        else:
+            self._notify(trade, 'opened' if is_new else 'updated')
+        return trade
     
-    def _save_trades(self):
-        """Save trades to JSON file"""
+    def _open_trade(self, trade_id: str) -> Optional[Trade]:
+        """Open trade by id (after pulling in changes from other processes; hold storage.locked())"""
+        self._sync()
+        trade = self.index.by_id.get(trade_id)
+        return trade if trade and trade.status == TradeStatus.OPEN.value else None
+    
+    @contextmanager
+    def closing(self, trade_id: str) -> Iterator[Optional[Trade]]:
+        """Claim a trade while exiting it: yields it if open and not already being exited, else None
+        
+        Only the claim is taken under the store lock; send the exit order inside the
+        block without it, then close_trade() re-checks the trade under the lock. Other
+        processes are kept from selling twice by the exit's shared client order ID.
+        """
+        with self._lock, self.storage.locked():
+            trade = None if trade_id in self._closing else self._open_trade(trade_id)
+            if trade:
+                self._closing.add(trade_id)
         try:
-            with open(self.storage_path, 'w') as f:
-                json.dump([t.to_dict() for t in self.trades], f, indent=2)
+            yield trade
+        finally:
+            if trade:
+                with self._lock:
+                    self._closing.discard(trade_id)
+    
+    def _save_trade(self, trade: Trade):
+        """Persist one new or changed trade"""
+        self.version += 1
+        try:
+            self.storage.save(trade.to_dict())
         except Exception as e:
-            print(f"Error saving trades: {e}")
+            print(f"Error saving trade {trade.id}: {e}")
     
     def _generate_trade_id(self) -> str:
-        """Generate unique trade ID"""
-        return f"TRD-{datetime.now().strftime('%Y%m%d%H%M%S')}-{len(self.trades) + 1}"
+        """Generate unique trade ID (call under storage.locked() after _sync, so the count is global)"""
+        stamp = self.clock.now().strftime('%Y%m%d%H%M%S')
+        for n in itertools.count(len(self.trades) + 1):
+            trade_id = f"TRD-{stamp}-{n}"
+            if trade_id not in self.index.by_id:
+                return trade_id
     
     def open_trade(
         self,
@@ -106,22 +339,26 @@ class TradeManager:
         stop_loss: float = None
     ) -> Trade:
         """Open a new trade"""
-        trade = Trade(
-            id=self._generate_trade_id(),
-            symbol=symbol,
-            side=side,
-            quantity=quantity,
-            entry_price=entry_price,
-            entry_time=datetime.now().isoformat(),
-            order_id=order_id,
-            strategy=strategy,
-            take_profit=take_profit,
-            stop_loss=stop_loss,
-            status=TradeStatus.OPEN.value
-        )
-        self.trades.append(trade)
-        self._save_trades()
-        return trade
+        with self._lock, self.storage.locked():
+            self._sync()
+            trade = Trade(
+                id=self._generate_trade_id(),
+                symbol=symbol,
+                side=side,
+                quantity=quantity,
+                entry_price=entry_price,
+                entry_time=self.clock.now().isoformat(),
+                order_id=order_id,
+                strategy=strategy,
+                take_profit=take_profit,
+                stop_loss=stop_loss,
+                status=TradeStatus.OPEN.value
+            )
+            self.trades.append(trade)
+            self.index.add(trade)
+            self._save_trade(trade)
+            self._notify(trade, 'opened')
+            return trade
     
     def close_trade(
         self,
@@ -130,201 +367,513 @@ class TradeManager:
         order_id: str = None
     ) -> Optional[Trade]:
         """Close an existing trade"""
-        for trade in self.trades:
-            if trade.id == trade_id and trade.status == TradeStatus.OPEN.value:
-                trade.exit_price = exit_price
-                trade.exit_time = datetime.now().isoformat()
-                trade.status = TradeStatus.CLOSED.value
-                
-                # Calculate P&L
-                if trade.side == "BUY":
-                    trade.profit_loss = (exit_price - trade.entry_price) * trade.quantity
-                    trade.profit_loss_pct = ((exit_price - trade.entry_price) / trade.entry_price) * 100
-                else:  # SHORT
-                    trade.profit_loss = (trade.entry_price - exit_price) * trade.quantity
-                    trade.profit_loss_pct = ((trade.entry_price - exit_price) / trade.entry_price) * 100
-                
-                self._save_trades()
-                return trade
-        return None
-    
-    def get_open_trades(self) -> List[Trade]:
-        """Get all open trades"""
-        self._load_trades()  # Reload to get latest trades from file
-        return [t for t in self.trades if t.status == TradeStatus.OPEN.value]
-    
-    def get_closed_trades(self) -> List[Trade]:
-        """Get all closed trades"""
-        self._load_trades()  # Reload to get latest trades from file
-        return [t for t in self.trades if t.status == TradeStatus.CLOSED.value]
+        with self._lock, self.storage.locked():
+            trade = self._open_trade(trade_id)
+            if not trade:
+                return None
+            trade.exit_price = exit_price
+            trade.exit_time = self.clock.now().isoformat()
+            trade.status = TradeStatus.CLOSED.value
+            
+            # Calculate P&L
+            if trade.side == "BUY":
+                trade.profit_loss = (exit_price - trade.entry_price) * trade.quantity
+                trade.profit_loss_pct = ((exit_price - trade.entry_price) / trade.entry_price) * 100
+            else:  # SHORT
+                trade.profit_loss = (trade.entry_price - exit_price) * trade.quantity
+                trade.profit_loss_pct = ((trade.entry_price - exit_price) / trade.entry_price) * 100
+            
+            self.index.update(trade)
+            self._save_trade(trade)
+            self._notify(self._to_columns(trade), 'closed')
+            self._maybe_archive()
+            return trade
+    
+    def close_part(
+        self,
+        trade_id: str,
+        quantity: float,
+        exit_price: float,
+        order_id: str = None
+    ) -> Optional[Trade]:
+        """Close `quantity` of an open trade, returning the closed trade.
+
+        When that falls short of the whole trade, the sold part is split off as its own
+        closed trade and the rest stays open under the original id.
+        """
+        with self._lock, self.storage.locked():
+            trade = self._open_trade(trade_id)
+            if not trade:
+                return None
+            if quantity >= trade.quantity * 0.999:
+                return self.close_trade(trade_id, exit_price, order_id=order_id)
+            exited = self.open_trade(
+                symbol=trade.symbol,
+                side=trade.side,
+                quantity=quantity,
+                entry_price=trade.entry_price,
+                order_id=trade.order_id,
+                strategy=trade.strategy,
+                take_profit=trade.take_profit,
+                stop_loss=trade.stop_loss
+            )
+            self.update_trade(exited.id, entry_time=trade.entry_time)
+            closed = self.close_trade(exited.id, exit_price, order_id=order_id)
+            self.update_trade(trade_id, quantity=round(trade.quantity - quantity, 12))
+            return closed
+    
+    def update_trade(self, trade_id: str, **changes) -> Optional[Trade]:
+        """Update fields of an open trade (levels, protective order ids, ...)"""
+        with self._lock, self.storage.locked():
+            trade = self._open_trade(trade_id)
+            if not trade:
+                return None
+            for field, value in changes.items():
+                setattr(trade, field, value)
+            self.index.update(trade)
+            self._save_trade(trade)
+            self._notify(trade, 'updated')
+            return trade
+    
+    def update_trade_levels(
+        self,
+        trade_id: str,
+        take_profit: float = None,
+        stop_loss: float = None
+    ) -> Optional[Trade]:
+        """Update take-profit / stop-loss levels of an open trade"""
+        changes = {}
+        if take_profit is not None:
+            changes['take_profit'] = take_profit
+        if stop_loss is not None:
+            changes['stop_loss'] = stop_loss
+        return self.update_trade(trade_id, **changes)
+    
+    def get_open_trades(self, symbol: str = None, strategy: str = None) -> List[Trade]:
+        """Get all open trades (optionally of one symbol / strategy)"""
+        self._sync()
+        with self._lock:
+            return self.index.open_trades(symbol, strategy)
+    
+    def get_closed_trades(self, since: datetime = None, until: datetime = None) -> List[Trade]:
+        """Get closed trades by exit time (optionally those exited within a time range)"""
+        self._sync()
+        since = since.isoformat() if since else None
+        until = until.isoformat() if until else None
+        with self._lock:
+            hot = self.index.closed_trades(since, until)
+            by_id = self.index.by_id
+        if self.archive is None:
+            return hot
+        cold = self.archive.records(since, until)  # Only segments overlapping the range are opened
+        return [t for t in cold if t.id not in by_id] + hot
     
     def get_all_trades(self) -> List[Trade]:
         """Get all trades"""
-        self._load_trades()  # Reload to get latest trades from file
-        return self.trades
+        self._sync()
+        if self.archive is None:
+            return self.trades
+        with self._lock:
+            hot = list(self.trades)
+        by_id = self.index.by_id
+        return [t for t in self.archive.records() if t.id not in by_id] + hot
+    
+    @staticmethod
+    def order_key(trade: Trade) -> Tuple[str, str]:
+        """(time, id) that trade listings are ordered by: exit time once closed, else entry time"""
+        if trade.status == TradeStatus.CLOSED.value:
+            return trade.exit_time or '', trade.id
+        return trade.entry_time, trade.id
     
-    def get_running_trade(self, symbol: str = None) -> Optional[Trade]:
-        """Get currently running trade for a symbol"""
-        open_trades = self.get_open_trades()
+    def iter_trades(
+        self,
+        status: str = None,
+        symbol: str = None,
+        strategy: str = None,
+        since: datetime = None,
+        until: datetime = None,
+        after: Tuple[str, str] = None,
+        descending: bool = True
+    ) -> Iterator[Trade]:
+        """Trades in order_key order, lazily: open trades, the hot closed index and archive months merged
+        
+        `after` is a keyset cursor (the order key of the last trade already seen).
+        """
+        self._sync()
+        lo = (since.isoformat(), '') if since else ('', '')
+        hi = (until.isoformat(), MAX_KEY) if until else (MAX_KEY, MAX_KEY)
+        if after:
+            after = tuple(after)
+            hi, lo = (min(hi, after), lo) if descending else (hi, max(lo, after))
+        wanted = lambda t: (not symbol or t.symbol == symbol) and (not strategy or t.strategy == strategy)
+        streams = []
+        if status in (None, TradeStatus.OPEN.value):
+            with self._lock:
+                open_trades = [(self.order_key(t), t) for t in self.index.open_trades(symbol, strategy)]
+            streams.append(sorted(((k, t) for k, t in open_trades if lo < k < hi), reverse=descending))
+        if status in (None, TradeStatus.CLOSED.value):
+            streams.append(self._iter_hot_closed(lo, hi, descending, wanted))
+            if self.archive is not None:
+                streams.append(self._iter_archived(lo, hi, descending, wanted))
+        merged = heapq.merge(*streams, key=lambda item: item[0], reverse=descending)
+        return (trade for _, trade in merged)
+    
+    def _iter_hot_closed(self, lo: tuple, hi: tuple, descending: bool, wanted) -> Iterator[Tuple[tuple, Trade]]:
+        """Keyset walk over the exit index, PAGE_CHUNK entries per lock hold"""
+        key = hi if descending else lo
+        while True:
+            with self._lock:
+                chunk = self.index.closed_after(key, PAGE_CHUNK, descending)
+            for key, trade in chunk:
+                if not lo < key < hi:
+                    return
+                if wanted(trade):
+                    yield key, trade
+            if len(chunk) < PAGE_CHUNK:
+                return
+    
+    def _iter_archived(self, lo: tuple, hi: tuple, descending: bool, wanted) -> Iterator[Tuple[tuple, Trade]]:
+        since = lo[0] or None
+        until = hi[0] if hi[0] != MAX_KEY else None
+        for month in self.archive.months(since, until, descending):
+            for trade in month:
+                key = (trade.exit_time, trade.id)
+                if lo < key < hi and wanted(trade) and trade.id not in self.index.by_id:
+                    yield key, trade
+    
+    def page_trades(self, limit: int = 50, **filters) -> Tuple[List[Trade], Optional[Tuple[str, str]]]:
+        """One page of iter_trades and the cursor for the next (None on the last page)"""
+        page = list(itertools.islice(self.iter_trades(**filters), limit + 1))
+        if len(page) <= limit:
+            return page, None
+        page = page[:limit]
+        return page, self.order_key(page[-1])
+    
+    def count_trades(self, status: str = None) -> int:
+        """Number of trades in both tiers (archive counts come from segment footers)"""
+        self._sync()
+        with self._lock:
+            if status == TradeStatus.OPEN.value:
+                return len(self.index.open)
+            hot = len(self.index.exits) if status == TradeStatus.CLOSED.value else len(self.trades)
+        cold = sum(f['count'] for f in self.archive.segments()) if self.archive is not None else 0
+        return hot + cold
+    
+    def get_running_trade(self, symbol: str = None, strategy: str = None) -> Optional[Trade]:
+        """Get currently running trade for a symbol (optionally of one strategy)"""
         if symbol:
-            for trade in open_trades:
-                if trade.symbol == symbol:
-                    return trade
+            matching = self.get_open_trades(symbol, strategy)
+            if matching:
+                return matching[0]
+            if strategy:
+                return None
+        open_trades = self.get_open_trades(strategy=strategy)
         return open_trades[0] if open_trades else None
     
     def get_trade_by_id(self, trade_id: str) -> Optional[Trade]:
         """Get trade by ID"""
-        self._load_trades()  # Reload to get latest trades from file
-        for trade in self.trades:
-            if trade.id == trade_id:
-                return trade
-        return None
-
+        self._sync()
+        trade = self.index.by_id.get(trade_id)
+        if trade is None and self.archive is not None:
+            trade = self.archive.get(trade_id, not_before=self._id_time(trade_id))
+        return trade
+    
+    @staticmethod
+    def _id_time(trade_id: str) -> Optional[str]:
+        """Entry time encoded in a TRD-YYYYmmddHHMMSS-n id (a trade can't exit before it)"""
+        try:
+            return datetime.strptime(trade_id.split('-')[1], '%Y%m%d%H%M%S').isoformat()
+        except (IndexError, ValueError):
+            return None
+    
+    def _archive_cutoff(self) -> str:
+        """Start of the oldest month still kept hot"""
+        start = self.clock.now() - timedelta(days=config.ARCHIVE_HOT_DAYS)
+        return start.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()
+    
+    def _maybe_archive(self):
+        """Run an archive pass once per month boundary"""
+        if self.archive is not None and self._archive_cutoff() != self._archived_before:
+            self.archive_old_trades()
+    
+    def archive_old_trades(self) -> int:
+        """Move trades closed before the hot window into monthly archive segments"""
+        if self.archive is None:
+            return 0
+        cutoff = self._archive_cutoff()
+        with self._lock, self.storage.locked():
+            self._sync()
+            old = [t for t in self.index.closed_trades(None, cutoff) if t.exit_time < cutoff]
+            self._archived_before = cutoff
+            if not old:
+                return 0
+            months: Dict[str, List[dict]] = {}
+            for trade in old:
+                months.setdefault(trade.exit_time[:7], []).append(trade.to_dict())
+            try:
+                for month, records in months.items():
+                    self.archive.append(month, records)
+                self.storage.remove([t.id for t in old])
+            except Exception as e:
+                print(f"Error archiving trades: {e}")
+                return 0
+            self._load_trades()
+            return len(old)
 
 class ProfitLossAnalyzer:
     """Analyzes profit/loss over different time periods"""
     
-    def __init__(self, trade_manager: TradeManager):
+    # get_summary rolling periods: key -> (period label, length)
+    SUMMARY_PERIODS = {
+        'hourly': ('last_1_hours', timedelta(hours=1)),
+        'daily': ('last_1_days', timedelta(days=1)),
+        'weekly': ('last_1_weeks', timedelta(weeks=1)),
+        'monthly': ('last_1_months', timedelta(days=30)),
+    }
+    
+    def __init__(self, trade_manager: TradeManager, clock: Clock = None):
         self.trade_manager = trade_manager
+        self.clock = clock or trade_manager.clock  # "Now" for the rolling periods
+        self.rollup = PnLRollup()  # Built on first use, then fed by every close
+        self.series = TradeSeries()  # Same trades as arrays, for breakdowns
+        self._rollup_built = False
+        self._summary_cache: Dict[bool, tuple] = {}  # include_trades -> (version, expires, summary)
+        self._metrics_cache: Dict[tuple, tuple] = {}  # query -> (series version, metrics)
+        self.starting_equity = config.ANALYTICS_STARTING_EQUITY
+        self.running = risk_metrics.RunningMetrics(self.starting_equity)  # All-time metrics, per close
+        trade_manager.add_listener(self._on_trade)
     
-    def _filter_trades_by_period(
-        self,
-        trades: List[Trade],
-        start_time: datetime,
-        end_time: datetime = None
-    ) -> List[Trade]:
-        """Filter closed trades by time period"""
-        end_time = end_time or datetime.now()
-        filtered = []
-        
-        for trade in trades:
+    def _on_trade(self, trade: Optional[Trade], event: str):
+        if not self._rollup_built:
+            return
+        if event == 'closed':
+            self._count(trade)
+        elif event == 'reloaded':  # Catch up on anything closed elsewhere (already counted trades are skipped)
+            for closed in self.trade_manager.index.closed_trades():
+                self._count(closed)
+    
+    def _count(self, trade: Trade):
+        if self.rollup.add(trade):  # The rollup remembers which trades it has seen
+            self.series.add(trade)
             if trade.exit_time:
-                exit_dt = datetime.fromisoformat(trade.exit_time)
-                if start_time <= exit_dt <= end_time:
-                    filtered.append(trade)
-        
-        return filtered
-    
-    def _calculate_stats(self, trades: List[Trade]) -> Dict:
-        """Calculate statistics for a list of trades"""
-        if not trades:
-            return {
-                'total_trades': 0,
-                'winning_trades': 0,
-                'losing_trades': 0,
-                'total_profit_loss': 0.0,
-                'total_profit_loss_pct': 0.0,
-                'win_rate': 0.0,
-                'avg_profit': 0.0,
-                'avg_loss': 0.0,
-                'best_trade': None,
-                'worst_trade': None,
-                'trades': []
-            }
-        
-        wins = [t for t in trades if t.profit_loss and t.profit_loss > 0]
-        losses = [t for t in trades if t.profit_loss and t.profit_loss < 0]
-        
-        total_pl = sum(t.profit_loss or 0 for t in trades)
-        total_pl_pct = sum(t.profit_loss_pct or 0 for t in trades)
-        
-        best_trade = max(trades, key=lambda t: t.profit_loss or 0) if trades else None
-        worst_trade = min(trades, key=lambda t: t.profit_loss or 0) if trades else None
-        
-        return {
-            'total_trades': len(trades),
-            'winning_trades': len(wins),
-            'losing_trades': len(losses),
-            'total_profit_loss': round(total_pl, 2),
-            'total_profit_loss_pct': round(total_pl_pct, 2),
-            'win_rate': round((len(wins) / len(trades)) * 100, 2) if trades else 0,
-            'avg_profit': round(sum(t.profit_loss for t in wins) / len(wins), 2) if wins else 0,
-            'avg_loss': round(sum(t.profit_loss for t in losses) / len(losses), 2) if losses else 0,
-            'best_trade': best_trade.to_dict() if best_trade else None,
-            'worst_trade': worst_trade.to_dict() if worst_trade else None,
-            'trades': [t.to_dict() for t in trades]
+                exit_us, entry_us = to_micros([trade.exit_time, trade.entry_time or trade.exit_time])
+                self.running.add(int(exit_us), int(entry_us), trade.profit_loss or 0, trade.profit_loss_pct or 0)
+    
+    def rebuild_rollups(self):
+        """Recount every closed trade from storage (hot tier and archive)"""
+        self.rollup.clear()
+        self.series.clear()
+        self.running = risk_metrics.RunningMetrics(self.starting_equity)
+        self._rollup_built = True  # Closes that race the rebuild are counted once
+        for trade in self.trade_manager.iter_trades(status=TradeStatus.CLOSED.value, descending=False):
+            self._count(trade)
+    
+    def _rollups(self) -> PnLRollup:
+        if not self._rollup_built:
+            self.rebuild_rollups()
+        self.trade_manager._sync()
+        return self.rollup
+    
+    def _scan(self, start: datetime, end: datetime) -> List[Trade]:
+        """Closed trades exited in [start, end) (the partial hours of a period)"""
+        end_iso = end.isoformat()
+        return [t for t in self.trade_manager.get_closed_trades(since=start, until=end) if t.exit_time < end_iso]
+    
+    def _trade_dicts(self, trades: List[Trade]) -> List[dict]:
+        columns = self.trade_manager.columns
+        rows = columns.rows_of(trades) if columns is not None and trades else None
+        if rows is not None:
+            return columns.to_dicts(rows)
+        return [t.to_dict() for t in trades]
+    
+    def _period_stats(self, start_time: Optional[datetime], end_time: datetime = None,
+                      include_trades: bool = True) -> Dict:
+        """Statistics for trades exited in [start_time, end_time] from the rollups"""
+        end_time = end_time or self.clock.now()
+        bucket = self._rollups().total(start_time, end_time, self._scan)
+        stats = {
+            'total_trades': bucket.count,
+            'winning_trades': bucket.wins,
+            'losing_trades': bucket.losses,
+            'total_profit_loss': round(bucket.profit_loss, 2),
+            'total_profit_loss_pct': round(bucket.profit_loss_pct, 2),
+            'win_rate': round((bucket.wins / bucket.count) * 100, 2) if bucket.count else 0.0,
+            'avg_profit': round(bucket.win_total / bucket.wins, 2) if bucket.wins else 0.0,
+            'avg_loss': round(bucket.loss_total / bucket.losses, 2) if bucket.losses else 0.0,
+            'best_trade': None,
+            'worst_trade': None
         }
+        for key, extreme in (('best_trade', bucket.best), ('worst_trade', bucket.worst)):
+            trade = self.trade_manager.get_trade_by_id(extreme[1]) if extreme else None
+            stats[key] = trade.to_dict() if trade else None
+        if include_trades:
+            stats['trades'] = self._trade_dicts(
+                self.trade_manager.get_closed_trades(since=start_time, until=end_time)
+            ) if bucket.count else []
+        return stats
     
-    def get_hourly_stats(self, hours: int = 1) -> Dict:
+    def get_hourly_stats(self, hours: int = 1, include_trades: bool = True) -> Dict:
         """Get P&L stats for the last N hours"""
-        start_time = datetime.now() - timedelta(hours=hours)
-        closed_trades = self.trade_manager.get_closed_trades()
-        filtered = self._filter_trades_by_period(closed_trades, start_time)
-        stats = self._calculate_stats(filtered)
+        now = self.clock.now()
+        start_time = now - timedelta(hours=hours)
+        stats = self._period_stats(start_time, now, include_trades)
         stats['period'] = f'last_{hours}_hours'
         stats['start_time'] = start_time.isoformat()
-        stats['end_time'] = datetime.now().isoformat()
+        stats['end_time'] = now.isoformat()
         return stats
     
-    def get_daily_stats(self, days: int = 1) -> Dict:
+    def get_daily_stats(self, days: int = 1, include_trades: bool = True) -> Dict:
         """Get P&L stats for the last N days"""
-        start_time = datetime.now() - timedelta(days=days)
-        closed_trades = self.trade_manager.get_closed_trades()
-        filtered = self._filter_trades_by_period(closed_trades, start_time)
-        stats = self._calculate_stats(filtered)
+        now = self.clock.now()
+        start_time = now - timedelta(days=days)
+        stats = self._period_stats(start_time, now, include_trades)
         stats['period'] = f'last_{days}_days'
         stats['start_time'] = start_time.isoformat()
-        stats['end_time'] = datetime.now().isoformat()
+        stats['end_time'] = now.isoformat()
         return stats
     
-    def get_weekly_stats(self, weeks: int = 1) -> Dict:
+    def get_weekly_stats(self, weeks: int = 1, include_trades: bool = True) -> Dict:
         """Get P&L stats for the last N weeks"""
-        start_time = datetime.now() - timedelta(weeks=weeks)
-        closed_trades = self.trade_manager.get_closed_trades()
-        filtered = self._filter_trades_by_period(closed_trades, start_time)
-        stats = self._calculate_stats(filtered)
+        now = self.clock.now()
+        start_time = now - timedelta(weeks=weeks)
+        stats = self._period_stats(start_time, now, include_trades)
         stats['period'] = f'last_{weeks}_weeks'
         stats['start_time'] = start_time.isoformat()
-        stats['end_time'] = datetime.now().isoformat()
+        stats['end_time'] = now.isoformat()
         return stats
     
-    def get_monthly_stats(self, months: int = 1) -> Dict:
+    def get_monthly_stats(self, months: int = 1, include_trades: bool = True) -> Dict:
         """Get P&L stats for the last N months"""
-        start_time = datetime.now() - timedelta(days=months * 30)
-        closed_trades = self.trade_manager.get_closed_trades()
-        filtered = self._filter_trades_by_period(closed_trades, start_time)
-        stats = self._calculate_stats(filtered)
+        now = self.clock.now()
+        start_time = now - timedelta(days=months * 30)
+        stats = self._period_stats(start_time, now, include_trades)
         stats['period'] = f'last_{months}_months'
         stats['start_time'] = start_time.isoformat()
-        stats['end_time'] = datetime.now().isoformat()
+        stats['end_time'] = now.isoformat()
         return stats
     
-    def get_all_time_stats(self) -> Dict:
+    def get_all_time_stats(self, include_trades: bool = True) -> Dict:
         """Get all-time P&L stats"""
-        closed_trades = self.trade_manager.get_closed_trades()
-        stats = self._calculate_stats(closed_trades)
+        stats = self._period_stats(None, include_trades=include_trades)
         stats['period'] = 'all_time'
         return stats
     
-    def get_summary(self) -> Dict:
-        """Get comprehensive summary with all time periods"""
-        return {
-            'hourly': self.get_hourly_stats(1),
-            'daily': self.get_daily_stats(1),
-            'weekly': self.get_weekly_stats(1),
-            'monthly': self.get_monthly_stats(1),
-            'all_time': self.get_all_time_stats(),
-            'open_trades': [t.to_dict() for t in self.trade_manager.get_open_trades()],
-            'recent_trades': [t.to_dict() for t in self.trade_manager.get_closed_trades()[-10:]]
-        }
+    def get_summary(self, include_trades: bool = False) -> Dict:
+        """Get comprehensive summary with all time periods
+        
+        Computed from one snapshot of the trades and memoized until a trade changes
+        (TradeManager.version) or the oldest trade of a rolling period leaves it.
+        """
+        self.trade_manager._sync()
+        now = self.clock.now()
+        cached = self._summary_cache.get(include_trades)
+        if cached and cached[0] == self.trade_manager.version and now < cached[1]:
+            return self._restamp(cached[2], now)
+        with self.trade_manager._lock:
+            version = self.trade_manager.version
+            summary, expires = self._build_summary(now, include_trades)
+        self._summary_cache[include_trades] = (version, expires, summary)
+        return summary
     
-    def get_daily_breakdown(self, days: int = 7) -> List[Dict]:
+    def _build_summary(self, now: datetime, include_trades: bool) -> Tuple[Dict, datetime]:
+        """Summary as of `now`, and when a rolling period would next lose a trade"""
+        trade_manager = self.trade_manager
+        summary = {}
+        expires = datetime.max
+        for key, (label, length) in self.SUMMARY_PERIODS.items():
+            start_time = now - length
+            stats = self._period_stats(start_time, now, include_trades)
+            stats.update(period=label, start_time=start_time.isoformat(), end_time=now.isoformat())
+            summary[key] = stats
+            oldest = next(trade_manager.iter_trades(
+                status=TradeStatus.CLOSED.value, since=start_time, until=now, descending=False
+            ), None)
+            if oldest:
+                expires = min(expires, datetime.fromisoformat(oldest.exit_time) + length)
+        summary['all_time'] = self._period_stats(None, now, include_trades)
+        summary['all_time']['period'] = 'all_time'
+        summary['open_trades'] = [t.to_dict() for t in trade_manager.get_open_trades()]
+        recent = itertools.islice(trade_manager.iter_trades(status=TradeStatus.CLOSED.value, until=now), 10)
+        summary['recent_trades'] = [t.to_dict() for t in recent][::-1]
+        return summary, expires
+    
+    def _restamp(self, summary: Dict, now: datetime) -> Dict:
+        """Cached summary with the rolling period bounds moved to `now`"""
+        fresh = dict(summary)
+        for key, (_, length) in self.SUMMARY_PERIODS.items():
+            fresh[key] = dict(summary[key], start_time=(now - length).isoformat(), end_time=now.isoformat())
+        return fresh
+    
+    def get_breakdown(self, granularity: str = 'day', periods: int = 7, tz: str = None) -> List[Dict]:
+        """Per hour / day / week / month P&L for the last N periods, oldest first
+        
+        Boundaries are in `tz` (default ANALYTICS_TIMEZONE, else server local time).
+        """
+        self._rollups()
+        return self.series.breakdown(granularity, periods, self.clock.now(), timezone_for(tz))
+    
+    def get_daily_breakdown(self, days: int = 7, tz: str = None) -> List[Dict]:
         """Get day-by-day breakdown for the last N days"""
-        breakdown = []
-        closed_trades = self.trade_manager.get_closed_trades()
+        return [{
+            'date': bucket['label'],
+            'day': datetime.fromisoformat(bucket['start']).strftime('%A'),
+            'trades': bucket['trades'],
+            'profit_loss': bucket['profit_loss']
+        } for bucket in self.get_breakdown('day', days, tz)]
+    
+    def _cached_metrics(self, key: tuple, build: Callable[[], object]):
+        """Memoized per query until another trade closes (TradeSeries.version)"""
+        self._rollups()
+        version = self.series.version
+        cached = self._metrics_cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        result = build()
+        if len(self._metrics_cache) > 256:
+            self._metrics_cache.clear()
+        self._metrics_cache[key] = (version, result)
+        return result
+    
+    def _metrics_of(self, columns: Dict, end: datetime = None) -> Dict:
+        end_us = int(to_micros([end])[0]) if end else None
+        return risk_metrics.compute(columns['exit_us'], columns['entry_us'], columns['profit_loss'],
+                                    columns['profit_loss_pct'], self.starting_equity, end_us)
+    
+    def get_metrics(self, symbol: str = None, strategy: str = None, since: datetime = None,
+                    until: datetime = None, prices: Dict[str, float] = None) -> Dict:
+        """Risk and performance metrics of closed trades (drawdown, Sharpe/Sortino, profit factor, ...)
         
-        for i in range(days):
-            day_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=i)
-            day_end = day_start + timedelta(days=1)
-            
-            filtered = self._filter_trades_by_period(closed_trades, day_start, day_end)
-            total_pl = sum(t.profit_loss or 0 for t in filtered)
-            
-            breakdown.append({
-                'date': day_start.strftime('%Y-%m-%d'),
-                'day': day_start.strftime('%A'),
-                'trades': len(filtered),
-                'profit_loss': round(total_pl, 2)
-            })
+        Open trades matching the filters are marked to market at `prices`.
+        """
+        self._rollups()
+        running = self.running
+        if running.valid and running.starting_equity == self.starting_equity and \
+                not (symbol or strategy or since or until):
+            metrics = running.metrics()  # All-time: kept current by every close
+        else:
+            metrics = self._cached_metrics(
+                ('metrics', symbol, strategy, since, until),
+                lambda: self._metrics_of(self.series.select(symbol, strategy, since, until), until)
+            )
+        open_trades = [t for t in self.trade_manager.get_open_trades(symbol, strategy)
+                       if not until or t.entry_time <= until.isoformat()]
+        return risk_metrics.with_open(metrics, risk_metrics.unrealized(open_trades, prices))
+    
+    def get_metric_splits(self, by: str = 'strategy', since: datetime = None, until: datetime = None) -> List[Dict]:
+        """Closed-trade metrics per strategy or per symbol, highest P&L first"""
+        if by not in ('strategy', 'symbol'):
+            raise ValueError("by must be 'strategy' or 'symbol'")
         
-        return breakdown[::-1]  # Reverse to get chronological order
+        def build():
+            splits = [dict(self._metrics_of(group, until), **{by: self.series.names[code]})
+                      for code, group in risk_metrics.groups(self.series.select(since=since, until=until), by)]
+            return sorted(splits, key=lambda m: m.get('total_profit_loss') or 0, reverse=True)
+        return self._cached_metrics(('splits', by, since, until), build)
+    
+    def get_equity_curve(self, points: int = 500, symbol: str = None, strategy: str = None) -> List[Dict]:
+        """Realized equity and drawdown after each closed trade, thinned to about `points`"""
+        def build():
+            columns = self.series.select(symbol, strategy)
+            return risk_metrics.equity_curve(columns['exit_us'], columns['profit_loss'],
+                                             self.starting_equity, points)
+        return self._cached_metrics(('equity', points, symbol, strategy), build)
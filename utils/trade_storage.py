@@ -0,0 +1,552 @@
+"""
+Trade Storage - Persistence backends for TradeManager
+
+Backends store plain trade dicts keyed by trade id:
+- JsonTradeStorage: the whole history as one JSON file, rewritten on every change
+- JournalTradeStorage: one appended line per change, replayed on load and
+  compacted into the JSON snapshot in the background
+- SqliteTradeStorage: one row per trade with indexed lookup columns (WAL mode)
+
+Several processes (bots, the API server, the test scripts) can share one
+history: they coordinate through an advisory lock file next to the data, and
+TradeStorage.locked() lets TradeManager re-read and write under it.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger('TradeStorage')
+
+try:
+    import fcntl
+except ImportError:  # Windows: threads in this process are still serialized
+    fcntl = None
+
+
+class FileLock:
+    """Advisory lock on `<path>.lock`, shared or exclusive, re-entrant per thread"""
+
+    def __init__(self, path: str):
+        self.path = f"{path}.lock"
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+        self._thread_lock = threading.RLock()
+
+    @contextmanager
+    def shared(self):
+        with self._hold(fcntl.LOCK_SH if fcntl else 0):
+            yield
+
+    @contextmanager
+    def exclusive(self, blocking: bool = True):
+        """Raises BlockingIOError if not blocking and another process holds the lock"""
+        mode = (fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)) if fcntl else 0
+        with self._hold(mode, exclusive=True):
+            yield
+
+    @contextmanager
+    def _hold(self, mode: int, exclusive: bool = False):
+        with self._thread_lock:
+            if fcntl and (self._depth == 0 or (exclusive and not self._exclusive)):
+                self._flock(mode)
+                self._exclusive = exclusive
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _flock(self, mode: int):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, mode)
+
+    def close(self):
+        with self._thread_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class TradeStorage:
+    """Storage backend interface"""
+
+    file_lock: FileLock = None
+
+    def load(self) -> List[dict]:
+        """All trades, oldest first"""
+        raise NotImplementedError
+
+    def save(self, record: dict):
+        """Persist a new or changed trade"""
+        raise NotImplementedError
+
+    def refresh(self) -> Optional[List[dict]]:
+        """Trades written by other processes since the last load/refresh (None: reload everything)"""
+        return None
+
+    def remove(self, trade_ids: List[str]):
+        """Drop trades (moved to the archive); other processes reload on their next refresh"""
+        raise NotImplementedError
+
+    def get(self, trade_id: str) -> Optional[dict]:
+        """One trade by id"""
+        return next((r for r in self.load() if r['id'] == trade_id), None)
+
+    def find(
+        self,
+        status: str = None,
+        symbol: str = None,
+        strategy: str = None,
+        exit_after: str = None,
+        exit_before: str = None
+    ) -> List[dict]:
+        """Trades matching every given filter, oldest first (exit bounds are ISO times)"""
+        return [r for r in self.load() if matches(r, status, symbol, strategy, exit_after, exit_before)]
+
+    @contextmanager
+    def locked(self):
+        """Hold off writers in other processes (read-check-write sequences)"""
+        if self.file_lock is None:
+            yield
+            return
+        with self.file_lock.exclusive():
+            yield
+
+    def close(self):
+        """Flush and release resources"""
+
+
+def matches(record: dict, status: str = None, symbol: str = None, strategy: str = None,
+            exit_after: str = None, exit_before: str = None) -> bool:
+    """Whether a trade dict passes TradeStorage.find filters"""
+    if status and record.get('status') != status:
+        return False
+    if symbol and record.get('symbol') != symbol:
+        return False
+    if strategy and record.get('strategy') != strategy:
+        return False
+    if exit_after or exit_before:
+        exit_time = record.get('exit_time')
+        if not exit_time or (exit_after and exit_time < exit_after) \
+                or (exit_before and exit_time > exit_before):
+            return False
+    return True
+
+
+def _signature(path: str) -> Optional[tuple]:
+    """Identity + version of a file: changes when anyone rewrites or replaces it"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _read_snapshot(path: str) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return {t['id']: t for t in json.load(f)}
+
+
+def _live(state: Dict[str, dict]) -> List[dict]:
+    """Journal state without tombstones"""
+    return [r for r in state.values() if not r.get('deleted')]
+
+
+def _write_snapshot(path: str, records: List[dict], indent: int = None):
+    """Write atomically (temp file + fsync + rename)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(records, f, indent=indent, separators=None if indent else (',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JsonTradeStorage(TradeStorage):
+    """Full-file JSON (the original format)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file_lock = FileLock(path)
+        self._records: Dict[str, dict] = {}
+        self._merged: List[dict] = []  # Other processes' trades picked up while saving
+        self._signature = None
+
+    def load(self) -> List[dict]:
+        with self.file_lock.shared():
+            self._signature = _signature(self.path)
+            self._records = _read_snapshot(self.path)
+            self._merged = []
+            return list(self._records.values())
+
+    def save(self, record: dict):
+        """Merge with whatever is on disk now, then replace the file"""
+        with self.file_lock.exclusive():
+            if _signature(self.path) != self._signature:
+                current = _read_snapshot(self.path)
+                self._merged.extend(r for r in current.values() if self._records.get(r['id']) != r)
+                self._records = current
+            self._records[record['id']] = record
+            _write_snapshot(self.path, list(self._records.values()), indent=2)
+            self._signature = _signature(self.path)
+
+    def refresh(self) -> Optional[List[dict]]:
+        with self.file_lock.shared():
+            if _signature(self.path) != self._signature:
+                return None
+            merged, self._merged = self._merged, []
+            return merged
+
+    def remove(self, trade_ids: List[str]):
+        with self.file_lock.exclusive():
+            self._records = _read_snapshot(self.path)
+            for trade_id in trade_ids:
+                self._records.pop(trade_id, None)
+            _write_snapshot(self.path, list(self._records.values()), indent=2)
+            self._signature = _signature(self.path)
+            self._merged = []
+
+    def close(self):
+        self.file_lock.close()
+
+
+class JournalTradeStorage(TradeStorage):
+    """Append-only journal on top of a JSON snapshot"""
+
+    def __init__(
+        self,
+        snapshot_path: str,
+        journal_path: str = None,
+        fsync_interval_ms: float = None,
+        compact_records: int = None
+    ):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + '.journal'
+        self.rotated_path = self.journal_path + '.1'  # Journal being compacted
+        interval = config.JOURNAL_FSYNC_INTERVAL_MS if fsync_interval_ms is None else fsync_interval_ms
+        self.fsync_interval = interval / 1000
+        self.compact_records = compact_records or config.JOURNAL_COMPACT_RECORDS
+        self.file_lock = FileLock(snapshot_path)  # Shared: append/read, exclusive: rotate/replace
+        self._compact_lock = FileLock(self.journal_path)
+        self._journal = None
+        self._records = 0       # Lines this process appended to the live journal
+        self._snapshot_signature = None
+        self._journal_inode = None
+        self._offset = 0        # Bytes of the live journal already read
+        self._unsynced = False
+        self._compacting = False
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        if self.fsync_interval > 0:
+            threading.Thread(target=self._sync_loop, daemon=True, name='journal-fsync').start()
+
+    def load(self) -> List[dict]:
+        """Snapshot, then every journaled change on top of it"""
+        with self.file_lock.shared(), self._lock:
+            self._snapshot_signature = _signature(self.snapshot_path)
+            state = _read_snapshot(self.snapshot_path)
+            self._replay(self.rotated_path, state)
+            journal = _signature(self.journal_path)
+            self._journal_inode = journal[0] if journal else None
+            self._records, self._offset = self._replay(self.journal_path, state)
+            return _live(state)
+
+    def refresh(self) -> Optional[List[dict]]:
+        """Only the journal lines appended since we last read it"""
+        with self.file_lock.shared(), self._lock:
+            if _signature(self.snapshot_path) != self._snapshot_signature:
+                return None  # Compacted (or rewritten) elsewhere
+            journal = _signature(self.journal_path)
+            if journal is None:
+                return [] if self._offset == 0 else None
+            if self._journal_inode not in (None, journal[0]) or journal[2] < self._offset:
+                return None  # Rotated or truncated
+            self._journal_inode = journal[0]
+            if journal[2] == self._offset:
+                return []
+            state: Dict[str, dict] = {}
+            _, self._offset = self._replay(self.journal_path, state, self._offset)
+            if any(r.get('deleted') for r in state.values()):
+                return None  # Trades were archived away
+            return list(state.values())
+
+    @staticmethod
+    def _replay(path: str, state: Dict[str, dict], offset: int = 0) -> Tuple[int, int]:
+        """Apply complete lines from offset on; returns (lines read, offset after them)"""
+        if not os.path.exists(path):
+            return 0, 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1  # A line still being written is left for later
+        count = 0
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn write from a crash
+            state[record['id']] = record
+            count += 1
+        return count, offset + end
+
+    def save(self, record: dict):
+        self._append([record])
+
+    def remove(self, trade_ids: List[str]):
+        """Tombstone lines; dropped from the snapshot at the next compaction"""
+        self._append([{'id': trade_id, 'deleted': True} for trade_id in trade_ids])
+
+    def _append(self, records: List[dict]):
+        lines = ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in records).encode()
+        with self.file_lock.shared(), self._lock:
+            journal = self._open()
+            journal.write(lines)  # One O_APPEND write: lines from other processes never interleave
+            self._records += len(records)
+            if self.fsync_interval > 0:
+                self._unsynced = True
+            else:
+                os.fsync(journal.fileno())
+            if self._records >= self.compact_records and not self._compacting:
+                self._compacting = True
+                threading.Thread(target=self.compact, daemon=True, name='journal-compact').start()
+
+    def _open(self):
+        """Live journal, reopened if another process rotated it away"""
+        if self._journal is not None:
+            current = _signature(self.journal_path)
+            if current and current[0] == os.fstat(self._journal.fileno()).st_ino:
+                return self._journal
+            self._close_journal()
+        self._journal = open(self.journal_path, 'ab', buffering=0)
+        if os.fstat(self._journal.fileno()).st_size > 0:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self._journal.write(b'\n')  # Fence off a torn last line
+        return self._journal
+
+    def _close_journal(self):
+        if self._journal:
+            os.fsync(self._journal.fileno())
+            self._journal.close()
+            self._journal = None
+            self._unsynced = False
+
+    def _sync(self):
+        with self._lock:
+            if self._unsynced and self._journal:
+                os.fsync(self._journal.fileno())
+                self._unsynced = False
+
+    def _sync_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.fsync_interval)
+            try:
+                self._sync()
+            except Exception as e:
+                logger.error(f"Journal fsync failed: {e}")
+
+    def compact(self):
+        """Fold the journal into the snapshot; writers keep appending meanwhile"""
+        try:
+            with self._compact_lock.exclusive(blocking=False):  # One compactor across processes
+                self._compact()
+        except BlockingIOError:
+            pass
+        except Exception as e:
+            logger.error(f"Journal compaction failed: {e}")
+        finally:
+            self._compacting = False
+
+    def _compact(self):
+        with self.file_lock.exclusive(), self._lock:
+            self._close_journal()
+            if not os.path.exists(self.rotated_path) and os.path.exists(self.journal_path):
+                os.replace(self.journal_path, self.rotated_path)
+            self._records = 0
+
+        state = _read_snapshot(self.snapshot_path)
+        self._replay(self.rotated_path, state)
+        records = _live(state)
+        with self.file_lock.exclusive(), self._lock:
+            _write_snapshot(self.snapshot_path, records)
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+        logger.info(f"🗜️ Compacted trade journal ({len(records)} trades)")
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._wakeup.set()
+            self._close_journal()
+        self.file_lock.close()
+        self._compact_lock.close()
+
+
+class SqliteTradeStorage(TradeStorage):
+    """SQLite table with the trade as JSON plus indexed lookup columns"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS trades (
+            seq INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            status TEXT,
+            symbol TEXT,
+            strategy TEXT,
+            entry_time TEXT,
+            exit_time TEXT,
+            version INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_trades_status ON trades (status);
+        CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol);
+        CREATE INDEX IF NOT EXISTS idx_trades_strategy ON trades (strategy);
+        CREATE INDEX IF NOT EXISTS idx_trades_entry_time ON trades (entry_time);
+        CREATE INDEX IF NOT EXISTS idx_trades_exit_time ON trades (exit_time);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, db_path: str, migrate_from: str = None):
+        self.db_path = db_path
+        self.file_lock = FileLock(db_path)  # SQLite locks its own writes; this guards read-check-write
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')  # Readers never block the writer
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(self.SCHEMA)
+        columns = [c[1] for c in self._db.execute('PRAGMA table_info(trades)')]
+        if 'version' not in columns:  # Databases created before change tracking
+            self._db.execute('ALTER TABLE trades ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_trades_version ON trades (version)')
+        self._version = 0       # Highest row version we have read
+        self._removals = None   # Removal counter when we last loaded
+        self._data_version = None
+        if migrate_from:
+            self._migrate(migrate_from)
+
+    def _migrate(self, json_path: str):
+        """One-shot import of trades.json (+ its journal) into an empty database"""
+        with self._lock:
+            done = self._db.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+        source = JournalTradeStorage(json_path, fsync_interval_ms=0)
+        if done or not any(map(os.path.exists, (json_path, source.journal_path, source.rotated_path))):
+            return
+        records = source.load()
+        with self._lock, self._db:
+            self._db.executemany(self._UPSERT, [self._row(r) for r in records])
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (json_path,))
+        logger.info(f"📦 Migrated {len(records)} trades from {json_path} to SQLite")
+
+    _UPSERT = """
+        INSERT INTO trades (id, status, symbol, strategy, entry_time, exit_time, data, version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(version), 0) + 1 FROM trades))
+        ON CONFLICT (id) DO UPDATE SET
+            status = excluded.status, symbol = excluded.symbol, strategy = excluded.strategy,
+            entry_time = excluded.entry_time, exit_time = excluded.exit_time, data = excluded.data,
+            version = excluded.version
+    """
+
+    @staticmethod
+    def _row(record: dict) -> tuple:
+        return (record['id'], record.get('status'), record.get('symbol'), record.get('strategy'),
+                record.get('entry_time'), record.get('exit_time'),
+                json.dumps(record, separators=(',', ':')))
+
+    def _select(self, where: str = '', params: tuple = ()) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute(f"SELECT data FROM trades {where} ORDER BY seq", params).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def load(self) -> List[dict]:
+        with self._lock:
+            self._data_version = self._db.execute('PRAGMA data_version').fetchone()[0]
+            self._version = self._db.execute('SELECT COALESCE(MAX(version), 0) FROM trades').fetchone()[0]
+            self._removals = self._meta('removals')
+        return self._select()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def remove(self, trade_ids: List[str]):
+        with self._lock, self._db:
+            self._db.executemany('DELETE FROM trades WHERE id = ?', [(i,) for i in trade_ids])
+            self._db.execute(
+                "INSERT INTO meta (key, value) VALUES ('removals', '1') "
+                "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+
+    def save(self, record: dict):
+        with self._lock, self._db:
+            self._db.execute(self._UPSERT, self._row(record))
+
+    def refresh(self) -> Optional[List[dict]]:
+        """Rows other connections committed since we last looked"""
+        with self._lock:
+            data_version = self._db.execute('PRAGMA data_version').fetchone()[0]
+            if data_version == self._data_version:
+                return []
+            if self._meta('removals') != self._removals:
+                return None  # Trades were archived away
+            rows = self._db.execute(
+                'SELECT data, version FROM trades WHERE version > ? ORDER BY version', (self._version,)
+            ).fetchall()
+            self._data_version = data_version
+            if rows:
+                self._version = rows[-1][1]
+        return [json.loads(data) for data, _ in rows]
+
+    def get(self, trade_id: str) -> Optional[dict]:
+        rows = self._select('WHERE id = ?', (trade_id,))
+        return rows[0] if rows else None
+
+    def find(
+        self,
+        status: str = None,
+        symbol: str = None,
+        strategy: str = None,
+        exit_after: str = None,
+        exit_before: str = None
+    ) -> List[dict]:
+        clauses, params = [], []
+        for column, value in (('status', status), ('symbol', symbol), ('strategy', strategy)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if exit_after:
+            clauses.append("exit_time >= ?")
+            params.append(exit_after)
+        if exit_before:
+            clauses.append("exit_time <= ?")
+            params.append(exit_before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._select(where, tuple(params))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+        self.file_lock.close()
+
+
+def create_trade_storage(path: str, backend: str = None) -> TradeStorage:
+    """Storage backend for a trades.json path (TRADE_STORAGE picks the kind)"""
+    backend = (backend or config.TRADE_STORAGE).lower()
+    if backend == 'json':
+        return JsonTradeStorage(path)
+    if backend == 'journal':
+        return JournalTradeStorage(path)
+    if backend == 'sqlite':
+        return SqliteTradeStorage(os.path.splitext(path)[0] + '.db', migrate_from=path)
+    raise ValueError(f"Unknown trade storage: {backend}")